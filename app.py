@@ -3,12 +3,19 @@ import random
 import re
 import json
 import datetime
-from collections import defaultdict
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import pandas as pd
+import time
+import threading
+import concurrent.futures
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context
 import resend
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, bindparam
 import pymysql
+import catalog
+import planner
+import cohort
+import sequence_store
+import email_outbox
+import email_templates
 
 app = Flask(__name__)
 app.secret_key = "SVsecretKEY"
@@ -37,77 +44,17 @@ if DB_PASS:
     connect_args={'ssl': {}}  # <--- AICI e modificarea (dicționar SSL gol pentru a forța criptarea standard)
         )
     print("🟢 App connected to MySQL Database successfully.")
+    try:
+        # Sequence_Blobs se creează o singură dată aici, nu în request-urile de citire
+        with engine.begin() as conn:
+            sequence_store.ensure_schema(conn)
+    except Exception as e:
+        print(f"DB Error Sequence_Blobs schema: {e}")
 else:
     engine = None
     print("❌ WARNING: Environment variable planner_db_password not set!")
 
-STANDARD_SEQUENCES = {
-    "INDUSTRIAL": {
-        "ACCO220": "Y1_FALL", "ENGR213": "Y1_FALL", "INDU211": "Y1_FALL", "MIAE211": "Y1_FALL", "ENGR245": "Y1_FALL",
-        "ENCS282": "Y1_WIN", "ENGR201": "Y1_WIN", "MIAE215": "Y1_WIN", "MIAE221": "Y1_WIN", "MIAE313": "Y1_WIN",
-        "ENGR202": "Y2_SUM1", "INDU323": "Y2_SUM1", "ENGR233": "Y2_SUM1", "ENGR251": "Y2_SUM1", "ENGR371": "Y2_SUM1",
-        "INDU371": "Y2_FALL", "INDU372": "Y2_FALL", "MIAE380": "Y2_FALL", "MIAE311": "Y2_FALL", "MIAE312": "Y2_FALL", "ENGR301": "Y2_FALL",
-        "WT1": "Y2_WIN",
-        "INDU311": "Y3_SUM1", "ENGR311": "Y3_SUM1", "INDU320": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1",
-        "WT2": "Y3_FALL",
-        "INDU324": "Y3_WIN", "INDU330": "Y3_WIN", "INDU412": "Y3_WIN", "INDU321": "Y3_WIN", "INDU421": "Y3_WIN",
-        "WT3": "Y4_SUM1",
-        "INDU342": "Y4_FALL", "INDU423": "Y4_FALL", "INDU490A": "Y4_FALL",
-        "INDU490B": "Y4_WIN"
-    },
-    "MECHANICAL": {
-        "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE211": "Y1_FALL", "MIAE215": "Y1_FALL",
-        "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "MIAE313": "Y1_WIN", "MIAE221": "Y1_WIN",
-        "ENGR201": "Y2_SUM1", "ENGR202": "Y2_SUM1", "ENGR251": "Y2_SUM1", "ENGR311": "Y2_SUM1", "MIAE311": "Y2_SUM1", "MIAE312": "Y2_SUM1",
-        "MECH321": "Y2_FALL", "MECH343": "Y2_FALL", "MECH351": "Y2_FALL", "MIAE380": "Y2_FALL", "ENGR361": "Y2_FALL",
-        "WT1": "Y2_WIN",
-        "ENGR371": "Y3_SUM1", "MECH352": "Y3_SUM1", "MECH361": "Y3_SUM1", "ENGR391": "Y3_SUM1", "MECH390": "Y3_SUM1",
-        "WT2": "Y3_FALL",
-        "MECH371": "Y3_WIN", "MIAE383": "Y3_WIN", "MECH373": "Y3_WIN", "MECH375": "Y3_WIN", "ENGR392": "Y3_WIN",
-        "WT3": "Y4_SUM1",
-        "MECH368": "Y4_FALL", "ENGR301": "Y4_FALL", "MECH344": "Y4_FALL", "MECH490A": "Y4_FALL",
-        "MECH490B": "Y4_WIN"
-    },
-    "AERO_A": {
-        "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE215": "Y1_FALL", "AERO201": "Y1_FALL",
-        "ENGR233": "Y1_WIN", "ENGR201": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR251": "Y1_WIN", "ENGR202": "Y1_WIN",
-        "AERO290": "Y2_SUM1", "ENGR311": "Y2_SUM1", "ENGR361": "Y2_SUM1", "ENGR371": "Y2_SUM1", "MIAE211": "Y2_SUM1",
-        "AERO371": "Y2_FALL", "MECH343": "Y2_FALL", "MECH352": "Y2_FALL", "MIAE221": "Y2_FALL",
-        "WT1": "Y2_WIN",
-        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "AERO417": "Y3_SUM1", "ENGR392": "Y3_SUM1",
-        "WT2": "Y3_FALL",
-        "AERO481": "Y3_WIN", "MECH361": "Y3_WIN", "MECH351": "Y3_WIN", "MIAE383": "Y3_WIN",
-        "WT3": "Y4_SUM1",
-        "AERO462": "Y4_FALL", "AERO464": "Y4_FALL", "MECH461": "Y4_FALL", "AERO455": "Y4_FALL", "AERO490A": "Y4_FALL",
-        "AERO465": "Y4_WIN", "AERO490B": "Y4_WIN"
-    },
-    "AERO_B": {
-        "AERO201": "Y1_FALL", "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE215": "Y1_FALL",
-        "AERO253": "Y1_WIN", "ENGR201": "Y1_WIN", "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR202": "Y1_WIN",
-        "AERO290": "Y2_SUM1", "ENGR311": "Y2_SUM1", "ENGR361": "Y2_SUM1", "ENGR371": "Y2_SUM1", "MIAE211": "Y2_SUM1",
-        "AERO371": "Y2_FALL", "MECH343": "Y2_FALL", "MIAE221": "Y2_FALL", "MIAE313": "Y2_FALL",
-        "WT1": "Y2_WIN",
-        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1", "MECH375": "Y3_SUM1",
-        "WT2": "Y3_FALL",
-        "AERO481": "Y3_WIN", "MECH373": "Y3_WIN", "MIAE311": "Y3_WIN", "MIAE312": "Y3_WIN", "MIAE383": "Y3_WIN",
-        "WT3": "Y4_SUM1",
-        "AERO431": "Y4_FALL", "AERO417": "Y4_FALL", "AERO486": "Y4_FALL", "MECH460": "Y4_FALL", "MECH412": "Y4_FALL", "AERO490A": "Y4_FALL",
-        "AERO487": "Y4_WIN", "AERO490B": "Y4_WIN"
-    },
-    "AERO_C": {
-        "AERO201": "Y1_FALL", "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "COEN243": "Y1_FALL",
-        "ELEC273": "Y1_WIN", "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR201": "Y1_WIN",
-        "COEN212": "Y2_SUM1", "COEN231": "Y2_SUM1", "ELEC242": "Y2_SUM1", "ENGR202": "Y2_SUM1", "ENGR361": "Y2_SUM1",
-        "AERO290": "Y2_FALL", "AERO371": "Y2_FALL", "COEN244": "Y2_FALL", "ELEC342": "Y2_FALL", "AERO253": "Y2_FALL", "ENGR371": "Y2_FALL",
-        "WT1": "Y2_WIN",
-        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1", "COEN311": "Y3_SUM1",
-        "WT2": "Y3_FALL",
-        "COEN352": "Y3_WIN", "ELEC481": "Y3_WIN", "MIAE383": "Y3_WIN", "AERO482": "Y3_WIN",
-        "WT3": "Y4_SUM1",
-        "AERO417": "Y4_FALL", "ELEC483": "Y4_FALL", "SOEN341": "Y4_FALL", "AERO483": "Y4_FALL", "AERO490A": "Y4_FALL",
-        "AERO490B": "Y4_WIN"
-    }
-}
+catalog.warm_up()
 
 def verify_email_in_sheets(email):
     try:
@@ -143,18 +90,19 @@ def get_priority1_email(target_sid):
     return ""
 
 def send_otp_email(recipient, otp):
+    # Mesajul intră în outbox și pleacă din thread-ul de trimitere; request-ul nu mai așteaptă Resend
     try:
-        resend.Emails.send({
+        email_outbox.enqueue({
             "from": "MIAE Planner <auth@concordiasequenceplanner.ca>",
             "to": [recipient],
             "bcc": ["concordia.sequence.planner@gmail.com"],
             "subject": "Access Code - COOP Academic Planner",
             "html": f"<h2>Concordia MIAE</h2><p>Your login access code is: <strong style='font-size: 24px;'>{otp}</strong></p><p>This code is valid for 30 minutes.</p>",
             "reply_to": "coop_miae@concordia.ca"
-        })
-        return True, "The email has been sent"
+        }, kind="otp")
+        return True, "The email is on its way"
     except Exception as e:
-        print(f"Resend Error: {e}")
+        print(f"Email outbox Error: {e}")
         return False, str(e)
 
 
@@ -213,91 +161,82 @@ def get_email_recipients(program, target_sid, submitter_email, priority1_email,
 
     return recipients
 
-def load_data():
-    try:
-        # Citim mereu fresh din Excel, fără cache!
-        df = pd.read_excel(os.path.join(os.path.dirname(os.path.abspath(__file__)), "CORE_TE.xlsx"))
-        df.columns = [str(c).strip() for c in df.columns] 
-        return df.fillna("")
-    except Exception as e: 
-        print(f"Error loading Excel: {e}")
-        return pd.DataFrame()
-    
-def extract_course_code(course_name):
-    if not course_name: return ""
-    match = re.search(r'(?:REP_)?[A-Z]{3,4}\s?\d{3,4}[A-Z]?|WT\d', str(course_name).upper())
-    return match.group(0).replace(" ", "") if match else str(course_name).strip().upper()
-
-def get_level(course_name):
-    match = re.search(r'(\d)\d{2}', str(course_name))
-    return int(match.group(1)) if match else 9
-
-def parse_requirements(req_str):
-    if not req_str or str(req_str).lower() in ['n/a', 'none', '']: return []
-    reqs = []
-    for group in re.split(r'[;,]', str(req_str)):
-        opts = [m.group(0).replace(" ", "") for o in re.split(r'\bor\b', group, flags=re.IGNORECASE) if (m := re.search(r'(?:REP_)?[A-Z]{3,4}\s?\d{3}[A-Z]?|WT\d', o.upper()))]
-        if opts: reqs.append(opts)
-    return reqs
-
 def parse_coop_term_string(term_str):
-    s = str(term_str).strip().upper()
-    if not s or s == 'NAN': return None, None
-    year_match = re.search(r'(\d{4})', s)
-    if not year_match: return None, None
-    year = int(year_match.group(1))
-    season = ""
-    if 'FALL' in s or 'FA ' in s or s.endswith('FA'): season = 'FALL'
-    elif 'WIN' in s or 'WI' in s: season = 'WIN'
-    elif 'SUM' in s or 'SU' in s: season = 'SUM'
-    if season == 'WIN' and '-' in s: year += 1
-    return str(year), season
-
-def get_program_ft_credits():
-    ft_dict = {}
+    """(year as a string, season) or (None, None); the parsing itself is cohort.parse_term."""
+    year, season = cohort.parse_term(term_str)
+    return (str(year), season) if year is not None else (None, None)
+
+# Program_names se schimbă rar: un singur SELECT, ținut în memorie PROGRAM_SETTINGS_TTL_S secunde
+PROGRAM_SETTINGS_TTL_S = int(os.environ.get("PROGRAM_SETTINGS_TTL_S", "300"))
+_program_settings = {"loaded_at": 0.0, "ft": None, "gpa": None}
+_program_settings_lock = threading.Lock()
+
+
+def get_program_settings():
+    """(FT credits, GPA thresholds) per normalized program name, read together and cached for PROGRAM_SETTINGS_TTL_S."""
+    with _program_settings_lock:
+        if _program_settings["ft"] is not None and time.monotonic() - _program_settings["loaded_at"] < PROGRAM_SETTINGS_TTL_S:
+            return _program_settings["ft"], _program_settings["gpa"]
+    ft_dict, gpa_dict = {}, {}
     try:
         with engine.connect() as conn:
-            query = text("SELECT Program, Credits_FT FROM Program_names")
+            query = text("SELECT Program, Credits_FT, GPA_2_terms FROM Program_names")
             for row in conn.execute(query):
                 prog = str(row[0]).strip().upper()
                 prog = " ".join(prog.split()) 
                 try: cr = float(row[1]) if row[1] else 99
                 except: cr = 99
                 ft_dict[prog] = cr if cr != 0 else 99
+                try: gpa = float(row[2]) if row[2] else 2.0
+                except: gpa = 2.0 
+                gpa_dict[prog] = gpa
     except Exception as e:
-        print(f"DB Error Program_names FT: {e}")
-    return ft_dict
+        print(f"DB Error Program_names: {e}")
+        return ft_dict, gpa_dict                # nu ținem în cache un rezultat gol după o eroare
+    with _program_settings_lock:
+        _program_settings.update(loaded_at=time.monotonic(), ft=ft_dict, gpa=gpa_dict)
+    return ft_dict, gpa_dict
+
+def get_program_ft_credits():
+    return dict(get_program_settings()[0])
 
 def get_program_gpa_thresholds():
-    gpa_dict = {}
-    try:
+    return dict(get_program_settings()[1])
+
+
+# =========================================================
+# ROW MAPPING
+# Request-time reads walk conn.execute(...).mappings() straight into the JSON structures,
+# without building a DataFrame. NULL comes back as None (pandas gave NaN / NaT / None).
+# =========================================================
+def stream_rows(query, params=None, conn=None):
+    """Yields the rows of a text() query as mappings (column -> value); opens a connection when none is given."""
+    if conn is None:
         with engine.connect() as conn:
-            query = text("SELECT Program, GPA_2_terms FROM Program_names")
-            for row in conn.execute(query):
-                prog = str(row[0]).strip().upper()
-                prog = " ".join(prog.split()) 
-                try: gpa = float(row[1]) if row[1] else 2.0
-                except: gpa = 2.0 
-                gpa_dict[prog] = gpa
-    except Exception as e:
-        print(f"DB Error Program_names GPA: {e}")
-    return gpa_dict
+            yield from conn.execute(query, params or {}).mappings()
+    else:
+        yield from conn.execute(query, params or {}).mappings()
+
+
+def _text(val):
+    """str() of a DB value, with NULL as ''."""
+    return "" if val is None else str(val)
+
+
+def _json_cell(val):
+    """Parses a JSON text column; NULL, empty or invalid -> {}."""
+    if val is not None and str(val).strip() and str(val).lower() != 'none':
+        try: return json.loads(str(val))
+        except: return {}
+    return {}
 
 # --- ROUTES ---
 
 def get_restrictions():
     try:
-        # Citim noul sheet "restrictions"
-        df = pd.read_excel(os.path.join(os.path.dirname(os.path.abspath(__file__)), "CORE_TE.xlsx"), sheet_name="restrictions")
-        df.columns = [str(c).strip() for c in df.columns]
-        
-        # Formatăm coloanele de tip dată într-un format text predictibil
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.strftime('%Y-%m-%d')
-                
-        df = df.fillna("")
-        return df.to_dict('records')
+        # Citim sheet-ul "restrictions" din cache-ul catalogului
+        records, _ = catalog.get_sheet(catalog.RESTRICTIONS_SHEET)
+        return [dict(r) for r in records]
     except Exception as e:
         print(f"Error loading Restrictions: {e}")
         return []
@@ -310,16 +249,18 @@ def api_get_cgpa_timeline():
     
     target_sid = str(request.json.get("student_id", "")).strip()
     if not target_sid: return jsonify({})
+    return jsonify(get_cgpa_timeline(target_sid))
 
+
+def get_cgpa_timeline(target_sid):
     try:
         query = text("SELECT * FROM `CGPA_Timeline` WHERE `Student ID` = :sid")
-        df = pd.read_sql(query, engine, params={"sid": target_sid})
         
         cgpa_data = {}
-        for _, row in df.iterrows():
-            term_str = str(row.get('Academic Term', '')).strip()
-            gpa_val = str(row.get('GPA_X_CR', '')).strip()
-            cr_val = str(row.get('GPA_X_CR_Actual_Credits', '')).strip()
+        for row in stream_rows(query, {"sid": target_sid}):
+            term_str = _text(row.get('Academic Term')).strip()
+            gpa_val = _text(row.get('GPA_X_CR')).strip()
+            cr_val = _text(row.get('GPA_X_CR_Actual_Credits')).strip()
 
             if gpa_val and gpa_val.lower() != 'nan':
                 try:
@@ -329,14 +270,14 @@ def api_get_cgpa_timeline():
                     cgpa_data[term_str] = {
                         "gpa_val": float(gpa_val),
                         "credits_val": float(cr_val) if cr_val else 0.0,
-                        "cgpa": float(c_val) if pd.notna(c_val) else 0.0,
-                        "tot_cr": float(t_cr) if pd.notna(t_cr) else 0.0
+                        "cgpa": float(c_val) if c_val is not None else 0.0,
+                        "tot_cr": float(t_cr) if t_cr is not None else 0.0
                     }
                 except ValueError: pass
-        return jsonify(cgpa_data)
+        return cgpa_data
     except Exception as e:
         print(f"DB Error CGPA: {e}")
-        return jsonify({})
+        return {}
 
 
 def get_student_coop_data(target_sid):
@@ -345,19 +286,18 @@ def get_student_coop_data(target_sid):
     
     try:
         query = text("SELECT * FROM `coop` WHERE `Student ID` = :sid")
-        df = pd.read_sql(query, engine, params={"sid": target_sid})
-        if df.empty: return {"found": False}
+        student_records = list(stream_rows(query, {"sid": target_sid}))
+        if not student_records: return {"found": False}
         
-        student_records = df.to_dict('records')
         admission_info = None
         cutoff_score = float('inf') 
         parsed_records = []
 
         for row in student_records:
-            raw_term = str(row.get('Term', ''))
+            raw_term = _text(row.get('Term'))
             year, season = parse_coop_term_string(raw_term)
             
-            adm_val = str(row.get('Admission Term', ''))
+            adm_val = _text(row.get('Admission Term'))
             if not admission_info and adm_val and adm_val.lower() != 'nan':
                  adm_year, adm_season = parse_coop_term_string(adm_val)
                  if adm_year and adm_season: admission_info = {"year": adm_year, "term": adm_season}
@@ -369,7 +309,7 @@ def get_student_coop_data(target_sid):
                 elif season == 'SUM': score = y_int * 10 + 2
                 elif season == 'FALL': score = y_int * 10 + 3
 
-                tw_ok = str(row.get('Transferred Withdrawn OK', '')).strip()
+                tw_ok = _text(row.get('Transferred Withdrawn OK')).strip()
                 tw_lower = tw_ok.lower()
                 is_cutoff = False
                 
@@ -377,7 +317,7 @@ def get_student_coop_data(target_sid):
                     is_cutoff = True
                     if score < cutoff_score: cutoff_score = score 
 
-                ws_raw = str(row.get('WS', '')).replace('_NF', ' not found')
+                ws_raw = _text(row.get('WS')).replace('_NF', ' not found')
                 if ws_raw.lower() == 'nan': ws_raw = ""
                 
                 views, applied = 0, 0
@@ -386,11 +326,11 @@ def get_student_coop_data(target_sid):
                 try: applied = int(float(row.get('Jobs Applied no', 0)))
                 except: pass
                 
-                details = str(row.get('Term Details', '')).strip()
+                details = _text(row.get('Term Details')).strip()
                 if details.lower() == 'nan' or details.lower() == 'none': details = ""
 
                 parsed_records.append({
-                    "score": score, "key": f"{year}_{season}", "label": str(row.get('Term number Sx or Wx', '')),
+                    "score": score, "key": f"{year}_{season}", "label": _text(row.get('Term number Sx or Wx')),
                     "ws": ws_raw, "views": views, "applied": applied, "details": details,
                     "tw_ok": tw_ok if is_cutoff else "" 
                 })
@@ -440,20 +380,23 @@ def save_comments():
 def get_comments():
     if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
     sid = str(request.json.get("student_id", "")).strip()
-    if not sid: return jsonify({"public": "", "private": ""})
-    
+    return jsonify(get_student_comments(sid))
+
+
+def get_student_comments(sid):
+    if not sid: return {"public": "", "private": ""}
     try:
         with engine.connect() as conn:
             query = text("SELECT Public_comments, PRIVATE_comments FROM S_id_comments WHERE S_id = :sid LIMIT 1")
             result = conn.execute(query, {"sid": sid}).fetchone()
             if result:
-                return jsonify({
+                return {
                     "public": str(result[0]).strip() if result[0] and str(result[0]).lower() != 'none' else "",
                     "private": str(result[1]).strip() if result[1] and str(result[1]).lower() != 'none' else ""
-                })
+                }
     except Exception as e:
         print(f"DB Error get_comments: {e}")
-    return jsonify({"public": "", "private": ""})
+    return {"public": "", "private": ""}
 
 
 
@@ -510,199 +453,22 @@ def update_status():
         priority1_email = get_priority1_email(target_sid)
         power_user_name = session.get('guest_name', 'Coordinator') if session.get('is_guest') else session.get('user_email').split('@')[0]
 
-        val_errors = data.get('validation_errors', [])
-        val_errors_html = "<ul style='margin: 0; padding-left: 20px; font-size: 14px;'>"
-        if not val_errors:
-            val_errors_html += "<li style='color: #27ae60; font-weight: bold;'>✅ No validation errors.</li>"
-        else:
-            for err_html in val_errors:
-                val_errors_html += f"<li style='margin-bottom: 4px;'>{err_html}</li>"
-        val_errors_html += "</ul>"
-
         if status == "APPROVED":
             subject = f"Approved sequence for {student_name} {target_sid} {program}"
-            
-            wt_html = ""
-            for wt in ["WT1", "WT2", "WT3"]:
-                if wt in wt_summary:
-                    info = wt_summary[wt]
-                    change_text = f"<span style='color:#e74c3c; font-weight:bold;'>- {info.get('change_text')}</span>" if info.get('change_text') else "<span style='font-weight:bold; color:#27ae60;'>- NO CHANGE</span>"
-                    wt_html += f"<p style='margin: 4px 0; font-size: 14px;'><b>{wt}:</b> {info.get('new_term')} {change_text}</p>"
-            
-            terms_html = ""
-            if term_summary:
-                terms_html += "<table style='width: 100%; border-collapse: collapse; margin-top: 15px; font-family: Arial, sans-serif; font-size: 13px;'>"
-                terms_html += "<thead><tr style='color: white;'>"
-                terms_html += "<th style='background-color: #34495e; padding: 10px; border: 1px solid #ddd; text-align: center; width: 16%;'>Year</th>"
-                terms_html += "<th style='background-color: #27ae60; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Summer</th>"
-                terms_html += "<th style='background-color: #f39c12; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Fall</th>"
-                terms_html += "<th style='background-color: #3498db; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Winter</th>"
-                terms_html += "</tr></thead><tbody>"
-                
-                for ts in term_summary:
-                    year_str = ts.get('year', '')
-                    data_term = ts.get('data', {})
-                    
-                    terms_html += "<tr>"
-                    terms_html += f"<td rowspan='2' style='padding: 10px; border: 1px solid #ddd; vertical-align: middle; background-color: #f8f9fa; text-align: center; font-weight: bold; color: #333;'>{year_str}</td>"
-                    
-                    for t in ["SUM", "FALL", "WIN"]:
-                        t_data = data_term.get(t, {})
-                        cr = t_data.get('cr', 0)
-                        wt_change = t_data.get('wt_change', '')
-                        wt_note_html = f"<br><span style='color: #c0392b; font-size: 10px; font-weight: bold;'>{wt_change}</span>" if wt_change else ""
-                        
-                        is_curr = t_data.get('is_current_term')
-                        is_inst = t_data.get('is_institute_wt')
-                        is_coop = t_data.get('is_coop')
-                        
-                        bg_col = "#fcfcfc"
-                        text_col = "#333333"
-                        border_col = "#ddd"
-                        
-                        if is_curr:
-                            bg_col = "#fff9c4"
-                            border_col = "#fbc02d"
-                        elif is_inst:
-                            bg_col = "#5DADE2" 
-                            text_col = "#ffffff"
-                        elif is_coop:
-                            bg_col = "#b3e5fc"
-                            
-                        gpa_info = t_data.get('gpa_info')
-                        gpa_html = ""
-                        if gpa_info:
-                            gpa_val = gpa_info.get('val', 0)
-                            gpa_cr = gpa_info.get('credits', 0)
-                            cgpa_val = gpa_info.get('cgpa', 0)
-                            tot_cr = gpa_info.get('tot_cr', 0)
-                            gpa_threshold = gpa_info.get('threshold', 2.0)
-                            
-                            gpa_cr_str = str(gpa_cr).replace('.0', '') if str(gpa_cr).endswith('.0') else str(gpa_cr)
-                            tot_cr_str = str(tot_cr).replace('.0', '') if str(tot_cr).endswith('.0') else str(tot_cr)
-                            
-                            if gpa_val == -1:
-                                gpa_bg = "transparent"
-                                gpa_col = text_col
-                                display_text = f"GPA past {gpa_cr_str}CR : N/A <br> CGPA {cgpa_val} / {tot_cr_str}CR total"
-                            else:
-                                if gpa_val <= gpa_threshold:
-                                    gpa_bg = "#c0392b"
-                                    gpa_col = "#ffffff"
-                                elif gpa_val <= gpa_threshold + 0.2:
-                                    gpa_bg = "#e67e22"
-                                    gpa_col = "#ffffff"
-                                else:
-                                    gpa_bg = "transparent"
-                                    gpa_col = text_col 
-                                display_text = f"GPA past {gpa_cr_str}CR : {gpa_val} <br> CGPA {cgpa_val} / {tot_cr_str}CR total"
-
-                            gpa_html = f"<div style='background-color: {gpa_bg}; color: {gpa_col}; font-size: 10px; padding: 4px; margin-top: 4px; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1); font-weight: normal;'>{display_text}</div>"
-
-                        terms_html += f"<td style='padding: 5px; border: 1px solid {border_col}; text-align: center; font-weight: bold; background-color: {bg_col}; color: {text_col};'>{cr} CR{wt_note_html}{gpa_html}</td>"
-                    
-                    terms_html += "</tr><tr>"
-                    
-                    for t in ["SUM", "FALL", "WIN"]:
-                        t_data = data_term.get(t, {})
-                        courses = t_data.get('courses', [])
-                        
-                        is_curr = t_data.get('is_current_term')
-                        is_inst = t_data.get('is_institute_wt')
-                        is_coop = t_data.get('is_coop')
-                        
-                        bg_col = "#ffffff"
-                        border_col = "#ddd"
-                        
-                        if is_curr:
-                            bg_col = "#fffde7"
-                            border_col = "#fbc02d"
-                        elif is_inst:
-                            bg_col = "#AED6F1" 
-                        elif is_coop:
-                            bg_col = "#e1f5fe"
-                            
-                        courses_html = ""
-                        for c in courses:
-                            if c.get('is_wt'):
-                                courses_html += f"<div style='background-color: #d5f5e3; font-weight: bold; padding: 4px; border-radius: 4px; color: #27ae60; border: 1px solid #abebc6; margin-bottom: 3px; text-align: center;'>{c.get('name')}</div>"
-                            else:
-                                c_text_col = "#154360" if is_inst else "#333333"
-                                c_sub_col = "#2980B9" if is_inst else "#7f8c8d"
-                                courses_html += f"<div style='margin-bottom: 2px; text-align: center; color: {c_text_col};'>{c.get('name')} <span style='font-size: 11px; color: {c_sub_col};'>({c.get('credit')} cr)</span></div>"
-                                
-                        terms_html += f"<td style='padding: 10px; border: 1px solid {border_col}; vertical-align: top; background-color: {bg_col};'>{courses_html}</td>"
-                    terms_html += "</tr>"
-                    
-                terms_html += "</tbody></table>"
-
-            html_body = f"""
-            <div style="font-family: Arial, sans-serif; color: #333; max-width: 750px; margin: 0 auto; border: 1px solid #e0e0e0; padding: 20px; border-radius: 8px;">
-                <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">Approved Course Sequence</h2>
-                <p><b>Student Email:</b> {submitter_email}</p>
-                <p><b>Student Name:</b> {student_name}</p>
-                <p><b>Student ID:</b> {target_sid}</p>
-                <p><b>Program:</b> {program}</p>
-                
-                <div style="background-color: #f0f7ff; border-left: 4px solid #3498db; padding: 10px; margin: 15px 0;">
-                    {wt_html}
-                </div>
-                
-                <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
-                
-                <p><b>MIAE COOP AD/PA Comments:</b></p>
-                <div style="background-color: #e8f5e9; border: 1px solid #c8e6c9; padding: 12px; border-radius: 5px; white-space: pre-wrap; font-style: italic; margin-bottom: 15px;">{pub_comment if pub_comment else 'No additional comments.'}</div>
-                
-                <h3 style="color: #2c3e50; margin-top: 25px; border-bottom: 1px solid #eee; padding-bottom: 5px;">Automated System Check:</h3>
-                <div style="background-color: #fcfcfc; border: 1px solid #eee; padding: 10px; border-radius: 4px; margin-bottom: 15px;">
-                    {val_errors_html}
-                </div>
-
-                <p><b>Student's Justification / Comments:</b></p>
-                <div style="background-color: #f9f9f9; border: 1px solid #ddd; padding: 12px; border-radius: 5px; white-space: pre-wrap; font-style: italic; margin-bottom: 25px;">{justification if justification else 'No comments provided.'}</div>
-
-                <h3 style="color: #2c3e50; margin-top: 25px; border-bottom: 1px solid #eee; padding-bottom: 5px;">Approved Sequence Breakdown</h3>
-                {terms_html}
-                
-                <p style="margin-top: 30px;">Best Regards,<br><b>{power_user_name}</b></p>
-            </div>
-            """
-            
+            html_body = email_templates.render("approved", submitter_email=submitter_email, student_name=student_name,
+                                               student_id=target_sid, program=program, wt_summary=wt_summary,
+                                               term_summary=term_summary, validation_errors=data.get('validation_errors', []),
+                                               pub_comment=pub_comment, justification=justification, power_user_name=power_user_name)
         else: # REWORK
             subject = f"REWORK for {student_name} ({target_sid}) - sequence submitted on {original_timestamp_title}"
-            html_body = f"""
-            <div style="font-family: Arial, sans-serif; color: #333; max-width: 750px; margin: 0 auto; border: 1px solid #e0e0e0; padding: 20px; border-radius: 8px;">
-                <h2 style="color: #c0392b; border-bottom: 2px solid #e74c3c; padding-bottom: 10px;">Action Required: Course Sequence Rework</h2>
-                <p><b>Student Email:</b> {submitter_email}</p>
-                <p><b>Student Name:</b> {student_name}</p>
-                <p><b>Student ID:</b> {target_sid}</p>
-                <p><b>Program:</b> {program}</p>
-                
-                <p style="margin-top: 20px;">Hello {student_name},</p>
-                <p>Please consider the comments and the validation errors below to update your sequence.</p>
-                
-                <p><b>MIAE COOP AD/PA Comments:</b></p>
-                <div style="background-color: #fff8e1; border-left: 4px solid #f39c12; padding: 10px; border-radius: 5px; white-space: pre-wrap; margin: 15px 0;">{pub_comment if pub_comment else 'Please review your sequence rules.'}</div>
-                
-                <h3 style="color: #2c3e50; margin-top: 20px; border-bottom: 1px solid #eee; padding-bottom: 5px;">Automated System Check:</h3>
-                <div style="background-color: #fdf2f2; border: 1px solid #fadbd8; padding: 10px; border-radius: 4px; margin-bottom: 15px;">
-                    {val_errors_html}
-                </div>
-
-               
-                <div style="text-align: center; margin: 35px 0;">
-                    <a href="https://concordia-sequence-planner.onrender.com/" style="background-color: #e74c3c; color: #ffffff; padding: 14px 28px; text-decoration: none; border-radius: 6px; font-weight: bold; font-size: 16px; display: inline-block; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">Log in to Update Sequence</a>
-                </div>
-                
-                <br>
-                <p>Best Regards,<br><b>{power_user_name}</b></p>
-            </div>
-            """
+            html_body = email_templates.render("rework", submitter_email=submitter_email, student_name=student_name,
+                                               student_id=target_sid, program=program, validation_errors=data.get('validation_errors', []),
+                                               pub_comment=pub_comment, power_user_name=power_user_name)
                     
         email_data = get_email_recipients(program, target_sid, submitter_email, priority1_email, status)
 
         try:
-            resend.Emails.send({
+            email_outbox.enqueue({
                 "from": "MIAE Planner <auth@concordiasequenceplanner.ca>",
                 "to": email_data["to"],
                 "cc": email_data["cc"],
@@ -710,7 +476,7 @@ def update_status():
                 "reply_to": "coop_miae@concordia.ca",
                 "subject": subject,      
                 "html": html_body         
-            })
+            }, kind="status")
         except Exception as e:
             print(f"Eroare la trimitere email: {e}")
             
@@ -725,67 +491,60 @@ def health_check():
     return "OK", 200
 
 
+@app.route("/api/catalog_stats", methods=["GET"])
+def api_catalog_stats():
+    if not str(session.get('student_id', '')).startswith('9'):
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(dict(catalog.cache_stats(), result_cache=planner.result_cache_stats()))
+
+
+@app.route("/api/planner_metrics", methods=["GET"])
+def api_planner_metrics():
+    """Solver counters aggregated over every /generate and batch request since start-up."""
+    if not str(session.get('student_id', '')).startswith('9'):
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(planner.planner_metrics())
+
+
 @app.route("/", methods=["GET"])
 def index():
     if 'user_email' not in session: return redirect(url_for('login'))
     
-    df = load_data()
-    df.columns = [str(c).strip().upper() for c in df.columns]
-    
-    programs = []
-    if not df.empty and 'PROGRAM' in df.columns:
-        df['PROGRAM'] = df['PROGRAM'].astype(str).replace(r'\s+', ' ', regex=True).str.strip()
-        programs = sorted(df['PROGRAM'].unique().tolist())
-        programs = [p for p in programs if p and p.lower() != 'nan']
-    else:
+    try: programs = catalog.get_program_names()
+    except Exception as e:
+        print(f"Error loading Excel: {e}")
+        programs = []
+    if not programs:
         programs = ["Mechanical Engineering", "Industrial Engineering"]
         
     current_sid = str(session.get('student_id', ''))
     is_guest = session.get('is_guest', False)
     is_power_user = current_sid.startswith('9') and not is_guest
     viewing_sid = session.get('admin_view_sid', current_sid) if not is_guest else f"{current_sid} - GUEST"
-    coop_data = get_student_coop_data(viewing_sid) if not is_guest else {"found": False}
-    
-    pending_list = []
-    if is_power_user:
-        try:
-            with engine.connect() as conn:
-                query = text("SELECT * FROM Saved_Sequences WHERE status = 'PENDING APPROVAL' ORDER BY Date_Saved DESC")
-                df_pending = pd.read_sql(query, conn)
-                for _, r in df_pending.iterrows():
-                    def safe_json(val):
-                        if pd.notna(val) and str(val).strip() and str(val).lower() != 'none':
-                            try: return json.loads(str(val))
-                            except: return {}
-                        return {}
-                        
-                    pending_list.append({
-                        "email": r.get('Student_Email', 'N/A'),
-                        "name": r.get('Sequence_Name', 'Untitled'),
-                        "program": r.get('Program', ''),
-                        "sequence_data": safe_json(r.get('JSON_Data')),
-                        "timestamp": str(r.get('Date_Saved', '')),
-                        "term_data": safe_json(r.get('Term_Json_data')),
-                        "settings_data": safe_json(r.get('sequence_Json_data')),
-                        "status": r.get('status', ''),
-                        "justification": r.get('student_comments', ''),
-                        "student_id": str(r.get('student_id', '')),
-                        "student_name": r.get('student_id_name', '')
-                    })
-        except Exception as e:
-            print(f"Pending List DB Error: {e}")
-            
-    ft_credits_dict = get_program_ft_credits()
-    gpa_thresholds_dict = get_program_gpa_thresholds() 
 
-    restrictions_list = get_restrictions()
+    # Datele de referință (FT / GPA / restricții) și cele ale studentului vin după randare,
+    # din /api/reference_data și /api/student_bundle, în paralel
+    return render_template("planner.html", programe=programs,
+                           is_power_user=is_power_user, viewing_sid=viewing_sid)
 
-    return render_template("planner.html", programe=programs, coop_data_json=json.dumps(coop_data),
-                           is_power_user=is_power_user, viewing_sid=viewing_sid, pending_list=pending_list,
-                           program_ft_credits_json=json.dumps(ft_credits_dict),
-                           program_gpa_thresholds_json=json.dumps(gpa_thresholds_dict),
-                           restrictions_json=json.dumps(restrictions_list))
 
+# Date comune tuturor utilizatorilor: cacheabile în browser, cu ETag pentru revalidare
+REFERENCE_DATA_MAX_AGE_S = int(os.environ.get("REFERENCE_DATA_MAX_AGE_S", "300"))
+
+
+@app.route("/api/reference_data", methods=["GET"])
+def api_reference_data():
+    """FT credit limits, 2-term GPA thresholds and restriction rules for the planner page."""
+    if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
+
+    ft_credits, gpa_thresholds = get_program_settings()
+    payload = {"program_ft_credits": ft_credits, "program_gpa_thresholds": gpa_thresholds,
+               "restrictions": get_restrictions()}
+    # Fără jsonify: ordinea coloanelor din sheet-ul de restricții contează în client (coloana H = keys[7])
+    response = Response(json.dumps(payload, default=str), mimetype="application/json")
+    response.headers["Cache-Control"] = f"private, max-age={REFERENCE_DATA_MAX_AGE_S}"
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route("/admin_change_sid", methods=["POST"])
@@ -828,13 +587,14 @@ def handle_otp_logic(email, sid, is_guest=False, guest_name=''):
                     session['temp_guest_name'] = guest_name
                     return
                     
-            conn.execute(text("UPDATE logins SET used = 1 WHERE email = :email"), {"email": email})
-            
             otp = str(random.randint(100000, 999999))
             is_sent, resend_msg = send_otp_email(email, otp)
             
-            conn.execute(text("INSERT INTO logins (email, time, login_code, used) VALUES (:email, :time, :code, 0)"), 
-                         {"email": email, "time": now.strftime(fmt), "code": otp})
+            # Codul se salvează doar dacă mesajul a intrat în outbox; altfel următoarea cerere ar spune "A code was already sent"
+            if is_sent:
+                conn.execute(text("UPDATE logins SET used = 1 WHERE email = :email"), {"email": email})
+                conn.execute(text("INSERT INTO logins (email, time, login_code, used) VALUES (:email, :time, :code, 0)"), 
+                             {"email": email, "time": now.strftime(fmt), "code": otp})
             
             valid_until = (now + datetime.timedelta(minutes=30)).strftime('%H:%M:%S')
             nowtime = now.strftime('%H:%M:%S')
@@ -842,7 +602,7 @@ def handle_otp_logic(email, sid, is_guest=False, guest_name=''):
             if is_sent:
                 session['otp_message'] = f"✅ {resend_msg} to {email}! Please enter the access code below. The code is valid until {valid_until}. FYI, server's time is now {nowtime}."
             else:
-                session['otp_message'] = f"❌ Error sending email via Resend API: {resend_msg}"
+                session['otp_message'] = f"❌ The access code email could not be queued, please try again: {resend_msg}"
             
             session['pre_auth_email'] = email
             session['temp_sid'] = sid
@@ -876,7 +636,7 @@ def login():
                 if priority1_email:
                     try:
                         www = "https://concordia-sequence-planner.onrender.com/"
-                        resend.Emails.send({
+                        email_outbox.enqueue({
                             "from": "MIAE Planner <auth@concordiasequenceplanner.ca>",
                             "to": [priority1_email],
                             "subject": "Security Alert: Unauthorized Login Attempt",
@@ -893,9 +653,9 @@ def login():
                             </div>
                             """,
                             "reply_to": "coop_miae@concordia.ca"
-                        })
+                        }, kind="security_alert")
                     except Exception as mail_err:
-                        print(f"Failed to send security alert email: {mail_err}")
+                        print(f"Failed to queue security alert email: {mail_err}")
 
                     parts = priority1_email.split('@')
                     if len(parts) == 2:
@@ -988,43 +748,86 @@ def api_get_coop_data():
     return jsonify(coop_data)
 
 
+# Lista de aprobări aduce doar coloanele mici; JSON-urile secvenței vin la deschidere (/api/pending_approvals/detail)
+PENDING_PAGE_SIZE = 50
+PENDING_MAX_PAGE_SIZE = 200
+PENDING_SUMMARY_COLUMNS = "Student_Email, Sequence_Name, Program, Date_Saved, status, student_comments, student_id, student_id_name"
+
+
+def _is_power_user():
+    return str(session.get('student_id', '')).startswith('9') and not session.get('is_guest', False)
+
+
 @app.route("/api/pending_approvals", methods=["GET"])
 def get_pending_approvals():
-    current_sid = str(session.get('student_id', ''))
-    is_guest = session.get('is_guest', False)
-    if not (current_sid.startswith('9') and not is_guest):
-        return jsonify([]) 
-        
-    pending_list = []
+    """One page of pending sequences, newest first: {"items", "total", "page", "per_page"} (no sequence JSON)."""
+    if not _is_power_user():
+        return jsonify({"items": [], "total": 0, "page": 1, "per_page": 0})
+
+    try: page = max(1, int(request.args.get("page", 1)))
+    except ValueError: page = 1
+    try: per_page = min(max(0, int(request.args.get("per_page", PENDING_PAGE_SIZE))), PENDING_MAX_PAGE_SIZE)
+    except ValueError: per_page = PENDING_PAGE_SIZE
+
+    items = fetch_pending_sequences(per_page, (page - 1) * per_page) if per_page else []
+    return jsonify({"items": items, "total": count_pending_sequences(), "page": page, "per_page": per_page})
+
+
+@app.route("/api/pending_approvals/detail", methods=["GET"])
+def get_pending_approval_detail():
+    """The full pending sequence (with its JSON data), identified like in /update_status by student_id + timestamp."""
+    if not _is_power_user():
+        return jsonify({"error": "Unauthorized"}), 403
+    sid = request.args.get("student_id", "").strip()
+    ts = request.args.get("timestamp", "").strip()
+    if not sid or not ts: return jsonify({"error": "Missing student_id or timestamp"}), 400
+
     try:
+        query = text("SELECT * FROM Saved_Sequences WHERE student_id = :sid AND Date_Saved = :ts LIMIT 1")
         with engine.connect() as conn:
-            query = text("SELECT * FROM Saved_Sequences WHERE status = 'PENDING APPROVAL' ORDER BY Date_Saved DESC")
-            df = pd.read_sql(query, conn)
-            
-            for _, r in df.iterrows():
-                def safe_json(val):
-                    if pd.notna(val) and str(val).strip() and str(val).lower() != 'none':
-                        try: return json.loads(str(val))
-                        except: return {}
-                    return {}
-
-                pending_list.append({
-                    "email": r.get('Student_Email', 'N/A'),
-                    "name": r.get('Sequence_Name', 'Untitled'),
-                    "program": r.get('Program', ''),
-                    "sequence_data": safe_json(r.get('JSON_Data')),
-                    "timestamp": str(r.get('Date_Saved', '')),
-                    "term_data": safe_json(r.get('Term_Json_data')),
-                    "settings_data": safe_json(r.get('sequence_Json_data')),
-                    "student_id": str(r.get('student_id', '')),
-                    "student_name": r.get('student_id_name', ''),
-                    "status": r.get('status', ''),
-                    "justification": r.get('student_comments', '')
-                })
+            row = next(iter(sequence_store.resolve_rows(conn, stream_rows(query, {"sid": sid, "ts": ts}, conn=conn))), None)
+    except Exception as e:
+        print(f"Pending Detail DB Error: {e}")
+        return jsonify({"error": str(e)}), 500
+    if row is None: return jsonify({"error": "Sequence not found"}), 404
+    return jsonify(dict(_pending_summary(row),
+                        sequence_data=_json_cell(row.get('JSON_Data')),
+                        term_data=_json_cell(row.get('Term_Json_data')),
+                        settings_data=_json_cell(row.get('sequence_Json_data'))))
+
+
+def _pending_summary(r):
+    return {
+        "email": r.get('Student_Email', 'N/A'),
+        "name": r.get('Sequence_Name', 'Untitled'),
+        "program": r.get('Program', ''),
+        "timestamp": _text(r.get('Date_Saved')),
+        "student_id": _text(r.get('student_id')),
+        "student_name": r.get('student_id_name', ''),
+        "status": r.get('status', ''),
+        "justification": r.get('student_comments', '')
+    }
+
+
+def fetch_pending_sequences(limit=PENDING_PAGE_SIZE, offset=0):
+    pending_list = []
+    try:
+        query = text(f"SELECT {PENDING_SUMMARY_COLUMNS} FROM Saved_Sequences WHERE status = 'PENDING APPROVAL' "
+                     "ORDER BY Date_Saved DESC LIMIT :limit OFFSET :offset")
+        for r in stream_rows(query, {"limit": limit, "offset": offset}):
+            pending_list.append(_pending_summary(r))
     except Exception as e:
         print(f"Pending List DB Error: {e}")
-        
-    return jsonify(pending_list)
+    return pending_list
+
+
+def count_pending_sequences():
+    try:
+        with engine.connect() as conn:
+            return int(conn.execute(text("SELECT COUNT(*) FROM Saved_Sequences WHERE status = 'PENDING APPROVAL'")).scalar() or 0)
+    except Exception as e:
+        print(f"Pending Count DB Error: {e}")
+        return 0
 
 
 @app.route("/save_sequence", methods=["POST"])
@@ -1062,6 +865,18 @@ def save_sequence():
         timestamp = str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
         with engine.begin() as conn:
+            # JSON-urile merg comprimate în Sequence_Blobs; în rând rămân doar referințele (dedup după hash).
+            # Versiunea nouă se poate stoca drept diferență față de precedenta sau de secvența standard a programului.
+            prev = conn.execute(text(f"SELECT SUBSTR(JSON_Data, 1, {sequence_store.REF_LENGTH}), SUBSTR(Term_Json_data, 1, {sequence_store.REF_LENGTH}), "
+                                     f"SUBSTR(sequence_Json_data, 1, {sequence_store.REF_LENGTH}) FROM Saved_Sequences "
+                                     "WHERE student_id = :sid ORDER BY Date_Saved DESC LIMIT 1"), {"sid": target_id}).fetchone() or (None, None, None)
+            standard = planner.standard_sequence_for(program)
+            seq_bases = [prev[0]]
+            if standard:
+                seq_bases.append(sequence_store.put(conn, sequence_store.standard_base(standard, nested='placed' in data.get('sequence_data', {}))))
+            seq_json = sequence_store.put(conn, seq_json, bases=seq_bases)
+            term_json = sequence_store.put(conn, term_json, bases=[prev[1]])
+            settings_json = sequence_store.put(conn, settings_json, bases=[prev[2]])
             query = text("""
                 INSERT INTO Saved_Sequences 
                 (Student_Email, Sequence_Name, Program, JSON_Data, Date_Saved, Term_Json_data, sequence_Json_data, status, student_comments, student_id, student_id_name)
@@ -1099,163 +914,12 @@ def save_sequence():
                 priority1_email = get_priority1_email(target_id)
                 recipients = get_email_recipients(program, target_id, email_to_save, priority1_email, "SUBMIT")
                 
-                wt_summary = data.get('wt_summary', {})
-                term_summary = data.get('term_summary', [])
-                
-                wt_html = ""
-                for wt in ["WT1", "WT2", "WT3"]:
-                    if wt in wt_summary:
-                        info = wt_summary[wt]
-                        change_text = f"<span style='color:#e74c3c; font-weight:bold;'>- {info.get('change_text')}</span>" if info.get('change_text') else "<span style='font-weight:bold; color:#27ae60;'>- NO CHANGE</span>"
-                        wt_html += f"<p style='margin: 4px 0; font-size: 14px;'><b>{wt}:</b> {info.get('new_term')} {change_text}</p>"
+                html_body = email_templates.render("submit", submitter_email=email_to_save, student_name=current_name,
+                                                   student_id=target_id, program=program, wt_summary=data.get('wt_summary', {}),
+                                                   term_summary=data.get('term_summary', []), validation_errors=data.get('validation_errors', []),
+                                                   justification=student_answer_clean)
                 
-                terms_html = ""
-                if term_summary:
-                    terms_html += "<table style='width: 100%; border-collapse: collapse; margin-top: 15px; font-family: Arial, sans-serif; font-size: 13px;'>"
-                    terms_html += "<thead><tr style='color: white;'>"
-                    terms_html += "<th style='background-color: #34495e; padding: 10px; border: 1px solid #ddd; text-align: center; width: 16%;'>Year</th>"
-                    terms_html += "<th style='background-color: #27ae60; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Summer</th>"
-                    terms_html += "<th style='background-color: #f39c12; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Fall</th>"
-                    terms_html += "<th style='background-color: #3498db; padding: 10px; border: 1px solid #ddd; text-align: center; width: 28%;'>Winter</th>"
-                    terms_html += "</tr></thead><tbody>"
-                    
-                    for ts in term_summary:
-                        year_str = ts.get('year', '')
-                        data_term = ts.get('data', {})
-                        
-                        terms_html += "<tr>"
-                        terms_html += f"<td rowspan='2' style='padding: 10px; border: 1px solid #ddd; vertical-align: middle; background-color: #f8f9fa; text-align: center; font-weight: bold; color: #333;'>{year_str}</td>"
-                        
-                        for t in ["SUM", "FALL", "WIN"]:
-                            t_data = data_term.get(t, {})
-                            cr = t_data.get('cr', 0)
-                            wt_change = t_data.get('wt_change', '')
-                            wt_note_html = f"<br><span style='color: #c0392b; font-size: 10px; font-weight: bold;'>{wt_change}</span>" if wt_change else ""
-                            
-                            is_curr = t_data.get('is_current_term')
-                            is_inst = t_data.get('is_institute_wt')
-                            is_coop = t_data.get('is_coop')
-                            
-                            bg_col = "#fcfcfc"
-                            text_col = "#333333"
-                            border_col = "#ddd"
-                            
-                            if is_curr:
-                                bg_col = "#fff9c4"
-                                border_col = "#fbc02d"
-                            elif is_inst:
-                                bg_col = "#5DADE2" 
-                                text_col = "#ffffff"
-                            elif is_coop:
-                                bg_col = "#b3e5fc"
-                                
-                            gpa_info = t_data.get('gpa_info')
-                            gpa_html = ""
-                            if gpa_info:
-                                gpa_val = gpa_info.get('val', 0)
-                                gpa_cr = gpa_info.get('credits', 0)
-                                cgpa_val = gpa_info.get('cgpa', 0)
-                                tot_cr = gpa_info.get('tot_cr', 0)
-                                gpa_threshold = gpa_info.get('threshold', 2.0)
-                                
-                                gpa_cr_str = str(gpa_cr).replace('.0', '') if str(gpa_cr).endswith('.0') else str(gpa_cr)
-                                tot_cr_str = str(tot_cr).replace('.0', '') if str(tot_cr).endswith('.0') else str(tot_cr)
-                                
-                                if gpa_val == -1:
-                                    gpa_bg = "transparent"
-                                    gpa_col = text_col
-                                    display_text = f"GPA past {gpa_cr_str}CR : N/A  <br> CGPA {cgpa_val} / {tot_cr_str}CR total"
-                                else:
-                                    if gpa_val <= gpa_threshold:
-                                        gpa_bg = "#c0392b"
-                                        gpa_col = "#ffffff"
-                                    elif gpa_val <= gpa_threshold + 0.2:
-                                        gpa_bg = "#e67e22"
-                                        gpa_col = "#ffffff"
-                                    else:
-                                        gpa_bg = "transparent"
-                                        gpa_col = text_col 
-                                    display_text = f"GPA past {gpa_cr_str}CR : {gpa_val}  <br> CGPA {cgpa_val} / {tot_cr_str}CR total"
-
-                                gpa_html = f"<div style='background-color: {gpa_bg}; color: {gpa_col}; font-size: 10px; padding: 4px; margin-top: 4px; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1); font-weight: normal;'>{display_text}</div>"
-
-                            terms_html += f"<td style='padding: 5px; border: 1px solid {border_col}; text-align: center; font-weight: bold; background-color: {bg_col}; color: {text_col};'>{cr} CR{wt_note_html}{gpa_html}</td>"
-                        
-                        terms_html += "</tr><tr>"
-
-                        for t in ["SUM", "FALL", "WIN"]:
-                            t_data = data_term.get(t, {})
-                            courses = t_data.get('courses', [])
-                            
-                            is_curr = t_data.get('is_current_term')
-                            is_inst = t_data.get('is_institute_wt')
-                            is_coop = t_data.get('is_coop')
-                            
-                            bg_col = "#ffffff"
-                            border_col = "#ddd"
-                            
-                            if is_curr:
-                                bg_col = "#fffde7"
-                                border_col = "#fbc02d"
-                            elif is_inst:
-                                bg_col = "#AED6F1" 
-                            elif is_coop:
-                                bg_col = "#e1f5fe"
-                                
-                            courses_html = ""
-                            for c in courses:
-                                if c.get('is_wt'):
-                                    courses_html += f"<div style='background-color: #d5f5e3; font-weight: bold; padding: 4px; border-radius: 4px; color: #27ae60; border: 1px solid #abebc6; margin-bottom: 3px; text-align: center;'>{c.get('name')}</div>"
-                                else:
-                                    c_text_col = "#154360" if is_inst else "#333333"
-                                    c_sub_col = "#2980B9" if is_inst else "#7f8c8d"
-                                    courses_html += f"<div style='margin-bottom: 2px; text-align: center; color: {c_text_col};'>{c.get('name')} <span style='font-size: 11px; color: {c_sub_col};'>({c.get('credit')} cr)</span></div>"
-                                    
-                            terms_html += f"<td style='padding: 10px; border: 1px solid {border_col}; vertical-align: top; background-color: {bg_col};'>{courses_html}</td>"
-                        terms_html += "</tr>"
-                        
-                    terms_html += "</tbody></table>"
-
-                val_errors = data.get('validation_errors', [])
-                val_errors_html = "<ul style='margin: 0; padding-left: 20px; font-size: 14px;'>"
-                if not val_errors:
-                    val_errors_html += "<li style='color: #27ae60; font-weight: bold;'>✅ No validation errors.</li>"
-                else:
-                    for err_html in val_errors:
-                        val_errors_html += f"<li style='margin-bottom: 4px;'>{err_html}</li>"
-                val_errors_html += "</ul>"
-
-                html_body = f"""
-                <div style="font-family: Arial, sans-serif; color: #333; max-width: 750px; margin: 0 auto; border: 1px solid #e0e0e0; padding: 20px; border-radius: 8px;">
-                    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">New Course Sequence Submitted for Approval</h2>
-                    <p><b>Student Email:</b> {email_to_save}</p>
-                    <p><b>Student Name:</b> {current_name}</p>
-                    <p><b>Student ID:</b> {target_id}</p>
-                    <p><b>Program:</b> {program}</p>
-                    
-                    <div style="background-color: #f0f7ff; border-left: 4px solid #3498db; padding: 10px; margin: 15px 0;">
-                        {wt_html}
-                    </div>
-                    
-                    <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
-
-                    <h3 style="color: #2c3e50; margin-top: 15px; border-bottom: 1px solid #eee; padding-bottom: 5px;">Automated System Check</h3>
-                    <div style="background-color: #fdf2f2; border: 1px solid #fadbd8; padding: 10px; border-radius: 4px; margin-bottom: 15px;">
-                        {val_errors_html}
-                    </div>
-                    
-                    <p><b>Student's Justification / Comments:</b><br>
-                    <span style="color: #c0392b; background-color: #fdf2f2; padding: 10px; display: inline-block; margin-top: 5px; border-radius: 4px; border: 1px solid #fadbd8; width: 95%; white-space: pre-wrap;">{student_answer_clean if student_answer_clean else '✅ Sequence is valid. No warnings or justification provided.'}</span></p>
-                    <h3 style="color: #2c3e50; margin-top: 25px; border-bottom: 1px solid #eee; padding-bottom: 5px;">Submitted Sequence Breakdown</h3>
-                    {terms_html}
-                    
-                    <div style="text-align: center; margin: 35px 0;">
-                        <a href="https://concordia-sequence-planner.onrender.com/" style="background-color: #2742ae; color: #ffffff; padding: 14px 28px; text-decoration: none; border-radius: 6px; font-weight: bold; font-size: 16px; display: inline-block; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">Log in to Review Sequence</a>
-                    </div>
-                </div>
-                """
-                
-                resend.Emails.send({
+                email_outbox.enqueue({
                     "from": "MIAE Planner <auth@concordiasequenceplanner.ca>", 
                     "to": recipients.get("to", []),
                     "cc": recipients.get("cc", []),
@@ -1263,7 +927,7 @@ def save_sequence():
                     "subject": f"Change of Sequence Approval Requested for {target_id} ({program})",
                     "html": html_body,
                     "reply_to": email_to_save 
-                })
+                }, kind="submit")
             except Exception as mail_err:
                 print(f"Eroare la trimiterea e-mailului: {mail_err}")
 
@@ -1273,48 +937,110 @@ def save_sequence():
         return jsonify({"error": str(e)}), 500
     
 
+def _sequence_owner():
+    """(by_student, params) for the Saved_Sequences rows the session may open: the viewed student's
+    (student_id = :val) for a power user, the user's own (LOWER(Student_Email) = :val) otherwise.
+    The callers keep one literal query per case, so `migrations.py check` can EXPLAIN both."""
+    current_sid = str(session.get('student_id', ''))
+    is_power_user = current_sid.startswith('9') and not session.get('is_guest', False)
+    viewing_sid = str(session.get('admin_view_sid', current_sid)).strip()
+    if is_power_user and viewing_sid and viewing_sid != "ADMIN":
+        return True, {"val": viewing_sid}
+    return False, {"val": session['user_email'].lower().strip()}
+
+
+def _sequence_record(r):
+    return {
+        "Sequence_Name": r.get('Sequence_Name', 'Untitled'),
+        "Program": r.get('Program', ''),
+        "Date_Saved": _text(r.get('Date_Saved')),
+        "JSON_Data": _json_cell(r.get('JSON_Data')), 
+        "Term_Data": _json_cell(r.get('Term_Json_data')), 
+        "Settings_Data": _json_cell(r.get('sequence_Json_data')),
+        "Status": r.get('status', ''),
+        "Student_ID": _text(r.get('student_id')),
+        "Student_Name": r.get('student_id_name', '')
+    }
+
+
 @app.route("/load_sequences", methods=["GET"])
 def load_sequences():
     if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
     try:
-        current_sid = str(session.get('student_id', ''))
-        is_power_user = current_sid.startswith('9') and not session.get('is_guest', False)
-        viewing_sid = str(session.get('admin_view_sid', current_sid)).strip()
-        target_email = session['user_email'].lower().strip()
-        
+        by_student, params = _sequence_owner()
+        if by_student:
+            query = text("SELECT * FROM Saved_Sequences WHERE student_id = :val ORDER BY Date_Saved DESC")
+        else:
+            query = text("SELECT * FROM Saved_Sequences WHERE LOWER(Student_Email) = :val ORDER BY Date_Saved DESC")
         with engine.connect() as conn:
-            if is_power_user and viewing_sid and viewing_sid != "ADMIN":
-                query = text("SELECT * FROM Saved_Sequences WHERE student_id = :val ORDER BY Date_Saved DESC")
-                df = pd.read_sql(query, conn, params={"val": viewing_sid})
-            else:
-                query = text("SELECT * FROM Saved_Sequences WHERE LOWER(Student_Email) = :val ORDER BY Date_Saved DESC")
-                df = pd.read_sql(query, conn, params={"val": target_email})
-                
-            my_recs = []
-            for _, r in df.iterrows():
-                def safe_json(val):
-                    if pd.notna(val) and str(val).strip() and str(val).lower() != 'none':
-                        try: return json.loads(str(val))
-                        except: return {}
-                    return {}
-                    
-                my_recs.append({
-                    "Sequence_Name": r.get('Sequence_Name', 'Untitled'),
-                    "Program": r.get('Program', ''),
-                    "Date_Saved": str(r.get('Date_Saved', '')),
-                    "JSON_Data": safe_json(r.get('JSON_Data')), 
-                    "Term_Data": safe_json(r.get('Term_Json_data')), 
-                    "Settings_Data": safe_json(r.get('sequence_Json_data')),
-                    "Status": r.get('status', ''),
-                    "Student_ID": str(r.get('student_id', '')),
-                    "Student_Name": r.get('student_id_name', '')
-                })
+            my_recs = [_sequence_record(r) for r in sequence_store.resolve_rows(conn, stream_rows(query, params, conn=conn))]
         return jsonify({"sequences": my_recs}) 
     except Exception as e:
         print(f"Load Error DB: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+# Doar referința (primele REF_LENGTH caractere); rândurile vechi, cu JSON inline, nu sunt transferate întregi
+SEQUENCE_HISTORY_SELECT = f"""
+    SELECT s.Sequence_Name, s.Program, s.Date_Saved, s.status, s.student_id, s.student_id_name,
+           b.codec, b.size, b.depth, b.base_hash, b.hash
+    FROM Saved_Sequences s
+    LEFT JOIN Sequence_Blobs b ON b.hash = SUBSTR(s.JSON_Data, {len(sequence_store.REF_PREFIX) + 1}, 64)
+                              AND s.JSON_Data LIKE '{sequence_store.REF_PREFIX}%'
+"""
+
+
+@app.route("/api/sequence_history", methods=["GET"])
+def api_sequence_history():
+    """Version list (newest first) without the plan JSON: name, status, and how each version is stored."""
+    if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
+    try:
+        by_student, params = _sequence_owner()
+        if by_student:
+            query = text(f"{SEQUENCE_HISTORY_SELECT} WHERE s.student_id = :val ORDER BY s.Date_Saved DESC")
+        else:
+            query = text(f"{SEQUENCE_HISTORY_SELECT} WHERE LOWER(s.Student_Email) = :val ORDER BY s.Date_Saved DESC")
+        with engine.connect() as conn:
+            versions = [{
+                "Sequence_Name": r.get('Sequence_Name', 'Untitled'),
+                "Program": r.get('Program', ''),
+                "Date_Saved": _text(r.get('Date_Saved')),
+                "Status": r.get('status', ''),
+                "Student_ID": _text(r.get('student_id')),
+                "Student_Name": r.get('student_id_name', ''),
+                "hash": r.get('hash'),
+                "storage": r.get('codec') or "inline",
+                "size": r.get('size'),
+                "depth": r.get('depth') or 0,
+                "base_hash": r.get('base_hash'),
+            } for r in stream_rows(query, params, conn=conn)]
+        return jsonify({"versions": versions})
+    except Exception as e:
+        print(f"History Error DB: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/sequence_version", methods=["GET"])
+def api_sequence_version():
+    """One saved version (identified by its Date_Saved among the rows the session may open), rebuilt from its blobs."""
+    if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
+    ts = request.args.get("timestamp", "").strip()
+    if not ts: return jsonify({"error": "Missing timestamp"}), 400
+    try:
+        by_student, params = _sequence_owner()
+        if by_student:
+            query = text("SELECT * FROM Saved_Sequences WHERE student_id = :val AND Date_Saved = :ts LIMIT 1")
+        else:
+            query = text("SELECT * FROM Saved_Sequences WHERE LOWER(Student_Email) = :val AND Date_Saved = :ts LIMIT 1")
+        with engine.connect() as conn:
+            rows = sequence_store.resolve_rows(conn, stream_rows(query, dict(params, ts=ts), conn=conn))
+    except Exception as e:
+        print(f"Version Error DB: {e}")
+        return jsonify({"error": str(e)}), 500
+    if not rows: return jsonify({"error": "Sequence not found"}), 404
+    return jsonify(_sequence_record(rows[0]))
+
+
 @app.route("/get_transcript", methods=["POST"])
 def get_transcript():
     if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
@@ -1324,13 +1050,16 @@ def get_transcript():
         return jsonify({"transcript": [], "student_name": f"GUEST - {session.get('guest_name', 'Unknown')}", "suggested_program": ""})
     if not target_id or target_id == "ADMIN": 
         return jsonify({"transcript": [], "student_name": "", "suggested_program": ""})
+    return jsonify(load_transcript(target_id))
+
 
+def load_transcript(target_id):
     try:
         query = text("SELECT * FROM `Transcripts` WHERE `Student ID` = :sid")
-        df = pd.read_sql(query, engine, params={"sid": target_id})
+        rows = list(stream_rows(query, {"sid": target_id}))
         
-        if df.empty:
-            return jsonify({"transcript": [], "student_name": "", "suggested_program": ""})
+        if not rows:
+            return {"transcript": [], "student_name": "", "suggested_program": ""}
 
         my_courses = []
         term_disciplines = {}
@@ -1343,21 +1072,21 @@ def get_transcript():
 
         suggested_programs_set = set() 
 
-        for _, row in df.iterrows():
-            term_str = str(row.get('Academic Term', '')).strip()
+        for row in rows:
+            term_str = _text(row.get('Academic Term')).strip()
             if term_str and term_str.lower() != 'nan':
-                val_d2 = str(row.get('DISCIPLINE2_DESCR', '')).strip()
-                val_d3 = str(row.get('DISCIPLINE3_DESCR', '')).strip()
+                val_d2 = _text(row.get('DISCIPLINE2_DESCR')).strip()
+                val_d3 = _text(row.get('DISCIPLINE3_DESCR')).strip()
                 combined = " ".join([v for v in [val_d2, val_d3] if v and v.lower() != 'nan']).strip()
                 if combined and (term_str not in term_disciplines or not term_disciplines[term_str]):
                     term_disciplines[term_str] = combined
 
             if not student_name:
-                name_val = str(row.get('NAME', '')).strip()
+                name_val = _text(row.get('NAME')).strip()
                 if name_val.lower() != 'nan': student_name = name_val
                 
-            val_prog = str(row.get('PROG_LINK', '')).strip().upper()
-            val_disc = str(row.get('DISCIPLINE1_DESCR', '')).strip().upper()
+            val_prog = _text(row.get('PROG_LINK')).strip().upper()
+            val_disc = _text(row.get('DISCIPLINE1_DESCR')).strip().upper()
             
             # --- NOU: Determinăm scorul termenului pentru a alege mereu cel mai recent program ---
             if val_prog and val_prog != 'NAN':
@@ -1389,14 +1118,14 @@ def get_transcript():
                         best_disc = d_upper
 
             cred_val = row.get('CREDVAL', 0.0)
-            try: cred_val = float(cred_val) if pd.notna(cred_val) else 0.0
+            try: cred_val = float(cred_val) if cred_val is not None else 0.0
             except: cred_val = 0.0
 
-            grade = str(row.get('GRADE', '')).strip()
+            grade = _text(row.get('GRADE')).strip()
             if grade.lower() == 'nan': grade = ""
 
             my_courses.append({
-                "course": str(row.get('COURSE', '')).strip().replace(" ", "").upper(),
+                "course": _text(row.get('COURSE')).strip().replace(" ", "").upper(),
                 "term": term_str,
                 "grade": grade,
                 "credit": cred_val
@@ -1418,7 +1147,7 @@ def get_transcript():
 
         multiple_programs = len(suggested_programs_set) > 1
 
-        return jsonify({
+        return {
             "transcript": my_courses, 
             "student_name": student_name, 
             "suggested_program": suggested_base, 
@@ -1426,67 +1155,78 @@ def get_transcript():
             "term_disciplines": term_disciplines,
             "multiple_programs": multiple_programs,
             "discipline": best_disc_display 
-        })
+        }
     except Exception as e:
         print(f"DB Error Transcript: {e}")
-        return jsonify({"transcript": [], "student_name": "", "suggested_program": ""})
+        return {"transcript": [], "student_name": "", "suggested_program": ""}
+
+
+# Interogările pentru /api/student_bundle rulează în paralel, fiecare pe conexiunea ei din pool
+BUNDLE_WORKERS = int(os.environ.get("BUNDLE_WORKERS", "8"))
+_bundle_pool = concurrent.futures.ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
+
+
+@app.route("/api/student_bundle", methods=["POST"])
+def api_student_bundle():
+    """Transcript, CO-OP data, CGPA timeline and comments of one student in a single response."""
+    if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
+    sid = str((request.json or {}).get("student_id", "")).strip()
+
+    if session.get('is_guest'):
+        return jsonify({
+            "transcript": {"transcript": [], "student_name": f"GUEST - {session.get('guest_name', 'Unknown')}", "suggested_program": ""},
+            "coop": {"found": False}, "cgpa": {}, "comments": get_student_comments(sid)
+        })
+    if not sid or sid == "ADMIN":
+        return jsonify({"transcript": {"transcript": [], "student_name": "", "suggested_program": ""},
+                        "coop": {"found": False}, "cgpa": {}, "comments": {"public": "", "private": ""}})
+
+    futures = {
+        "transcript": _bundle_pool.submit(load_transcript, sid),
+        "coop": _bundle_pool.submit(get_student_coop_data, sid),
+        "cgpa": _bundle_pool.submit(get_cgpa_timeline, sid),
+        "comments": _bundle_pool.submit(get_student_comments, sid),
+    }
+    # Fiecare helper își tratează singur erorile de DB și întoarce payload-ul gol
+    return jsonify({key: fut.result() for key, fut in futures.items()})
+
+
+def fetch_transcripts(student_ids):
+    """{Student ID: [{"course", "term", "grade", "credit"}]} for many students in one query (same shape as /get_transcript)."""
+    out = {}
+    sids = sorted({str(s).strip() for s in student_ids if str(s).strip()})
+    if not sids: return out
+    try:
+        query = text("SELECT `Student ID`, `COURSE`, `Academic Term`, `GRADE`, `CREDVAL` FROM `Transcripts` WHERE `Student ID` IN :sids").bindparams(bindparam("sids", expanding=True))
+        with engine.connect() as conn:
+            for row in conn.execute(query, {"sids": sids}):
+                try: credit = float(row[4]) if row[4] is not None else 0.0
+                except: credit = 0.0
+                out.setdefault(str(row[0]).strip(), []).append({
+                    "course": str(row[1] or '').strip().replace(" ", "").upper(),
+                    "term": str(row[2] or '').strip(),
+                    "grade": str(row[3] or '').strip(),
+                    "credit": credit
+                })
+    except Exception as e:
+        print(f"DB Error batch transcripts: {e}")
+    return out
 
     
 @app.route("/get_courses", methods=["POST"])
 def get_courses():
     if 'user_email' not in session: return jsonify({"error": "Unauthorized"}), 401
     
-    df_prog = load_data()
-    df_prog.columns = [str(c).strip().upper() for c in df_prog.columns]
     program_name = request.json.get('program', '').strip()
-    program_name = " ".join(program_name.split()) 
-    
-    if 'PROGRAM' in df_prog.columns:
-        df_prog['PROGRAM'] = df_prog['PROGRAM'].astype(str).replace(r'\s+', ' ', regex=True).str.strip()
-        df_prog = df_prog[df_prog['PROGRAM'] == program_name].copy()
-    else:
+    try:
+        prog = catalog.get_program_catalog(program_name)
+    except catalog.MissingColumn:
         return jsonify({"error": "Coloana 'PROGRAM' nu exista in Excel"}), 500
-    
-    for idx in df_prog.index:
-        c_name = str(df_prog.at[idx, 'COURSE']).upper()
-        if 'WT2' in c_name: df_prog.at[idx, 'PRE-REQUISITE'] = 'WT1'
-        elif 'WT3' in c_name: df_prog.at[idx, 'PRE-REQUISITE'] = 'WT2'
-    
-    reverse_deps = defaultdict(lambda: {"is_prereq_for": set(), "is_coreq_for": set()})
-    for _, row in df_prog.iterrows():
-        ccid = extract_course_code(row.get('COURSE', ''))
-        for r in re.findall(r'[A-Z]{3,4}\s*\d{3}[A-Z]?|WT\d', str(row.get('PRE-REQUISITE', '')).upper()): reverse_deps[r.replace(" ","").replace("-","")]["is_prereq_for"].add(ccid)
-        for r in re.findall(r'[A-Z]{3,4}\s*\d{3}[A-Z]?|WT\d', str(row.get('CO-REQUISITE', '')).upper()): reverse_deps[r.replace(" ","").replace("-","")]["is_coreq_for"].add(ccid)
-
-    all_courses = []
-    def safe_str(val): return "" if str(val).strip().lower() == 'nan' else str(val).strip()
-
-    for _, row in df_prog.iterrows():
-        cid = extract_course_code(row.get('COURSE', ''))
-        terms_offered = []
-        if safe_str(row.get('FALL', '')).upper() == 'X': terms_offered.append('FALL')
-        if safe_str(row.get('WIN', '')).upper() == 'X': terms_offered.append('WIN')
-        if safe_str(row.get('SUM 1', '')).upper() == 'X' or safe_str(row.get('SUM 2', '')).upper() == 'X' or safe_str(row.get('SUM', '')).upper() == 'X':
-            terms_offered.append('SUM')
-            
-        all_courses.append({
-            "id": cid, 
-            "display": f"{safe_str(row.get('COURSE', ''))} ({row.get('CREDIT', 0)} cr)",
-            "credit": float(row.get('CREDIT', 0) or 0), 
-            "full_name": safe_str(row.get('COURSE', '')), 
-            "title": safe_str(row.get('TITLE', '')), 
-            "is_wt": 'WT' in safe_str(row.get('COURSE', '')).upper(),
-            "is_ecp": safe_str(row.get('CORE_TE', '')).upper() == 'ECP', 
-            "type": safe_str(row.get('CORE_TE', '')),
-            "terms": ", ".join(terms_offered) if terms_offered else "ANY", 
-            "prereqs": safe_str(row.get('PRE-REQUISITE', '')), 
-            "coreqs": safe_str(row.get('CO-REQUISITE', '')),
-            "is_prereq_for": ", ".join(reverse_deps[cid]["is_prereq_for"]) or "None", 
-            "is_coreq_for": ", ".join(reverse_deps[cid]["is_coreq_for"]) or "None",
-            "already_taken": 0
-        })
+    except Exception as e:
+        print(f"Error loading Excel: {e}")
+        return jsonify({"error": f"Error loading Excel: {e}"}), 500
         
-    return jsonify({"courses": all_courses, "pre_placed": {}})
+    return jsonify({"courses": prog.courses, "pre_placed": {}})
     
 
 @app.route("/generate", methods=["POST"])
@@ -1496,427 +1236,92 @@ def generate():
     data = request.json
     program_name = " ".join(data.get('program', '').strip().upper().split())
     
-    term_limits = data.get('term_limits', {})
-    count_limits = data.get('count_limits', {})
-    placed_ui = data.get('placed', {})
-    unallocated_ids = data.get('unallocated', [])
-
-    df = load_data()
-    df.columns = [str(c).strip().upper() for c in df.columns]
-    
-    df['PROGRAM'] = df['PROGRAM'].astype(str).replace(r'\s+', ' ', regex=True).str.strip().str.upper()
-    df_prog = df[df['PROGRAM'] == program_name].copy()
-
-    for idx in df_prog.index:
-        c_name = str(df_prog.at[idx, 'COURSE']).upper()
-        if 'WT2' in c_name: df_prog.at[idx, 'PRE-REQUISITE'] = 'WT1'
-        elif 'WT3' in c_name: df_prog.at[idx, 'PRE-REQUISITE'] = 'WT2'
-    
-    all_courses_dict = {}
-    taken_courses = set()
-    placements = {}
-    
-    for r in df_prog.to_dict('records'):
-        cid = extract_course_code(r['COURSE'])
-        r['_id'] = cid 
-        all_courses_dict[cid] = r
-
-    core_200s = [c for c, c_data in all_courses_dict.items() if get_level(c) == 2 and 'CORE' in str(c_data.get('CORE_TE', '')).upper()]
-    for cid, c_data in all_courses_dict.items():
-        if get_level(cid) >= 4:
-            existing_prqs = str(c_data.get('PRE-REQUISITE', '')).strip()
-            current_prqs_list = parse_requirements(existing_prqs)
-            flat_current = [item for sublist in current_prqs_list for item in sublist]
-            to_add = [req for req in core_200s if req not in flat_current]
-            if to_add:
-                new_prqs_str = "; ".join(to_add)
-                c_data['PRE-REQUISITE'] = (existing_prqs + "; " + new_prqs_str) if (existing_prqs and existing_prqs.lower() not in ['n/a', 'none']) else new_prqs_str
-
-    rep_counts = defaultdict(int)
-    for cid in data.get('repeated', []):
-        if cid in all_courses_dict:
-            rep_counts[cid] += 1
-            count = rep_counts[cid]
-            rep_id = f"REP{count}_{cid}"
-            
-            suffix = f" {count}" if count > 1 else ""
-            dummy = all_courses_dict[cid].copy()
-            dummy['COURSE'] = f"{str(dummy['COURSE'])} REPEATED{suffix}"
-            dummy['_id'] = rep_id 
-            
-            dummy['PRE-REQUISITE'] = f"REP{count-1}_{cid}" if count > 1 else ""
-            all_courses_dict[rep_id] = dummy
-            
-            orig_prq = str(all_courses_dict[cid].get('PRE-REQUISITE', ''))
-            if orig_prq and orig_prq.lower() not in ['n/a', 'none']:
-                all_courses_dict[cid]['PRE-REQUISITE'] = orig_prq + "; " + rep_id
-            else:
-                all_courses_dict[cid]['PRE-REQUISITE'] = rep_id
-
-            for other_cid, c_data in all_courses_dict.items():
-                if other_cid != cid and other_cid != rep_id:
-                    other_prq = str(c_data.get('PRE-REQUISITE', ''))
-                    if other_prq and other_prq.lower() not in ['n/a', 'none']:
-                        if re.search(rf'\b{cid}\b', other_prq):
-                            c_data['PRE-REQUISITE'] = other_prq + "; " + rep_id
-    
-    sequence_dict = {str(i): {t: {"credite": 0, "cursuri": [], "coduri": set()} for t in ["SUM", "FALL", "WIN"]} for i in range(1, 8)}
-
-    for tk, cids in placed_ui.items():
-        if not cids: continue
-        if "Y0" in tk:
-            for cid in cids: taken_courses.add(cid); placements[cid] = (0, 'ANY', -1)
-            continue
-        y_str = tk.split("_")[0]; t = tk.split("_")[1]; y = int(y_str[1:])
-        if "SUM" in t: 
-            t = "SUM"
-        for cid in cids:
-            if cid in all_courses_dict:
-                c = all_courses_dict[cid]
-                is_special = 'WT' in str(c['COURSE']).upper() or str(c.get('CORE_TE', '')).upper() == 'REPEAT'
-                cr = 0.0 if is_special else float(c.get('CREDIT', 0) or 0)
-                sequence_dict[str(y)][t]["cursuri"].append(c)
-                sequence_dict[str(y)][t]["credite"] += cr
-                sequence_dict[str(y)][t]["coduri"].add(cid)
-                taken_courses.add(cid)
-                placements[cid] = (str(y), t, (int(y) - 1) * 3 + ["SUM", "FALL", "WIN"].index(t))
-
-    remaining = set(c for c in unallocated_ids if c in all_courses_dict and c not in taken_courses)
-    for cid in data.get('repeated', []):
-        rep_id = "REP_" + cid
-        if rep_id in all_courses_dict and rep_id not in taken_courses: remaining.add(rep_id)
-
-    unallocated_wts = [c for c in unallocated_ids if 'WT' in c.upper()]
-    if unallocated_wts:
-        return jsonify({"error": "Please place all Work Terms (WT) on the grid before generating."})
-        
-    all_wts_in_prog = sorted([c for c in all_courses_dict.keys() if 'WT' in c.upper()])
-    
-    if all_wts_in_prog:
-        placed_wt_indices = sorted([placements[wt][2] for wt in all_wts_in_prog if wt in placements])
-        
-    for cid in data.get('repeated', []):
-        rep_id = "REP_" + cid
-        if rep_id in all_courses_dict and rep_id not in taken_courses: remaining.add(rep_id)
+    ft_dict = get_program_ft_credits()
+    ft_limit = ft_dict.get(program_name, 99)
+    if ft_limit == 0: ft_limit = 99
 
-    def get_reqs(cid, rt): 
-        if cid in all_courses_dict: return parse_requirements(all_courses_dict[cid].get(rt, ''))
-        return []
+    version = catalog.catalog_version()
+    cache_key = planner.request_fingerprint(program_name, data, ft_limit, version)
+    cached = planner.cached_result(cache_key, version)
+    if cached is not None:
+        response = jsonify(cached)
+        response.headers["X-Planner-Stats"] = planner.stats_header(None)
+        return response
 
-    memo_anc = {}
-    def get_ancestor_count(cid, visited=None):
-        if visited is None: visited = set()
-        if cid in memo_anc: return memo_anc[cid]
-        if cid in visited: return 0
-        visited.add(cid); count = 0
-        for grp in get_reqs(cid, 'PRE-REQUISITE') + get_reqs(cid, 'CO-REQUISITE'):
-            valid_opts = [o for o in grp if o in all_courses_dict]
-            if valid_opts: count += 1 + get_ancestor_count(valid_opts[0], visited)
-        memo_anc[cid] = count; visited.remove(cid); return count
-
-    std_prog = {}
-    prog_upper = program_name.upper()
-    if "INDUSTRIAL" in prog_upper: std_prog = STANDARD_SEQUENCES.get("INDUSTRIAL", {})
-    elif "MECHANICAL" in prog_upper: std_prog = STANDARD_SEQUENCES.get("MECHANICAL", {})
-    
-    elif "AERO A" in prog_upper or "AERODYNAMICS" in prog_upper: std_prog = STANDARD_SEQUENCES.get("AERO_A", {})
-    elif "AERO B" in prog_upper or "STRUCTURES" in prog_upper: std_prog = STANDARD_SEQUENCES.get("AERO_B", {})
-    elif "AERO C" in prog_upper or "AVIONICS" in prog_upper: std_prog = STANDARD_SEQUENCES.get("AERO_C", {})
-    #elif "AERO" in prog_upper: std_prog = STANDARD_SEQUENCES.get("AERO_A", {}) 
-
-    def get_std_idx(cid):
-        pos_str = std_prog.get(cid, "") 
-        if not pos_str: return 999
-        try:
-            parts = pos_str.split('_')
-            y = int(parts[0].replace('Y', ''))
-            t = parts[1]
-            if "SUM" in t: t = "SUM" 
-            if t in ["SUM", "FALL", "WIN"]:
-                return (y - 1) * 3 + ["SUM", "FALL", "WIN"].index(t)
-        except: pass
-        return 999
-
-    def place_temporarily(cid, idx):
-        y = (idx // 3) + 1
-        t = ["SUM", "FALL", "WIN"][idx % 3]
-        
-        c_data = all_courses_dict.get(cid, {"COURSE": cid})
-        is_wt_c = 'WT' in cid.upper()
-        is_rep_c = str(c_data.get('CORE_TE', '')).upper() == 'REPEAT'
-        cr = 0.0 if (is_wt_c or is_rep_c) else float(c_data.get('CREDIT', 0) or 0)
-        
-        sequence_dict[str(y)][t]["cursuri"].append(c_data)
-        sequence_dict[str(y)][t]["credite"] += cr
-        sequence_dict[str(y)][t]["coduri"].add(cid)
-        placements[cid] = (str(y), t, idx)
-        taken_courses.add(cid)
-
-    def undo_placement(cid):
-        if cid not in placements: return
-        y, t, idx = placements[cid]
-        c_data = all_courses_dict.get(cid, {"COURSE": cid})
-        
-        is_wt_c = 'WT' in cid.upper()
-        is_rep_c = str(c_data.get('CORE_TE', '')).upper() == 'REPEAT'
-        cr = 0.0 if (is_wt_c or is_rep_c) else float(c_data.get('CREDIT', 0) or 0)
-        
-        target = sequence_dict[str(y)][t]
-        if c_data in target["cursuri"]: target["cursuri"].remove(c_data)
-        target["credite"] -= cr
-        if cid in target["coduri"]: target["coduri"].remove(cid)
-            
-        del placements[cid]
-        taken_courses.remove(cid) 
-    
-    
-    def is_valid_slot(cid, idx, ignore_offering=False): 
-        y = (idx // 3) + 1
-        t = ["SUM", "FALL", "WIN"][idx % 3]
-        
-        if y > 7: return False
-        
-        c_data = all_courses_dict.get(cid, {})
-        
-        if not ignore_offering: 
-            if t == "SUM":
-                is_offered = (str(c_data.get('SUM 1', '')).strip().upper() == 'X' or 
-                              str(c_data.get('SUM 2', '')).strip().upper() == 'X' or
-                              str(c_data.get('SUM', '')).strip().upper() == 'X')
-            else:
-                is_offered = str(c_data.get(t, '')).strip().upper() == 'X'
-                
-            if not is_offered: 
-                return False
-        
-        is_wt_c = 'WT' in cid.upper()
-        is_rep_c = str(c_data.get('CORE_TE', '')).upper() == 'REPEAT'
-        cr = 0.0 if (is_wt_c or is_rep_c) else float(c_data.get('CREDIT', 0) or 0)
-        target = sequence_dict[str(y)][t]
-        
-        term_has_wt = any('WT' in str(cx.get('COURSE', '')).upper() for cx in target["cursuri"])
-        
-        if term_has_wt and not is_wt_c and len(target["cursuri"]) >= 1: return False
-        if is_wt_c and len(target["cursuri"]) > 0: return False
+    # Solver-ul rulează în pool-ul de procese (planner.py); dacă e plin răspundem imediat cu 429
+    try:
+        result = planner.submit_plan(program_name, data, ft_limit)
+    except planner.PlannerBusy:
+        response = jsonify({"error": "The planner is busy right now. Please try again in a few seconds."})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(planner.PLANNER_RETRY_AFTER_S)
+        return response
+    except concurrent.futures.TimeoutError:
+        return jsonify({"error": "The planner took too long to answer. Please try again."}), 504
+    except Exception as e:
+        # Pool stricat (refăcut deja în submit_plan), eroare în worker etc.
+        print(f"Planner Error: {e}")
+        return jsonify({"error": f"The planner failed: {e}"}), 500
+
+    # Contoarele solver-ului: mereu în header și în /api/planner_metrics, în body doar cu "debug": true
+    debug = result.pop("debug", None)
+    planner.record_metrics(debug, error="error" in result)
+    planner.store_result(cache_key, version, result)
+    response = jsonify(dict(result, debug=debug) if data.get('debug') and debug else result)
+    response.headers["X-Planner-Stats"] = planner.stats_header(debug)
+    return response
+
+
+@app.route("/api/batch_generate", methods=["POST"])
+def batch_generate():
+    """Plans a whole cohort; streams one NDJSON line per request as they finish, then a summary line."""
+    if not str(session.get('student_id', '')).startswith('9'):
+        return jsonify({"error": "Unauthorized"}), 403
 
-        l_cr = float(term_limits.get(f"Y{y}_{t}", 16.0 if t == 'SUM' else 18.0))
-        l_cnt = int(count_limits.get(f"Y{y}_{t}", 6 if t == 'SUM' else 5))
-        
-        if l_cr == 0 or l_cnt == 0: return False
-
-        if not is_wt_c and not is_rep_c:
-            if target["credite"] + cr > l_cr: return False
-            if len(target["cursuri"]) >= l_cnt: return False
-
-        if get_level(cid) >= 4:
-            for k in taken_courses:
-                if get_level(k) == 2 and placements[k][2] >= idx: return False
-        if get_level(cid) == 2:
-            for k in taken_courses:
-                if get_level(k) >= 4 and placements[k][2] <= idx: return False
-
-        if '490B' in cid and t != 'WIN': return False
-        if '490A' in cid and t != 'FALL': return False
-        if '490A' in cid:
-            req_490b = cid.replace('490A', '490B')
-            if req_490b in placements:
-                if idx != placements[req_490b][2] - 1: return False
-                
-        return True
-    
+    body = request.json or {}
+    items = body.get("requests") or []
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "No requests"}), 400
+    if len(items) > planner.BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"Too many requests (max {planner.BATCH_MAX_REQUESTS})"}), 413
+    if not planner.acquire_batch_slot():
+        response = jsonify({"error": "Another batch is already running. Please try again later."})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(planner.PLANNER_RETRY_AFTER_S)
+        return response
 
-    def solve_branch(cid, max_allowed_idx, depth):
-            if depth > 15: return False 
-            
-            if cid in taken_courses: return placements[cid][2] <= max_allowed_idx
-            if cid not in all_courses_dict: return True
-            
-            min_term_index = -1 
-            for grp in get_reqs(cid, 'PRE-REQUISITE'):
-                opts = [placements[o][2] for o in grp if o in taken_courses]
-                if opts: min_term_index = max(min_term_index, min(opts))
-                
-            start_idx = max(0, min_term_index + 1)
-            
-            if get_level(cid) >= 4:
-                opts_200 = [placements[k][2] for k in taken_courses if get_level(k) == 2]
-                if opts_200: start_idx = max(start_idx, max(opts_200) + 1)
-                
-            if '490B' in cid:
-                req_490a = cid.replace('490B', '490A')
-                if req_490a in taken_courses: start_idx = max(start_idx, placements[req_490a][2] + 1)
-                
-            std_idx = get_std_idx(cid)
-            if 'WT' in cid.upper() and std_idx != 999: start_idx = max(start_idx, std_idx)
-            
-            if start_idx > max_allowed_idx: return False
-            
-            search_space = list(range(start_idx, max_allowed_idx + 1))
-            if std_idx != 999:
-                search_space.sort(key=lambda x: abs(x - std_idx))
+    try:
+        defaults = body.get("defaults") or {}
+        need_transcript = [str(dict(defaults, **it).get('student_id', '')) for it in items if not dict(defaults, **it).get('placed')]
+        transcripts = fetch_transcripts(need_transcript)
+        jobs, errors = cohort.prepare_jobs(items, defaults, transcripts, get_program_ft_credits())
+    except Exception:
+        planner.release_batch_slot()
+        raise
+
+    labels = {n: label for n, label, *_ in jobs}
+
+    def stream():
+        started = datetime.datetime.now()
+        failed = len(errors)
+        for n, label, message in errors:
+            yield cohort.result_line(n, label, error=message)
+        for n, result in planner.run_batch([(n, prog, data, ft) for n, _, prog, data, ft in jobs]):
+            planner.record_metrics(result.pop("debug", None), error="error" in result)
+            if "error" in result:
+                failed += 1
+                yield cohort.result_line(n, labels[n], error=result["error"])
             else:
-                if depth == 0: search_space.sort()
-                else: search_space.sort(reverse=True)
-
-            for idx in search_space:
-                if not is_valid_slot(cid, idx): continue
-                
-                place_temporarily(cid, idx)
-                success = True
-                
-                for grp in get_reqs(cid, 'PRE-REQUISITE'):
-                    valid_opts = [o for o in grp if o in all_courses_dict]
-                    if not valid_opts: continue 
-                    grp_ok = False
-                    for opt in valid_opts:
-                        if solve_branch(opt, idx - 1, depth + 1):
-                            grp_ok = True; break
-                    if not grp_ok: success = False; break
-                        
-                if success:
-                    for grp in get_reqs(cid, 'CO-REQUISITE'):
-                        valid_opts = [o for o in grp if o in all_courses_dict]
-                        if not valid_opts: continue
-                        grp_ok = False
-                        for opt in valid_opts:
-                            if solve_branch(opt, idx, depth + 1):
-                                grp_ok = True; break
-                        if not grp_ok: success = False; break
-                        
-                if success:
-                    if cid in remaining: remaining.remove(cid)
-                    return True
-                    
-                undo_placement(cid)
-                
-            return False
-
-    print("\n" + "="*50 + "\n🚀 STARTING BACKWARD-CHAINING AI PLANNER 🚀\n" + "="*50)
-    remaining_list = list(remaining)
-    def goal_priority(c_id):
-        data_c = all_courses_dict.get(c_id, {})
-        is_te = 1 if str(data_c.get('CORE_TE', '')).upper() == 'TE' else 0
-        anc_count = get_ancestor_count(c_id)
-        return (-is_te, anc_count, get_level(c_id))
-    remaining_list.sort(key=goal_priority, reverse=True)
-    for c in remaining_list:
-        if c in remaining: solve_branch(c, 20, 0)
-    print("="*50 + "\n")
-
-    while True:
-        total_cr = sum(float(c.get('CREDIT', 0) or 0) for y in range(1, 8) for t in ["SUM", "FALL", "WIN"] for c in sequence_dict[str(y)][t]["cursuri"] if str(c.get('CORE_TE', '')).strip().upper() not in ['REPEAT', 'ECP'] and 'WT' not in str(c['COURSE']).upper())
-        if total_cr <= 120: break
-        
-        removed_any = False
-        for y in range(7, 0, -1):
-            for t in ["WIN", "FALL", "SUM"]:
-                target = sequence_dict[str(y)][t]
-                tes = [c for c in target["cursuri"] if str(c.get('CORE_TE', '')).strip().upper() == 'TE']
-                if tes:
-                    for te in reversed(tes):
-                        cr = float(te.get('CREDIT', 0) or 0)
-                        if total_cr - cr >= 120:
-                            target["cursuri"].remove(te)
-                            target["credite"] -= cr
-                            cid = te.get('_id', extract_course_code(te['COURSE']))
-                            if cid in target["coduri"]: target["coduri"].remove(cid)
-                            if cid not in remaining: remaining.add(cid)
-                            removed_any = True; break
-                    if removed_any: break
-            if removed_any: break
-        if not removed_any: break
-
-    warning_msgs = []
-    
-    ft_dict = get_program_ft_credits()
-    prog_upper = " ".join(program_name.upper().split())
-    ft_limit = ft_dict.get(prog_upper, 99)
-    if ft_limit == 0: ft_limit = 99
+                yield cohort.result_line(n, labels[n], result)
+        elapsed = (datetime.datetime.now() - started).total_seconds()
+        yield json.dumps({"done": True, "count": len(items), "failed": failed, "elapsed_s": round(elapsed, 2)}) + "\n"
 
-    if all_wts_in_prog:
-        first_wt = all_wts_in_prog[0]
-        if first_wt in placements:
-            first_wt_idx = placements[first_wt][2]
-            core_credits = 0
-            for cy in range(1, 8):
-                for ct in ["SUM", "FALL", "WIN"]:
-                    c_idx = (cy - 1) * 3 + ["SUM", "FALL", "WIN"].index(ct)
-                    if c_idx < first_wt_idx:
-                        for c in sequence_dict[str(cy)][ct]["cursuri"]:
-                            ctype = str(c.get('CORE_TE', '')).upper().strip()
-                            if ctype in ['CORE', 'TE', 'PROG'] or 'CORE' in ctype:
-                                core_credits += float(c.get('CREDIT', 0) or 0)
-            if core_credits < 30.0:
-                warning_msgs.append(f"Only {core_credits} credits of CORE/TE before {first_wt}. You need at least 30 CR.")
-
-        if ft_limit != 99:
-            last_wt = all_wts_in_prog[-1]
-            if last_wt in placements:
-                last_wt_idx = placements[last_wt][2]
-                for c_idx in range(1, last_wt_idx): 
-                    p_y = (c_idx // 3) + 1
-                    p_t = ["SUM", "FALL", "WIN"][c_idx % 3]
-
-                    if p_t != "SUM":
-                        term_cr = sum(float(c.get('CREDIT', 0) or 0) for c in sequence_dict[str(p_y)][p_t]["cursuri"] if 'WT' not in str(c.get('COURSE', '')).upper())
-                        if 0 < term_cr < ft_limit:
-                            warning_msgs.append(f"Study term {p_y} {p_t} (before {last_wt}) must be Full-Time (≥ {ft_limit} credits). Currently has {term_cr} CR.")
-
-    res_seq = {}
-    for y in range(1, 8):
-        res_seq[f"Year {y}"] = {}
-        for t in ["SUM", "FALL", "WIN"]:
-            cursuri_list = []
-            
-            for c in sequence_dict[str(y)][t]["cursuri"]:
-                cid_for_json = c.get('_id', extract_course_code(c['COURSE']))
-                is_wt = 'WT' in str(c['COURSE']).upper()
-                is_rep = str(c.get('CORE_TE', '')).upper() == 'REPEAT'
-                display_cr = 0 if (is_wt or is_rep) else c.get('CREDIT', 0)
-                display = f"{str(c['COURSE']).strip()} ({display_cr} cr)"
-                cursuri_list.append({"id": cid_for_json, "display": display, "is_wt": is_wt})
-                    
-            res_seq[f"Year {y}"][t] = {"credite": sequence_dict[str(y)][t]["credite"], "cursuri": cursuri_list}
-
-    # Construim res_seq (codul vechi rămâne la fel)
-    res_seq = {}
-    for y in range(1, 8):
-        res_seq[f"Year {y}"] = {}
-        for t in ["SUM", "FALL", "WIN"]:
-            cursuri_list = []
-            for c in sequence_dict[str(y)][t]["cursuri"]:
-                cid_for_json = c.get('_id', extract_course_code(c['COURSE']))
-                is_wt = 'WT' in str(c['COURSE']).upper()
-                is_rep = str(c.get('CORE_TE', '')).upper() == 'REPEAT'
-                display_cr = 0 if (is_wt or is_rep) else c.get('CREDIT', 0)
-                display = f"{str(c['COURSE']).strip()} ({display_cr} cr)"
-                cursuri_list.append({"id": cid_for_json, "display": display, "is_wt": is_wt})
-                    
-            res_seq[f"Year {y}"][t] = {"credite": sequence_dict[str(y)][t]["credite"], "cursuri": cursuri_list}
-
-    # =========================================================
-    # REPARAȚIE AICI: Formatăm corect cursurile respinse (Unallocated) 
-    # pentru ca interfața web (JavaScript) să le poată redesena!
-    # =========================================================
-    unalloc_list = []
-    for c in remaining:
-        if c in all_courses_dict:
-            c_data = all_courses_dict[c]
-            is_wt = 'WT' in str(c_data.get('COURSE', '')).upper()
-            is_rep = str(c_data.get('CORE_TE', '')).upper() == 'REPEAT'
-            display_cr = 0 if (is_wt or is_rep) else c_data.get('CREDIT', 0)
-            display = f"{str(c_data.get('COURSE', '')).strip()} ({display_cr} cr)"
-            
-            unalloc_list.append({
-                "id": c, 
-                "display": display, 
-                "is_wt": is_wt
-            })
-    # =========================================================
-    
-    return jsonify({"sequence": res_seq, "unallocated": unalloc_list, "warnings": warning_msgs})
+    response = Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+    response.call_on_close(planner.release_batch_slot)
+    return response
     
     
 
 if __name__ == "__main__":
+    email_outbox.start()   # sub gunicorn îl pornește post_fork (gunicorn.conf.py)
     app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)), debug=True, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""Plans a whole cohort from the command line and writes NDJSON to stdout.
+
+    python batch_generate.py cohort.json > plans.ndjson
+    python batch_generate.py cohort.ndjson --db --workers 8 > plans.ndjson
+
+The input is a JSON list of /generate bodies, one JSON object per line, or
+{"defaults": {...}, "requests": [...]} (the /api/batch_generate body). An item with a
+`student_id` and no `placed` grid starts from the student's transcript (needs --db).
+"""
+import sys
+import json
+import time
+import argparse
+import contextlib
+import cohort
+import planner
+
+
+def read_items(path):
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        raw = f.read().strip()
+    if not raw: return [], {}
+    if raw[0] in "[{":
+        try:
+            doc = json.loads(raw)
+            if isinstance(doc, list): return doc, {}
+            if "requests" in doc: return doc["requests"], doc.get("defaults") or {}
+            return [doc], {}
+        except json.JSONDecodeError:
+            pass
+    return [json.loads(line) for line in raw.splitlines() if line.strip()], {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch sequence generation (NDJSON output).")
+    parser.add_argument("input", help="JSON / NDJSON file with the planning requests ('-' = stdin)")
+    parser.add_argument("--workers", type=int, default=planner.BATCH_WORKERS, help="solver processes (default: %(default)s, 0 = inline)")
+    parser.add_argument("--db", action="store_true", help="read transcripts and FT credit limits from the MySQL database")
+    args = parser.parse_args()
+
+    items, defaults = read_items(args.input)
+    transcripts, ft_credits = {}, {}
+    if args.db:
+        with contextlib.redirect_stdout(sys.stderr):      # mesajele de conectare ale app.py nu intră în NDJSON
+            import app
+        transcripts = app.fetch_transcripts(str(dict(defaults, **it).get('student_id', '')) for it in items if not dict(defaults, **it).get('placed'))
+        ft_credits = app.get_program_ft_credits()
+
+    started = time.perf_counter()
+    jobs, errors = cohort.prepare_jobs(items, defaults, transcripts, ft_credits)
+    labels = {n: label for n, label, *_ in jobs}
+    failed = len(errors)
+    for n, label, message in errors:
+        sys.stdout.write(cohort.result_line(n, label, error=message))
+    for n, result in planner.run_batch([(n, prog, data, ft) for n, _, prog, data, ft in jobs], workers=args.workers):
+        result.pop("debug", None)
+        if "error" in result:
+            failed += 1
+            sys.stdout.write(cohort.result_line(n, labels[n], error=result["error"]))
+        else:
+            sys.stdout.write(cohort.result_line(n, labels[n], result))
+        sys.stdout.flush()
+    print(f"Planned {len(items) - failed}/{len(items)} requests in {time.perf_counter() - started:.1f}s", file=sys.stderr)
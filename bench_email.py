@@ -0,0 +1,75 @@
+"""Email rendering benchmark: median time of the compiled Jinja templates (email_templates.py).
+
+    python bench_email.py
+    python bench_email.py --years 7 --courses 6 --errors 12 --repeat 500
+
+Builds a synthetic submission (term_summary / wt_summary / validation_errors shaped like the ones
+planner.html sends) and renders the submit / approved / rework bodies. The exact HTML is pinned
+by the snapshots in tests/test_email_templates.py.
+"""
+import time
+import random
+import argparse
+import statistics
+import email_templates
+
+
+def sample_submission(years=5, courses=5, errors=6, seed=0):
+    rng = random.Random(seed)
+    term_summary = []
+    for y in range(years):
+        data = {}
+        for t in ("SUM", "FALL", "WIN"):
+            if t == "SUM" and y % 2 == 0: continue
+            wt = t == "SUM" or rng.random() < 0.15
+            data[t] = {
+                "cr": 0 if wt else rng.choice([12, 15, 16.5, 18]),
+                "courses": [{"name": f"WT{y + 1}", "is_wt": True}] if wt else
+                           [{"name": f"{rng.choice(['ENGR', 'MECH', 'INDU', 'AERO'])} {rng.randint(201, 499)}", "credit": rng.choice([3.0, 3.5, 4.0])}
+                            for _ in range(courses)],
+                "is_current_term": y == 1 and t == "FALL",
+                "is_institute_wt": wt and rng.random() < 0.3,
+                "is_coop": wt,
+                "wt_change": "Moved from Y2 WIN" if wt and rng.random() < 0.3 else "",
+                "gpa_info": {"val": rng.choice([-1, 1.9, 2.1, 3.4]), "credits": rng.choice([12.0, 15.0, 27.5]), "cgpa": round(rng.uniform(2, 4.3), 2),
+                             "tot_cr": 15.0 * (y + 1), "threshold": 2.0} if t != "SUM" and rng.random() < 0.6 else None,
+            }
+        term_summary.append({"year": f"Year {y + 1} ({2024 + y}-{2025 + y})", "data": data})
+    wt_summary = {f"WT{n}": {"new_term": f"Y{n + 1}_SUM", "change_text": "delayed by 1 term" if n == 2 else ""} for n in (1, 2, 3)}
+    validation_errors = [f"<b>Y{n % 5 + 1} FALL:</b> ENGR {300 + n} requires ENGR {200 + n} (not placed before)" for n in range(errors)]
+    return {"term_summary": term_summary, "wt_summary": wt_summary, "validation_errors": validation_errors}
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def cases(data):
+    common = dict(program="Mechanical Engineering", submitter_email="student@concordia.ca", student_name="Jane Student",
+                  student_id="40000001", wt_summary=data["wt_summary"], term_summary=data["term_summary"],
+                  validation_errors=data["validation_errors"])
+    return {
+        "submit": lambda: email_templates.render("submit", justification="Need ENGR 301 in WIN", **common),
+        "approved": lambda: email_templates.render("approved", pub_comment="Looks good", justification="Need ENGR 301 in WIN",
+                                                   power_user_name="coordinator", **common),
+        "rework": lambda: email_templates.render("rework", pub_comment="", power_user_name="coordinator", **common),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the email templates.")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--courses", type=int, default=5, help="courses per academic term")
+    parser.add_argument("--errors", type=int, default=6, help="validation errors")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    data = sample_submission(args.years, args.courses, args.errors)
+    print(f"{'email':<10} {'KiB':>6} {'ms':>8}")
+    for name, render in cases(data).items():
+        print(f"{name:<10} {len(render().encode()) / 1024:>6.1f} {timed(render, args.repeat):>8.3f}")
@@ -0,0 +1,194 @@
+"""Solver benchmark: real CORE_TE.xlsx programs plus synthetic catalogs of growing size / depth.
+
+    python bench_planner.py                                   # print the table
+    python bench_planner.py --save bench_planner_baseline.json
+    python bench_planner.py --compare bench_planner_baseline.json
+
+Every scenario is a full plan_sequence() call (search + TE trim + JSON). Wall time is the median
+of --repeat runs; peak memory comes from one extra run under tracemalloc, so it does not skew the
+timings. Nodes and backtracks are deterministic for a fixed PYTHONHASHSEED (the comparison only
+looks at them when the seed matches the baseline); --compare exits with 1 on a regression.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+import tracemalloc
+import catalog
+import cohort
+import planner
+
+WT_SLOTS = {"Y3_SUM": ["WT1"], "Y4_WIN": ["WT2"], "Y5_SUM": ["WT3"]}
+
+# (nr. cursuri, adâncimea lanțului de prerechizite)
+SYNTHETIC_SHAPES = [(30, 4), (50, 6), (70, 8), (100, 9)]
+
+VARIANTS = {
+    "plain": {},
+    "rep": {"repeat": 2},
+    "tight": {"term_limits": {"Y1_FALL": "12", "Y2_WIN": "9", "Y3_FALL": "0"}, "count_limits": {"Y1_WIN": "3", "Y2_FALL": "3"}},
+}
+
+
+# =========================================================
+# CATALOGS + REQUESTS
+# =========================================================
+def synthetic_rows(n_courses, depth, seed=0):
+    """Rows in the CORE_TE.xlsx layout: `depth` layers of courses, each one requiring 1-2 groups
+    ("A or B" now and then) from the layer below. The first layer is 200-level (every 200 has to
+    fit before the first Work Term), the upper half 400-level; about a fifth of it are TEs."""
+    rng = random.Random(seed * 1000 + n_courses * 31 + depth)
+    layers = [[] for _ in range(depth)]
+    for n in range(n_courses):
+        layers[min(depth - 1, n * depth // n_courses)].append(n)
+    rows = []
+    codes = {}
+    for k, layer in enumerate(layers):
+        level = 2 if k == 0 else (4 if k >= depth // 2 else 3)
+        for n in layer:
+            codes[n] = f"SYN{chr(65 + n // 100)} {level}{n % 100:02d}"
+    for k, layer in enumerate(layers):
+        for n in layer:
+            groups = []
+            if k:
+                below = layers[k - 1]
+                for opt in rng.sample(below, min(len(below), rng.choice([1, 1, 2]))):
+                    if rng.random() < 0.25 and len(below) > 1:
+                        alt = rng.choice([b for b in below if b != opt])
+                        groups.append(f"{codes[opt]} or {codes[alt]}")
+                    else:
+                        groups.append(codes[opt])
+            offered = rng.choice([("FALL", "WIN"), ("FALL", "WIN"), ("FALL",), ("WIN",), ("FALL", "WIN", "SUM 1")])
+            rows.append({
+                "PROGRAM": "SYNTHETIC", "COURSE": codes[n], "TITLE": "", "CREDIT": rng.choice([3.0, 3.0, 3.5, 4.0]),
+                "PRE-REQUISITE": "; ".join(groups), "CO-REQUISITE": "",
+                "SUM 1": "X" if "SUM 1" in offered else "", "SUM 2": "", "FALL": "X" if "FALL" in offered else "",
+                "WIN": "X" if "WIN" in offered else "",
+                "CORE_TE": "TE" if k >= depth // 2 and rng.random() < 0.2 else "PRG CORE",
+            })
+    for wt in ("WT1", "WT2", "WT3"):
+        rows.append({"PROGRAM": "SYNTHETIC", "COURSE": wt, "TITLE": "", "CREDIT": 16.0, "PRE-REQUISITE": "", "CO-REQUISITE": "",
+                     "SUM 1": "X", "SUM 2": "", "FALL": "X", "WIN": "X", "CORE_TE": "WT"})
+    return rows
+
+
+def apply_variant(prog, data, variant):
+    data = dict(data, term_limits=dict(variant.get("term_limits", {})), count_limits=dict(variant.get("count_limits", {})))
+    if variant.get("repeat"):
+        # cursuri de bază (fără prerechizite) nealocate, ca să fie nevoie de lanțul REPn_
+        base = [c for c in data["unallocated"] if not prog.prereqs.get(c)]
+        data["repeated"] = base[:variant["repeat"]]
+    return data
+
+
+def scenarios(real=True, synthetic=True):
+    """[(name, program catalog, /generate body)]"""
+    out = []
+    if real:
+        for name in catalog.get_program_names():
+            if not planner.standard_sequence_for(catalog.normalize_program(name)): continue
+            prog = catalog.get_program_catalog(name)
+            data = cohort.build_request(prog, {"program": name})
+            for v, variant in VARIANTS.items():
+                out.append((f"{name} / {v}", prog, apply_variant(prog, data, variant)))
+    if synthetic:
+        for n_courses, depth in SYNTHETIC_SHAPES:
+            prog = catalog.ProgramCatalog("SYNTHETIC", synthetic_rows(n_courses, depth), "synthetic")
+            data = cohort.build_request(prog, {"program": "SYNTHETIC", "placed": WT_SLOTS})
+            for v, variant in VARIANTS.items():
+                out.append((f"synthetic n={n_courses} d={depth} / {v}", prog, apply_variant(prog, data, variant)))
+    return out
+
+
+# =========================================================
+# MEASURE
+# =========================================================
+def measure(prog, data, repeat):
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = planner.plan_sequence(prog, data)
+            times.append((time.perf_counter() - started) * 1000)
+        tracemalloc.start()
+        planner.plan_sequence(prog, data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    search = result.get("search", {})
+    return {
+        "wall_ms": round(statistics.median(times), 3),
+        "nodes": search.get("nodes", 0),
+        "backtracks": search.get("backtracks", 0),
+        "cut_off": search.get("cut_off", False),
+        "peak_kib": round(peak / 1024, 1),
+        "unallocated": len(result.get("unallocated", [])),
+        "error": result.get("error"),
+    }
+
+
+def run(repeat, real=True, synthetic=True, match=None):
+    results = {}
+    for name, prog, data in scenarios(real, synthetic):
+        if match and match.lower() not in name.lower(): continue
+        results[name] = measure(prog, data, repeat)
+        r = results[name]
+        print(f"{name:<60} {r['wall_ms']:>9.2f} ms {r['nodes']:>8} nodes {r['backtracks']:>7} bt {r['peak_kib']:>9.1f} KiB"
+              + (" CUT OFF" if r["cut_off"] else "") + (f"  error: {r['error'][:40]!r}" if r["error"] else ""), file=sys.stderr)
+    return results
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "hashseed": os.environ.get("PYTHONHASHSEED"),
+            "catalog_version": catalog.catalog_version()}
+
+
+def compare(baseline, current, tolerance):
+    """Regressions: wall time / peak memory over (1 + tolerance) x baseline, more nodes or backtracks, new cut-offs."""
+    same_seed = baseline["environment"].get("hashseed") not in (None, "random") and \
+        baseline["environment"].get("hashseed") == current["environment"].get("hashseed")
+    problems = []
+    for name, old in baseline["scenarios"].items():
+        new = current["scenarios"].get(name)
+        if new is None: continue
+        for key in ("wall_ms", "peak_kib"):
+            if old[key] and new[key] > old[key] * (1 + tolerance):
+                problems.append(f"{name}: {key} {old[key]} -> {new[key]} (+{(new[key] / old[key] - 1) * 100:.0f}%)")
+        if same_seed:
+            for key in ("nodes", "backtracks"):
+                if new[key] > old[key]: problems.append(f"{name}: {key} {old[key]} -> {new[key]}")
+        if new["cut_off"] and not old["cut_off"]: problems.append(f"{name}: search now cut off")
+        if new["unallocated"] > old["unallocated"]: problems.append(f"{name}: unallocated {old['unallocated']} -> {new['unallocated']}")
+    if not same_seed:
+        print("Note: PYTHONHASHSEED unset or different from the baseline, node counts not compared.", file=sys.stderr)
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sequence planner.")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario (median is kept)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed wall time / memory growth (default: %(default)s)")
+    parser.add_argument("--only", choices=["real", "synthetic"], help="run one family of scenarios")
+    parser.add_argument("-k", dest="match", help="only scenarios whose name contains this text")
+    args = parser.parse_args()
+
+    current = {"environment": environment(),
+               "scenarios": run(args.repeat, real=args.only != "synthetic", synthetic=args.only != "real", match=args.match)}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=1, sort_keys=True)
+        print(f"Saved {len(current['scenarios'])} scenarios to {args.save}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(baseline, current, args.tolerance)
+        for p in problems: print("REGRESSION", p)
+        print(f"{len(problems)} regression(s) against {args.compare}")
+        sys.exit(1 if problems else 0)
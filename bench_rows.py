@@ -0,0 +1,137 @@
+"""Row-mapping benchmark: pd.read_sql + iterrows() vs. streaming conn.execute(...).mappings().
+
+    python bench_rows.py
+    python bench_rows.py --students 2000 --pending 600 --repeat 50
+
+Fills an in-memory SQLite database with Transcripts / CGPA_Timeline / coop / Saved_Sequences
+rows shaped like production (same columns, realistic per-student row counts and JSON sizes,
+a few NULLs), then times the app.py readers twice: once as they are (stream_rows) and once
+with stream_rows swapped for the old DataFrame path, so the response-building code is the same
+in both runs. Also checks that both paths build the same payloads.
+"""
+import io
+import json
+import math
+import time
+import random
+import argparse
+import statistics
+import contextlib
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+TERMS = ["2021-2022 Fall", "2021-2022 Winter", "2022-2023 Summer", "2022-2023 Fall", "2022-2023 Winter",
+         "2023-2024 Summer", "2023-2024 Fall", "2023-2024 Winter", "2024-2025 Fall", "2024-2025 Winter"]
+COURSES = [f"{s} {n}" for s in ("ENGR", "MECH", "INDU", "AERO", "MIAE", "ENCS", "COEN", "ELEC") for n in range(201, 499, 7)]
+
+
+def legacy_rows(query, params=None, conn=None):
+    """The old path: a DataFrame per query, walked with iterrows() (NULL -> NaN / None)."""
+    df = pd.read_sql(query, conn if conn is not None else app.engine, params=params or {})
+    for _, row in df.iterrows():
+        yield row
+
+
+def build_db(students, per_student, pending, seed=0):
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    extra = [f"COL_{n}" for n in range(10)]       # coloanele pe care SELECT * le aduce fără să fie folosite
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Transcripts (`Student ID` TEXT, NAME TEXT, COURSE TEXT, `Academic Term` TEXT, GRADE TEXT, "
+                          "CREDVAL REAL, PROG_LINK TEXT, DISCIPLINE1_DESCR TEXT, DISCIPLINE2_DESCR TEXT, DISCIPLINE3_DESCR TEXT, "
+                          + ", ".join(f"{c} TEXT" for c in extra) + ")"))
+        conn.execute(text("CREATE TABLE CGPA_Timeline (`Student ID` TEXT, `Academic Term` TEXT, GPA_X_CR TEXT, "
+                          "GPA_X_CR_Actual_Credits TEXT, CGPA REAL, CGPA_Total_Credits REAL)"))
+        conn.execute(text("CREATE TABLE coop (`Student ID` TEXT, Term TEXT, `Admission Term` TEXT, `Transferred Withdrawn OK` TEXT, "
+                          "WS TEXT, `Jobs View no` REAL, `Jobs Applied no` REAL, `Term Details` TEXT, `Term number Sx or Wx` TEXT)"))
+        conn.execute(text("CREATE TABLE Saved_Sequences (Student_Email TEXT, Sequence_Name TEXT, Program TEXT, JSON_Data TEXT, "
+                          "Date_Saved TEXT, Term_Json_data TEXT, sequence_Json_data TEXT, status TEXT, student_comments TEXT, "
+                          "student_id TEXT, student_id_name TEXT)"))
+        for table in ("Transcripts", "CGPA_Timeline", "coop"):
+            conn.execute(text(f"CREATE INDEX ix_{table} ON {table} (`Student ID`)"))
+        conn.execute(text("CREATE INDEX ix_seq_status ON Saved_Sequences (status, Date_Saved)"))
+
+        tr, cg, co, seq = [], [], [], []
+        for n in range(students):
+            sid = str(40000000 + n)
+            name = f"Student {n}"
+            for k in range(per_student):
+                tr.append({"sid": sid, "name": name, "course": rng.choice(COURSES), "term": TERMS[k % len(TERMS)],
+                           "grade": rng.choice(["A", "A-", "B+", "B", "C", None]), "cred": rng.choice([3.0, 3.5, 4.0]),
+                           "prog": "UGRD", "d1": "MECHANICAL ENGINEERING", "d2": "CO-OP" if k % 3 else None, "d3": None,
+                           **{c: "x" * 12 for c in extra}})
+            for k, term in enumerate(TERMS):
+                cg.append({"sid": sid, "term": term, "gpa": f"{rng.uniform(20, 60):.2f}" if k % 7 else None,
+                           "cr": f"{rng.choice([12, 15, 18])}", "cgpa": rng.uniform(2, 4.3), "tot": 15.0 * (k + 1)})
+                co.append({"sid": sid, "term": term, "adm": TERMS[0], "tw": None if k % 9 else "Withdrawn", "ws": rng.choice(["WS1", "WS2_NF", None]),
+                           "views": rng.randint(0, 80), "applied": rng.randint(0, 20), "details": None if k % 2 else "Placed", "label": f"S{k}"})
+        plan = {"placed": {f"Y{y}_{t}": rng.sample(COURSES, 5) for y in range(1, 5) for t in ("FALL", "WIN", "SUM")},
+                "startYear": 2022, "startTerm": "Fall", "coop": True, "locks": rng.sample(COURSES, 4)}
+        blob = json.dumps(plan)
+        terms = json.dumps({f"Y{y}_{t}": {"note": "x" * 40} for y in range(1, 5) for t in ("FALL", "WIN", "SUM")})
+        for n in range(pending):
+            seq.append({"email": f"s{n}@concordia.ca", "name": f"Plan {n}", "prog": "Mechanical Engineering", "json": blob,
+                        "date": f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d} 10:00:00", "terms": terms, "sett": json.dumps({"startYear": 2022}),
+                        "status": "PENDING APPROVAL", "comments": "Please approve" if n % 2 else None, "sid": str(40000000 + n % students),
+                        "sname": f"Student {n}"})
+
+        conn.execute(text("INSERT INTO Transcripts VALUES (:sid, :name, :course, :term, :grade, :cred, :prog, :d1, :d2, :d3, "
+                          + ", ".join(f":{c}" for c in extra) + ")"), tr)
+        conn.execute(text("INSERT INTO CGPA_Timeline VALUES (:sid, :term, :gpa, :cr, :cgpa, :tot)"), cg)
+        conn.execute(text("INSERT INTO coop VALUES (:sid, :term, :adm, :tw, :ws, :views, :applied, :details, :label)"), co)
+        conn.execute(text("INSERT INTO Saved_Sequences VALUES (:email, :name, :prog, :json, :date, :terms, :sett, :status, :comments, :sid, :sname)"), seq)
+    return engine
+
+
+def readers(students):
+    sid = lambda n: str(40000000 + n % students)
+    return {
+        "transcript": lambda n: app.load_transcript(sid(n)),
+        "cgpa_timeline": lambda n: app.get_cgpa_timeline(sid(n)),
+        "coop": lambda n: app.get_student_coop_data(sid(n)),
+        "pending_approvals": lambda n: app.fetch_pending_sequences(),
+    }
+
+
+def timed(fn, repeat):
+    times = []
+    for n in range(repeat):
+        started = time.perf_counter()
+        fn(n)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def normalize(val):
+    """NULL rendered by the old path ('nan', 'None', NaN) vs. the new one ('')."""
+    if isinstance(val, dict): return {k: normalize(v) for k, v in val.items()}
+    if isinstance(val, list): return [normalize(v) for v in val]
+    if isinstance(val, float) and math.isnan(val): return ""
+    if val in ("nan", "None", "NaT", None): return ""
+    return val
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the DB row-mapping layer.")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=60, help="transcript rows per student")
+    parser.add_argument("--pending", type=int, default=300, help="PENDING APPROVAL sequences")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    app.engine = build_db(args.students, args.rows, args.pending)
+    streaming = app.stream_rows
+    print(f"{'reader':<20} {'DataFrame ms':>13} {'mappings ms':>12} {'speed-up':>9}  same payload")
+    for name, fn in readers(args.students).items():
+        app.stream_rows = legacy_rows
+        old_ms = timed(fn, args.repeat)
+        old = fn(0)
+        app.stream_rows = streaming
+        new_ms = timed(fn, args.repeat)
+        new = fn(0)
+        same = normalize(json.loads(json.dumps(old, default=str))) == normalize(json.loads(json.dumps(new, default=str)))
+        print(f"{name:<20} {old_ms:>13.2f} {new_ms:>12.2f} {old_ms / new_ms:>8.1f}x  {'yes' if same else 'NO'}")
@@ -0,0 +1,462 @@
+import os
+import re
+import sys
+import pickle
+import hashlib
+import argparse
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+
+# =========================================================
+# CATALOG CACHE (CORE_TE.xlsx)
+# Each sheet is parsed once per process and kept in memory.
+# We only re-parse when the file's mtime/size changes AND its content hash differs.
+# On cold start the sheets come from a prebuilt binary snapshot (see `python catalog.py build`),
+# so pandas/openpyxl are only imported when the snapshot is missing or stale.
+# =========================================================
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CORE_TE.xlsx")
+SNAPSHOT_PATH = os.environ.get("CATALOG_SNAPSHOT_PATH", os.path.splitext(CATALOG_PATH)[0] + ".snapshot.pkl")
+SNAPSHOT_FORMAT = 1
+
+MAIN_SHEET = 0
+RESTRICTIONS_SHEET = "restrictions"
+
+_lock = threading.Lock()
+_sheets = {}
+_stats = {"hits": 0, "misses": 0, "reloads": 0, "snapshot_loads": 0, "errors": 0}
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse_main(path):
+    import pandas as pd
+    df = pd.read_excel(path)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.fillna("").to_dict('records')
+
+
+def _parse_restrictions(path):
+    import pandas as pd
+    df = pd.read_excel(path, sheet_name=RESTRICTIONS_SHEET)
+    df.columns = [str(c).strip() for c in df.columns]
+
+    # Formatăm coloanele de tip dată într-un format text predictibil
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+
+    return df.fillna("").to_dict('records')
+
+
+_PARSERS = {MAIN_SHEET: _parse_main, RESTRICTIONS_SHEET: _parse_restrictions}
+
+
+def _read_snapshot(digest, path=None):
+    """Returns the snapshot dict if it was built from a file with this content hash (or from any file when digest is None)."""
+    path = path or SNAPSHOT_PATH
+    if not os.path.exists(path): return None
+    try:
+        with open(path, "rb") as f:
+            snap = pickle.load(f)
+    except Exception as e:
+        print(f"Catalog snapshot unreadable ({path}): {e}", file=sys.stderr)
+        return None
+    if not isinstance(snap, dict) or snap.get("format") != SNAPSHOT_FORMAT: return None
+    if digest is not None and snap["source"]["sha1"] != digest:
+        print(f"Catalog snapshot is stale ({path}), falling back to CORE_TE.xlsx", file=sys.stderr)
+        return None
+    return snap
+
+
+def get_sheet(sheet):
+    """Returns (records, version) for a sheet; records are shared, callers must not mutate them."""
+    path = CATALOG_PATH
+    with _lock:
+        entry = _sheets.get(sheet)
+        try:
+            sig = _file_signature(path) if os.path.exists(path) else None
+            if entry and entry["sig"] == sig:
+                _stats["hits"] += 1
+                return entry["data"], entry["version"]
+
+            digest = _file_hash(path) if sig else None
+            if entry and entry["version"] == digest:
+                # Fișierul a fost atins (touch/copy/git checkout) dar conținutul e identic
+                entry["sig"] = sig
+                _stats["hits"] += 1
+                return entry["data"], entry["version"]
+
+            _stats["misses"] += 1
+            if entry: _stats["reloads"] += 1
+
+            snap = _read_snapshot(digest)
+            if snap and sheet in snap["sheets"]:
+                _stats["snapshot_loads"] += 1
+                version = snap["source"]["sha1"]
+                for name, data in snap["sheets"].items():
+                    _sheets[name] = {"sig": sig, "version": version, "data": data}
+                return _sheets[sheet]["data"], version
+
+            if sig is None: raise FileNotFoundError(path)
+            data = _PARSERS[sheet](path)
+            _sheets[sheet] = {"sig": sig, "version": digest, "data": data}
+            return data, digest
+        except Exception:
+            _stats["errors"] += 1
+            # Dacă avem deja o versiune bună în memorie, o servim în continuare
+            if entry: return entry["data"], entry["version"]
+            raise
+
+
+def warm_up():
+    """Loads every sheet into memory (called once at app import so the first request doesn't pay for it)."""
+    for sheet in _PARSERS:
+        try: get_sheet(sheet)
+        except Exception as e: print(f"Error loading catalog sheet {sheet!r}: {e}", file=sys.stderr)
+
+
+def build_snapshot(source=None, output=None):
+    source = source or CATALOG_PATH
+    output = output or SNAPSHOT_PATH
+    snap = {
+        "format": SNAPSHOT_FORMAT,
+        "source": {"path": os.path.basename(source), "sha1": _file_hash(source), "size": os.path.getsize(source)},
+        "sheets": {sheet: parser(source) for sheet, parser in _PARSERS.items()},
+    }
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, output)
+    return snap
+
+
+def catalog_version():
+    """Content hash of CORE_TE.xlsx as currently loaded (main sheet)."""
+    return get_sheet(MAIN_SHEET)[1]
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["sheets"] = {str(k): {"version": v["version"], "mtime_ns": v["sig"][0] if v["sig"] else None} for k, v in _sheets.items()}
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _sheets.clear()
+    with _program_lock:
+        _program_index.clear()
+        _program_catalogs.clear()
+
+
+# =========================================================
+# COURSE CODE HELPERS
+# =========================================================
+def extract_course_code(course_name):
+    if not course_name: return ""
+    match = re.search(r'(?:REP_)?[A-Z]{3,4}\s?\d{3,4}[A-Z]?|WT\d', str(course_name).upper())
+    return match.group(0).replace(" ", "") if match else str(course_name).strip().upper()
+
+def get_level(course_name):
+    match = re.search(r'(\d)\d{2}', str(course_name))
+    return int(match.group(1)) if match else 9
+
+def parse_requirements(req_str):
+    if not req_str or str(req_str).lower() in ['n/a', 'none', '']: return []
+    reqs = []
+    for group in re.split(r'[;,]', str(req_str)):
+        opts = [m.group(0).replace(" ", "") for o in re.split(r'\bor\b', group, flags=re.IGNORECASE) if (m := re.search(r'(?:REP_)?[A-Z]{3,4}\s?\d{3}[A-Z]?|WT\d', o.upper()))]
+        if opts: reqs.append(opts)
+    return reqs
+
+def normalize_program(name):
+    return " ".join(str(name).strip().upper().split())
+
+
+# =========================================================
+# COMPILED PER-PROGRAM CATALOG
+# Built once per (program, catalog version) and shared by /get_courses and /generate.
+# =========================================================
+_REQ_CODE_RE = re.compile(r'[A-Z]{3,4}\s*\d{3}[A-Z]?|WT\d')
+
+def _safe_str(val):
+    return "" if str(val).strip().lower() == 'nan' else str(val).strip()
+
+
+class Course(NamedTuple):
+    """One catalog course with the fields the solver needs, normalized once per catalog version."""
+    id: str
+    name: str              # COURSE, fără spații la capete
+    type: str              # CORE_TE, upper
+    credit: float
+    is_wt: bool
+    is_repeat: bool
+    is_te: bool
+    is_ecp: bool
+    level: int
+    offered: frozenset     # din {'SUM', 'FALL', 'WIN'}
+    display: str           # "MECH 343 (3.0 cr)"; WT / REPEAT afișează 0 cr
+
+    @classmethod
+    def from_row(cls, cid, row, offered):
+        name = str(row.get('COURSE', '')).strip()
+        ctype = str(row.get('CORE_TE', '')).strip().upper()
+        is_wt = 'WT' in name.upper()
+        is_repeat = ctype == 'REPEAT'
+        display_cr = 0 if (is_wt or is_repeat) else row.get('CREDIT', 0)
+        return cls(cid, name, ctype, float(row.get('CREDIT', 0) or 0), is_wt, is_repeat, ctype == 'TE', ctype == 'ECP',
+                   get_level(cid), offered, f"{name} ({display_cr} cr)")
+
+    def repeated(self, rep_id, count):
+        """The REPEATED dummy of this course (REP1_X, REP2_X, ...)."""
+        name = f"{self.name} REPEATED{f' {count}' if count > 1 else ''}"
+        return self._replace(id=rep_id, name=name, display=f"{name} ({0 if (self.is_wt or self.is_repeat) else self.credit} cr)")
+
+
+class ProgramDag:
+    """Prerequisite / corequisite graph of one program, over course indices.
+
+    Built once per catalog version (and per request only when REPEATED dummies change the
+    requirements). Edges go from each catalog option of a requirement group to the course.
+    """
+
+    def __init__(self, ids, prereqs, coreqs):
+        self.ids = list(ids)
+        self.ix = {cid: i for i, cid in enumerate(self.ids)}
+        n = len(self.ids)
+
+        # grup = (opțiunile din catalog, opțiunile din afara catalogului); grupurile fără opțiuni în catalog dispar
+        self.pre_groups = [self._compile(prereqs.get(cid, [])) for cid in self.ids]
+        self.co_groups = [self._compile(coreqs.get(cid, [])) for cid in self.ids]
+
+        self.parents = [sorted({o for opts, _ in self.pre_groups[i] + self.co_groups[i] for o in opts}) for i in range(n)]
+        self.children = [[] for _ in range(n)]
+        for i in range(n):
+            for p in self.parents[i]: self.children[p].append(i)
+
+        # Kahn, determinist după index; nodurile dintr-un ciclu (și cele de după) rămân la final
+        indeg = [len(p) for p in self.parents]
+        order = [i for i in range(n) if indeg[i] == 0]
+        for i in order:
+            for c in self.children[i]:
+                indeg[c] -= 1
+                if indeg[c] == 0: order.append(c)
+        self.acyclic = len(order) == n
+        self.cyclic = set(range(n)) - set(order)
+        self.topo_order = order + sorted(self.cyclic)
+
+        # Închiderea tranzitivă ca bitmask-uri (bit i = cursul cu indexul i)
+        self.ancestors = [0] * n
+        for i in order:
+            m = 0
+            for p in self.parents[i]: m |= (1 << p) | self.ancestors[p]
+            self.ancestors[i] = m
+        for i in sorted(self.cyclic):
+            m, stack = 0, list(self.parents[i])
+            while stack:
+                p = stack.pop()
+                if (m >> p) & 1: continue
+                m |= 1 << p
+                stack.extend(self.parents[p])
+            self.ancestors[i] = m
+        self.descendants = [0] * n
+        for i in range(n):
+            m = self.ancestors[i]
+            while m:
+                low = m & -m
+                self.descendants[low.bit_length() - 1] |= 1 << i
+                m ^= low
+
+        # Numărul de strămoși pe prima opțiune a fiecărui grup (prioritatea obiectivelor în /generate)
+        memo = {}
+        def count(i, visited):
+            if i in memo: return memo[i]
+            if i in visited: return 0
+            visited.add(i); total = 0
+            for opts, _ in self.pre_groups[i] + self.co_groups[i]:
+                total += 1 + count(opts[0], visited)
+            memo[i] = total; visited.remove(i); return total
+        self.ancestor_count = [count(i, set()) for i in range(n)]
+
+        # Drumul critic: cel mai mic index de termen la care cursul poate fi plasat dacă niciun strămoș nu e luat.
+        # Un grup cu opțiuni din afara catalogului poate fi satisfăcut din Y0, deci nu impune nimic.
+        self.critical_path = [0] * n
+        cp = self.critical_path
+        for i in order:
+            best = 0
+            for opts, ext in self.pre_groups[i]:
+                if not ext: best = max(best, min(cp[o] for o in opts) + 1)
+            for opts, ext in self.co_groups[i]:
+                if not ext: best = max(best, min(cp[o] for o in opts))
+            cp[i] = best
+
+    def _compile(self, groups):
+        compiled = []
+        for grp in groups:
+            opts = tuple(self.ix[o] for o in grp if o in self.ix)
+            if not opts: continue
+            compiled.append((opts, tuple(o for o in grp if o not in self.ix)))
+        return compiled
+
+
+class ProgramCatalog:
+    def __init__(self, name, rows, version):
+        self.name = name
+        self.version = version
+        self.rows = {}          # cid -> rândul din Excel, pregătit pentru solver
+        self.courses = []       # payload-ul pentru /get_courses
+        self.credits = {}
+        self.offered = {}       # cid -> frozenset din {'SUM', 'FALL', 'WIN'}
+        self.types = {}         # cid -> CORE_TE (upper)
+        self.prereqs = {}       # cid -> [[opt, opt], [opt], ...]
+        self.coreqs = {}
+        self.records = {}       # cid -> Course
+        self.reverse_deps = defaultdict(lambda: {"is_prereq_for": {}, "is_coreq_for": {}})
+
+        rows = [dict(r) for r in rows]
+        for r in rows:
+            c_name = str(r.get('COURSE', '')).upper()
+            if 'WT2' in c_name: r['PRE-REQUISITE'] = 'WT1'
+            elif 'WT3' in c_name: r['PRE-REQUISITE'] = 'WT2'
+
+        for r in rows:
+            ccid = extract_course_code(r.get('COURSE', ''))
+            for code in _REQ_CODE_RE.findall(str(r.get('PRE-REQUISITE', '')).upper()):
+                self.reverse_deps[code.replace(" ", "").replace("-", "")]["is_prereq_for"][ccid] = None
+            for code in _REQ_CODE_RE.findall(str(r.get('CO-REQUISITE', '')).upper()):
+                self.reverse_deps[code.replace(" ", "").replace("-", "")]["is_coreq_for"][ccid] = None
+
+        for r in rows:
+            cid = extract_course_code(r.get('COURSE', ''))
+            terms_offered = []
+            if _safe_str(r.get('FALL', '')).upper() == 'X': terms_offered.append('FALL')
+            if _safe_str(r.get('WIN', '')).upper() == 'X': terms_offered.append('WIN')
+            if _safe_str(r.get('SUM 1', '')).upper() == 'X' or _safe_str(r.get('SUM 2', '')).upper() == 'X' or _safe_str(r.get('SUM', '')).upper() == 'X':
+                terms_offered.append('SUM')
+
+            self.courses.append({
+                "id": cid,
+                "display": f"{_safe_str(r.get('COURSE', ''))} ({r.get('CREDIT', 0)} cr)",
+                "credit": float(r.get('CREDIT', 0) or 0),
+                "full_name": _safe_str(r.get('COURSE', '')),
+                "title": _safe_str(r.get('TITLE', '')),
+                "is_wt": 'WT' in _safe_str(r.get('COURSE', '')).upper(),
+                "is_ecp": _safe_str(r.get('CORE_TE', '')).upper() == 'ECP',
+                "type": _safe_str(r.get('CORE_TE', '')),
+                "terms": ", ".join(terms_offered) if terms_offered else "ANY",
+                "prereqs": _safe_str(r.get('PRE-REQUISITE', '')),
+                "coreqs": _safe_str(r.get('CO-REQUISITE', '')),
+                "is_prereq_for": ", ".join(self.reverse_deps[cid]["is_prereq_for"]) or "None",
+                "is_coreq_for": ", ".join(self.reverse_deps[cid]["is_coreq_for"]) or "None",
+                "already_taken": 0
+            })
+
+            solver_row = dict(r)
+            solver_row['_id'] = cid
+            self.rows[cid] = solver_row
+            self.offered[cid] = frozenset(t for t, cols in (("SUM", ('SUM 1', 'SUM 2', 'SUM')), ("FALL", ('FALL',)), ("WIN", ('WIN',)))
+                                          if any(str(r.get(col, '')).strip().upper() == 'X' for col in cols))
+
+        # Cursurile de nivel 400 cer toate cursurile CORE de nivel 200
+        core_200s = [c for c, c_data in self.rows.items() if get_level(c) == 2 and 'CORE' in str(c_data.get('CORE_TE', '')).upper()]
+        for cid, c_data in self.rows.items():
+            if get_level(cid) >= 4:
+                existing_prqs = str(c_data.get('PRE-REQUISITE', '')).strip()
+                flat_current = [item for sublist in parse_requirements(existing_prqs) for item in sublist]
+                to_add = [req for req in core_200s if req not in flat_current]
+                if to_add:
+                    new_prqs_str = "; ".join(to_add)
+                    c_data['PRE-REQUISITE'] = (existing_prqs + "; " + new_prqs_str) if (existing_prqs and existing_prqs.lower() not in ['n/a', 'none']) else new_prqs_str
+
+        for cid, c_data in self.rows.items():
+            self.credits[cid] = float(c_data.get('CREDIT', 0) or 0)
+            self.types[cid] = str(c_data.get('CORE_TE', '')).upper()
+            self.prereqs[cid] = parse_requirements(c_data.get('PRE-REQUISITE', ''))
+            self.coreqs[cid] = parse_requirements(c_data.get('CO-REQUISITE', ''))
+            self.records[cid] = Course.from_row(cid, c_data, self.offered[cid])
+
+        self.dag = ProgramDag(self.rows, self.prereqs, self.coreqs)
+
+
+_program_lock = threading.Lock()
+_program_index = {}
+_program_catalogs = {}
+
+
+class MissingColumn(Exception):
+    """The main sheet has no PROGRAM column, so no program can be looked up."""
+
+
+def _index_programs(records, version):
+    """Groups the main sheet by normalized PROGRAM once per catalog version."""
+    with _program_lock:
+        current = _program_index.get("current")
+        if current and current["version"] == version:
+            return current
+    by_program = defaultdict(list)
+    names = set()
+    has_program = bool(records) and 'PROGRAM' in [str(c).strip().upper() for c in records[0]]
+    if has_program:
+        for rec in records:
+            row = {str(k).strip().upper(): v for k, v in rec.items()}
+            display_name = re.sub(r'\s+', ' ', str(row['PROGRAM'])).strip()
+            row['PROGRAM'] = display_name.upper()
+            by_program[row['PROGRAM']].append(row)
+            if display_name and display_name.lower() != 'nan': names.add(display_name)
+    current = {"version": version, "rows": dict(by_program), "names": sorted(names), "has_program": has_program}
+    with _program_lock:
+        _program_index["current"] = current
+        _program_catalogs.clear()
+    return current
+
+
+def get_program_names():
+    records, version = get_sheet(MAIN_SHEET)
+    return list(_index_programs(records, version)["names"])
+
+
+def get_program_catalog(program_name):
+    records, version = get_sheet(MAIN_SHEET)
+    key = normalize_program(program_name)
+    with _program_lock:
+        cached = _program_catalogs.get(key)
+        if cached and cached.version == version:
+            return cached
+    index = _index_programs(records, version)
+    if not index["has_program"]: raise MissingColumn("PROGRAM")
+    prog = ProgramCatalog(key, index["rows"].get(key, []), version)
+    with _program_lock:
+        _program_catalogs[key] = prog
+    return prog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or check the binary snapshot of CORE_TE.xlsx.")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--source", default=CATALOG_PATH, help="Excel catalog (default: CORE_TE.xlsx next to this file)")
+    parser.add_argument("--output", default=SNAPSHOT_PATH, help="snapshot file (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        snap = build_snapshot(args.source, args.output)
+        counts = ", ".join(f"{name!r}: {len(rows)} rows" for name, rows in snap["sheets"].items())
+        print(f"✅ Snapshot written to {args.output} (sha1 {snap['source']['sha1'][:12]}; {counts})")
+    else:
+        snap = _read_snapshot(_file_hash(args.source), args.output)
+        if snap is None:
+            print(f"❌ Snapshot {args.output} is missing or stale. Run: python catalog.py build")
+            sys.exit(1)
+        print(f"✅ Snapshot {args.output} matches {args.source}")
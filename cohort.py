@@ -0,0 +1,188 @@
+import re
+import json
+import datetime
+from catalog import normalize_program
+from planner import standard_sequence_for, N_YEARS
+
+# =========================================================
+# COHORT / BATCH PLANNING
+# Turns one batch item (explicit grid, or a Student ID + transcript) into a /generate body.
+# The transcript mapping mirrors loadTranscriptAndMapInstitute() in templates/planner.html,
+# so a batch plan starts from the same grid the student would see in the UI.
+# =========================================================
+SEASON_ORDER = {"WIN": 0, "SUM": 1, "FALL": 2}
+
+
+def parse_term(term_str):
+    """'2024-2025 Winter' / 'Fall 2024' / 'WI 2025' / PeopleSoft '2243' -> (calendar year, 'SUM' | 'FALL' | 'WIN').
+
+    Either part is None when it cannot be read. This is the one Python term parser: app.py reads
+    the CO-OP and transcript terms with it too (parse_coop_term_string).
+    """
+    s = str(term_str).strip().upper()
+    if not s or s == 'NAN': return None, None
+
+    if re.match(r'^2\d{3}$', s):
+        yy, digit = int(s[1:3]), s[3]
+        if digit == '1': return 2000 + yy, 'SUM'
+        if digit in ('3', '4'): return 2000 + yy + 1, 'WIN'
+        return 2000 + yy, 'FALL'
+
+    season = None
+    if 'FALL' in s or 'FA ' in s or s.endswith('FA'): season = 'FALL'
+    elif 'WI' in s: season = 'WIN'
+    elif 'SU' in s: season = 'SUM'
+
+    years = re.findall(r'\d{4}', s)
+    if years:
+        year = int(years[0])
+        # "2024-2025 Winter": anul academic începe în toamnă, iarna cade în anul următor
+        if season == 'WIN' and (len(years) > 1 or '-' in s): year += 1
+        return year, season
+    short = re.search(r'\d{2}', s)
+    return (2000 + int(short.group(0)) if short else None), season
+
+
+def parse_concordia_term(term_str, today=None):
+    """parse_term with the planner page's defaults: the current year and FALL for what it cannot read."""
+    year, season = parse_term(term_str)
+    return (year if year is not None else (today or datetime.date.today()).year), season or 'FALL'
+
+
+def _academic_year(term_str, year):
+    m = re.match(r'^(\d{4})', str(term_str).strip())
+    return int(m.group(1)) if m else year
+
+
+def _current_academic_year(today):
+    return today.year - 1 if today.month < 5 else today.year
+
+
+def _abs_idx(year, season):
+    return year * 3 + SEASON_ORDER[season]
+
+
+def _transcript_items(entry):
+    """One transcript row -> [(course id, forced season)]; 490/6990 are split into A (FALL) and B (WIN) halves."""
+    code = str(entry.get('course', '')).upper().replace(" ", "")
+    m = re.match(r'^([A-Z]{3,4})(490|6990)$', code)
+    if m:
+        return [(f"{m.group(1)}{m.group(2)}A", 'FALL'), (f"{m.group(1)}{m.group(2)}B", 'WIN')]
+    if code.startswith(('CWTE10', 'CWT10', 'WILE600', 'WILE601')) or code == 'WT1': code = 'WT1'
+    elif code.startswith(('CWTE20', 'CWT20', 'ACCE10')) or code == 'WT2': code = 'WT2'
+    elif code.startswith(('CWTE30', 'CWT30')) or code == 'WT3': code = 'WT3'
+    return [(code, None)]
+
+
+def detect_start(prog, transcript, today=None):
+    """(start year, 'Fall' | 'Winter') from the earliest catalog course of the last three academic years, or None."""
+    today = today or datetime.date.today()
+    ecp = {c["id"] for c in prog.courses if c["is_ecp"]}
+    best = None
+    for entry in transcript:
+        code = str(entry.get('course', '')).upper().replace(" ", "")
+        if 'WT' in code or code not in prog.rows or code in ecp: continue
+        year, season = parse_concordia_term(entry.get('term', ''), today)
+        aca_year = _academic_year(entry.get('term', ''), year)
+        if aca_year < _current_academic_year(today) - 2: continue
+        score = year * 10 + (1 if season == 'WIN' else (2 if season == 'SUM' else 3))
+        if best is None or score < best[0]:
+            best = (score, aca_year, 'Winter' if season == 'WIN' else 'Fall')
+    return (best[1], best[2]) if best else None
+
+
+def transcript_placed(prog, transcript, start_year, start_term, today=None):
+    """Grid placement of the transcript courses: {'Y1_FALL': [...], ..., 'Y0_ANY': [...]}."""
+    today = today or datetime.date.today()
+    base_year = start_year - 1 if start_term == 'Winter' else start_year
+    grid_start = _abs_idx(base_year, 'SUM')
+    current_aca = _current_academic_year(today)
+
+    placed = {}
+    for entry in transcript:
+        for cid, force in _transcript_items(entry):
+            year, season = parse_concordia_term(entry.get('term', ''), today)
+            if force:
+                if season == 'WIN' and force == 'FALL': year -= 1
+                elif season == 'FALL' and force == 'WIN': year += 1
+                season = force
+            key = 'Y0_ANY'
+            offset = _abs_idx(year, season) - grid_start
+            if _academic_year(entry.get('term', ''), year) > current_aca - 3 and offset >= 0:
+                rel_y, rel_s = offset // 3 + 1, offset % 3
+                if rel_y <= N_YEARS: key = f"Y{rel_y}_{['SUM', 'FALL', 'WIN'][rel_s]}"
+            bucket = placed.setdefault(key, [])
+            if cid not in bucket: bucket.append(cid)
+    return placed
+
+
+def build_request(prog, item, transcript=None, today=None):
+    """Completes one batch item into a /generate body.
+
+    `placed` wins over the transcript. Work Terms that are not on the grid go to their slot in
+    the standard sequence, ECP courses go to Y0 when a transcript course needs them (or all of
+    them with `ecp_exempt`), and every other catalog course not on the grid is unallocated.
+    """
+    data = dict(item)
+    placed = {k: list(v) for k, v in (item.get('placed') or {}).items()}
+    if not placed and transcript:
+        start = (item.get('start_year'), item.get('start_term')) if item.get('start_year') else detect_start(prog, transcript, today)
+        if start:
+            placed = transcript_placed(prog, transcript, int(start[0]), start[1] or 'Fall', today)
+
+    on_grid = {c for cids in placed.values() for c in cids}
+    std = standard_sequence_for(normalize_program(item.get('program', '')))
+    for c in prog.courses:
+        if c["is_wt"] and c["id"] not in on_grid and c["id"] in std:
+            placed.setdefault(std[c["id"]].replace("SUM1", "SUM"), []).append(c["id"])
+            on_grid.add(c["id"])
+
+    needed_by_transcript = set()
+    for c in prog.courses:
+        if c["is_ecp"] and c["id"] not in on_grid:
+            dependents = {d.strip() for d in c["is_prereq_for"].split(",")}
+            if item.get('ecp_exempt') or dependents & on_grid: needed_by_transcript.add(c["id"])
+    if needed_by_transcript:
+        placed.setdefault('Y0_ANY', []).extend(sorted(needed_by_transcript))
+        on_grid |= needed_by_transcript
+
+    data['placed'] = placed
+    if 'unallocated' not in item:
+        data['unallocated'] = [c["id"] for c in prog.courses if c["id"] not in on_grid]
+    data.setdefault('term_limits', {})
+    data.setdefault('count_limits', {})
+    data.setdefault('repeated', [])
+    return data
+
+
+def prepare_jobs(items, defaults=None, transcripts=None, ft_credits=None, get_catalog=None):
+    """Batch items -> (jobs, errors). jobs: [(index, label, program, data, ft_limit)], errors: [(index, label, message)]."""
+    import catalog
+    get_catalog = get_catalog or catalog.get_program_catalog
+    transcripts = transcripts or {}
+    ft_credits = ft_credits or {}
+    jobs, errors = [], []
+    for n, raw in enumerate(items):
+        item = dict(defaults or {}, **raw)
+        label = str(item.get('id') or item.get('student_id') or n)
+        program_name = normalize_program(item.get('program', ''))
+        if not program_name:
+            errors.append((n, label, "Missing program")); continue
+        try:
+            prog = get_catalog(program_name)
+        except Exception as e:
+            errors.append((n, label, f"Catalog error: {e}")); continue
+        if not prog.rows:
+            errors.append((n, label, f"Unknown program: {item.get('program')}")); continue
+        sid = str(item.get('student_id', '')).strip()
+        data = build_request(prog, item, transcripts.get(sid))
+        ft_limit = item.get('ft_limit') or ft_credits.get(program_name, 99) or 99
+        jobs.append((n, label, program_name, data, ft_limit))
+    return jobs, errors
+
+
+def result_line(index, label, result=None, error=None):
+    line = {"index": index, "id": label}
+    if error is not None: line["error"] = error
+    else: line["result"] = result
+    return json.dumps(line, separators=(",", ":")) + "\n"
@@ -0,0 +1,231 @@
+"""Durable outbox for outgoing email: requests enqueue, a background thread sends.
+
+Messages (the resend.Emails.send parameters) go into a local SQLite file and the request returns
+right away. A daemon thread in each serving process drains the file: due messages are claimed one at a
+time (safe with several gunicorn workers on the same file), sent through the transport, and on
+failure retried with exponential backoff up to EMAIL_MAX_ATTEMPTS before being marked failed.
+A message left in "sending" by a process that died is picked up again after SENDING_TIMEOUT_S.
+The thread is started explicitly with start() (gunicorn post_fork, `python app.py`); importing this
+module, or app, never starts it, so scripts that share the outbox file do not send from it.
+
+EMAIL_TRANSPORT=fake keeps messages in memory instead of calling Resend (local runs, tests).
+
+    python email_outbox.py stats
+    python email_outbox.py drain            # send what is due now, in the foreground
+    python email_outbox.py retry-failed     # put failed messages back in the queue
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import sqlite3
+import argparse
+import threading
+import resend
+
+OUTBOX_PATH = os.environ.get("EMAIL_OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_outbox.sqlite3"))
+MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", "8"))
+BASE_DELAY_S = 5.0
+MAX_DELAY_S = 900.0
+POLL_S = 5.0                    # cât așteaptă worker-ul când nu e nimic de trimis (retry-urile programate)
+SENDING_TIMEOUT_S = 300.0
+SENT_RETENTION_S = 86400.0      # mesajele trimise se șterg după o zi
+
+logger = logging.getLogger(__name__)
+
+
+# =========================================================
+# TRANSPORTS
+# =========================================================
+class ResendTransport:
+    def send(self, message):
+        resend.Emails.send(message)
+
+
+class FakeTransport:
+    """Keeps the messages in `sent`; the first `fail_times` sends raise (to exercise the retries)."""
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError("fake transport failure")
+            self.sent.append(message)
+
+
+_transport = FakeTransport() if os.environ.get("EMAIL_TRANSPORT", "resend").lower() == "fake" else ResendTransport()
+_lock = threading.Lock()
+_wake = threading.Event()
+_worker = None
+_worker_pid = None
+_schema_ready = set()
+
+
+def configure(transport=None, path=None):
+    """Swaps the transport and / or the outbox file (tests, the CLI)."""
+    global _transport, OUTBOX_PATH
+    if transport is not None: _transport = transport
+    if path is not None: OUTBOX_PATH = path
+    return _transport
+
+
+# =========================================================
+# STORAGE
+# =========================================================
+def _connect():
+    conn = sqlite3.connect(OUTBOX_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    if OUTBOX_PATH not in _schema_ready:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL DEFAULT '',
+                message TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                claimed_at REAL,
+                last_error TEXT,
+                created REAL NOT NULL,
+                sent_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox (status, next_attempt)")
+        _schema_ready.add(OUTBOX_PATH)
+    return conn
+
+
+def enqueue(message, kind=""):
+    """Stores a resend.Emails.send parameter dict and wakes the sender, if this process runs one;
+    returns the outbox id."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cur = conn.execute("INSERT INTO outbox (kind, message, next_attempt, created) VALUES (?, ?, ?, ?)",
+                           (kind, json.dumps(message), now, now))
+        msg_id = cur.lastrowid
+    finally:
+        conn.close()
+    _wake.set()
+    return msg_id
+
+
+def _claim(conn):
+    """Takes the oldest due message (or one stuck in 'sending'); None when nothing is due."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT id, message, attempts FROM outbox WHERE (status = 'queued' AND next_attempt <= ?) "
+                           "OR (status = 'sending' AND claimed_at < ?) ORDER BY next_attempt, id LIMIT 1",
+                           (now, now - SENDING_TIMEOUT_S)).fetchone()
+        if row: conn.execute("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?", (now, row[0]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def backoff(attempts):
+    """Delay before retry number `attempts` (1-based): doubling from BASE_DELAY_S, capped, with +-20% jitter."""
+    return min(MAX_DELAY_S, BASE_DELAY_S * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def drain(limit=None):
+    """Sends the messages that are due now; returns (sent, failed attempts)."""
+    sent = failed = 0
+    conn = _connect()
+    try:
+        while limit is None or sent + failed < limit:
+            row = _claim(conn)
+            if row is None: break
+            msg_id, message, attempts = row
+            attempts += 1
+            try:
+                _transport.send(json.loads(message))
+            except Exception as e:
+                failed += 1
+                logger.warning("Email outbox: message %s attempt %d failed: %s", msg_id, attempts, e)
+                status = "failed" if attempts >= MAX_ATTEMPTS else "queued"
+                conn.execute("UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ?, claimed_at = NULL WHERE id = ?",
+                             (status, attempts, time.time() + backoff(attempts), str(e)[:500], msg_id))
+            else:
+                sent += 1
+                conn.execute("UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                             (attempts, time.time(), msg_id))
+        conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (time.time() - SENT_RETENTION_S,))
+    finally:
+        conn.close()
+    return sent, failed
+
+
+def stats():
+    conn = _connect()
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        oldest = conn.execute("SELECT MIN(created) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+    finally:
+        conn.close()
+    return {"queued": counts.get("queued", 0), "sending": counts.get("sending", 0), "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0), "oldest_pending_s": round(time.time() - oldest, 1) if oldest else 0}
+
+
+def retry_failed():
+    conn = _connect()
+    try:
+        return conn.execute("UPDATE outbox SET status = 'queued', attempts = 0, next_attempt = ? WHERE status = 'failed'",
+                            (time.time(),)).rowcount
+    finally:
+        conn.close()
+
+
+# =========================================================
+# WORKER
+# =========================================================
+def _run():
+    while True:
+        _wake.wait(POLL_S)
+        _wake.clear()
+        try:
+            drain()
+        except Exception as e:
+            logger.exception("Email outbox worker error: %s", e)
+
+
+def start():
+    """Starts the sender (if needed) and makes it look at the outbox now. Called once a process is
+    ready to serve, so messages queued before a restart or waiting for a retry go out without a new enqueue."""
+    _ensure_worker()
+    _wake.set()
+
+
+def _ensure_worker():
+    """Starts the sender thread once per process (gunicorn forks do not inherit the parent's thread)."""
+    global _worker, _worker_pid
+    with _lock:
+        if _worker is not None and _worker_pid == os.getpid() and _worker.is_alive(): return
+        _worker = threading.Thread(target=_run, name="email-outbox", daemon=True)
+        _worker_pid = os.getpid()
+        _worker.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email outbox maintenance.")
+    parser.add_argument("command", choices=["stats", "drain", "retry-failed"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "stats":
+        print(json.dumps(stats()))
+    elif args.command == "drain":
+        sent, failed = drain()
+        print(f"Sent {sent}, {failed} failed attempt(s)")
+        sys.exit(1 if failed else 0)
+    else:
+        print(f"Requeued {retry_failed()} message(s)")
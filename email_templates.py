@@ -0,0 +1,118 @@
+"""Compiled Jinja templates for the sequence emails (templates/emails/).
+
+The templates are loaded and compiled once, at import, into an environment of their own (no
+auto-reload, so rendering never stats the files); routes and bench_email.py call render().
+term_summary / wt_summary are turned into small view rows first (colors and defaults decided in
+one pass here), so the templates only do attribute lookups - a .get() per value inside Jinja
+goes through the runtime's call machinery and was most of the render time.
+Values are HTML-escaped; validation_errors are the HTML of the client's live-check list and
+go in as they are.
+"""
+import os
+from typing import NamedTuple
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+EMAIL_TEMPLATES = {
+    "submit": "emails/submit.html",
+    "approved": "emails/approved.html",
+    "rework": "emails/rework.html",
+}
+SEQUENCE_TABLE_KINDS = {"submit", "approved"}     # rework nu are tabelul de termene
+TERMS = ("SUM", "FALL", "WIN")
+
+
+class WtLine(NamedTuple):
+    wt: str
+    new_term: object
+    change_text: object
+
+
+class CourseView(NamedTuple):
+    name: object
+    credit: object
+    is_wt: bool
+
+
+class GpaBox(NamedTuple):
+    bg: str
+    color: str
+    credits: str
+    val: object
+    cgpa: object
+    tot_cr: str
+
+
+class TermCell(NamedTuple):
+    border: str
+    top_bg: str
+    text_color: str
+    bottom_bg: str
+    name_color: str
+    credit_color: str
+    cr: object
+    wt_change: object
+    gpa: object
+    courses: list
+
+
+class YearRow(NamedTuple):
+    year: object
+    cells: list
+
+
+def credits_label(val):
+    """12.0 -> '12' (the credit counts in the GPA boxes)."""
+    s = str(val)
+    return s.replace('.0', '') if s.endswith('.0') else s
+
+
+def wt_lines(wt_summary):
+    return [WtLine(wt, info.get('new_term'), info.get('change_text'))
+            for wt in ("WT1", "WT2", "WT3") if wt in (wt_summary or {}) for info in (wt_summary[wt],)]
+
+
+def _gpa_box(g, text_col):
+    val = g.get('val', 0)
+    threshold = g.get('threshold', 2.0)
+    if val == -1 or val > threshold + 0.2: bg, col = "transparent", text_col
+    elif val <= threshold: bg, col = "#c0392b", "#ffffff"
+    else: bg, col = "#e67e22", "#ffffff"
+    return GpaBox(bg, col, credits_label(g.get('credits', 0)), "N/A" if val == -1 else val, g.get('cgpa', 0), credits_label(g.get('tot_cr', 0)))
+
+
+def term_rows(term_summary):
+    """term_summary (as sent by planner.html) -> [YearRow] with the colors of every cell resolved."""
+    rows = []
+    for ts in term_summary or []:
+        data_term = ts.get('data', {})
+        cells = []
+        for t in TERMS:
+            d = data_term.get(t, {})
+            is_curr, is_inst, is_coop = d.get('is_current_term'), d.get('is_institute_wt'), d.get('is_coop')
+            if is_curr: top_bg, bottom_bg, text_col = "#fff9c4", "#fffde7", "#333333"
+            elif is_inst: top_bg, bottom_bg, text_col = "#5DADE2", "#AED6F1", "#ffffff"
+            elif is_coop: top_bg, bottom_bg, text_col = "#b3e5fc", "#e1f5fe", "#333333"
+            else: top_bg, bottom_bg, text_col = "#fcfcfc", "#ffffff", "#333333"
+            gpa = d.get('gpa_info')
+            cells.append(TermCell(
+                border="#fbc02d" if is_curr else "#ddd", top_bg=top_bg, text_color=text_col, bottom_bg=bottom_bg,
+                name_color="#154360" if is_inst else "#333333", credit_color="#2980B9" if is_inst else "#7f8c8d",
+                cr=d.get('cr', 0), wt_change=d.get('wt_change', ''), gpa=_gpa_box(gpa, text_col) if gpa else None,
+                courses=[CourseView(c.get('name'), c.get('credit'), bool(c.get('is_wt'))) for c in d.get('courses', [])]))
+        rows.append(YearRow(ts.get('year', ''), cells))
+    return rows
+
+
+_env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(["html"]), auto_reload=False)
+_compiled = {kind: _env.get_template(name) for kind, name in EMAIL_TEMPLATES.items()}
+
+
+def render(kind, wt_summary=None, term_summary=None, **context):
+    """HTML body of a "submit" / "approved" / "rework" email.
+
+    Context: submitter_email, student_name, student_id, program, wt_summary, term_summary,
+    validation_errors, justification, pub_comment, power_user_name (each template uses a subset)."""
+    if kind in SEQUENCE_TABLE_KINDS:
+        context.update(wt_lines=wt_lines(wt_summary), term_rows=term_rows(term_summary))
+    return _compiled[kind].render(**context)
@@ -0,0 +1,12 @@
+import os
+
+# /generate waits on the planner process pool (planner.py); worker threads keep login,
+# save_sequence and the other light routes served while a solve is in flight.
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+
+def post_fork(server, worker):
+    # Singurul loc unde pornește trimiterea sub gunicorn: fiecare worker își are thread-ul lui (cu preload_app,
+    # unul pornit în master nu ar trece în fork). Importul lui app nu pornește nimic.
+    import email_outbox
+    email_outbox.start()
@@ -0,0 +1,315 @@
+"""Index migrations for the planner's MySQL tables, plus an EXPLAIN check of the queries in app.py.
+
+    python migrations.py apply --dry-run      # print the DDL that would run
+    python migrations.py apply
+    python migrations.py check                # EXPLAIN every text() query in app.py, report full scans
+    python migrations.py check --list         # only list the extracted queries (no database needed)
+
+`apply` is idempotent: it reads information_schema first and skips indexes that already exist
+(by name, or an existing index with the same leading columns). The sync jobs may recreate the
+tables, so it is safe to run it again after a sync. Keys on TEXT columns get a prefix length;
+LOWER(col) keys become functional indexes on MySQL 8.0.13+ and an indexed generated column on
+older servers (the optimizer uses it for the matching LOWER(col) expression in both cases).
+`apply` also creates the Sequence_Blobs table of sequence_store.py (the app does too, at startup).
+`check` exits with 1 when a query with a WHERE clause still reads a whole table, or when a text()
+query is built from runtime values and so cannot be EXPLAINed (it is listed as NOT CHECKED).
+"""
+import io
+import os
+import re
+import operator
+import ast
+import sys
+import argparse
+import contextlib
+from typing import NamedTuple
+from sqlalchemy import text
+import sequence_store
+
+APP_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+TEXT_TYPES = {"tinytext", "text", "mediumtext", "longtext", "tinyblob", "blob", "mediumblob", "longblob"}
+TEXT_PREFIX = 191           # 191 x 4 bytes (utf8mb4) < 767, limita de cheie pe serverele vechi
+EMAIL_VARCHAR = 255
+
+
+class Index(NamedTuple):
+    table: str
+    name: str
+    parts: tuple            # coloane; ("LOWER", col) pentru o cheie normalizată
+
+
+def lower(col):
+    return ("LOWER", col)
+
+
+INDEXES = [
+    # Aprobări: WHERE status = 'PENDING APPROVAL' ORDER BY Date_Saved DESC (+ COUNT)
+    Index("Saved_Sequences", "ix_seq_status_date", ("status", "Date_Saved")),
+    # Detaliu / update_status / lista unui student: WHERE student_id = :sid [AND Date_Saved = :ts] ORDER BY Date_Saved
+    Index("Saved_Sequences", "ix_seq_sid_date", ("student_id", "Date_Saved")),
+    Index("Saved_Sequences", "ix_seq_email_lower", (lower("Student_Email"),)),
+    Index("Sid_Email_Admission", "ix_sea_email_lower", (lower("Primary Email"),)),
+    Index("Sid_Email_Admission", "ix_sea_sid_priority", ("Student ID", "email_priority")),
+    Index("Transcripts", "ix_transcripts_sid", ("Student ID",)),
+    Index("coop", "ix_coop_sid", ("Student ID",)),
+    Index("CGPA_Timeline", "ix_cgpa_sid", ("Student ID",)),
+    # OTP: WHERE email = :email AND used = 0 ORDER BY time DESC LIMIT 1
+    Index("logins", "ix_logins_email_used_time", ("email", "used", "time")),
+    Index("S_id_comments", "ix_comments_sid", ("S_id",)),
+]
+
+
+def q(name):
+    return f"`{name}`"
+
+
+# =========================================================
+# INTROSPECTION
+# =========================================================
+def server_version(conn):
+    raw = str(conn.execute(text("SELECT VERSION()")).scalar())
+    nums = re.findall(r"\d+", raw.split("-")[0])
+    return tuple(int(n) for n in nums[:3]), "mariadb" in raw.lower()
+
+
+def table_info(conn, table):
+    """None when the table does not exist; else {"columns": {name: (data_type, column_type, nullable)}, "indexes": {name: [cols]}}."""
+    cols = conn.execute(text("SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE FROM information_schema.COLUMNS "
+                             "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t ORDER BY ORDINAL_POSITION"), {"t": table}).fetchall()
+    if not cols: return None
+    indexes = {}
+    for name, _, col in conn.execute(text("SELECT INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME FROM information_schema.STATISTICS "
+                                          "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t ORDER BY INDEX_NAME, SEQ_IN_INDEX"), {"t": table}):
+        indexes.setdefault(name, []).append(col)      # COLUMN_NAME e NULL pentru părțile funcționale
+    return {"columns": {c[0]: (str(c[1]).lower(), str(c[2]), c[3] == "YES") for c in cols}, "indexes": indexes}
+
+
+def max_length(conn, table, col):
+    return int(conn.execute(text(f"SELECT COALESCE(MAX(CHAR_LENGTH({q(col)})), 0) FROM {q(table)}")).scalar() or 0)
+
+
+# =========================================================
+# PLAN + APPLY
+# =========================================================
+def plan_index(spec, info, version, is_mariadb=False, lengths=None):
+    """(statements, note) for one Index; statements == [] means nothing to do (note says why)."""
+    if info is None: return [], "table not found"
+    columns = info["columns"]
+    names = [p[1] if isinstance(p, tuple) else p for p in spec.parts]
+    missing = [c for c in names if c not in columns]
+    if missing: return [], f"missing column(s): {', '.join(missing)}"
+    if spec.name in info["indexes"]: return [], "exists"
+
+    plain = [p for p in spec.parts if not isinstance(p, tuple)]
+    if len(plain) == len(spec.parts):
+        for name, cols in info["indexes"].items():
+            if cols[:len(plain)] == list(plain): return [], f"covered by {name}"
+
+    functional = version >= (8, 0, 13) and not is_mariadb
+    statements, keys = [], []
+    for part in spec.parts:
+        if not isinstance(part, tuple):
+            data_type = columns[part][0]
+            keys.append(f"{q(part)}({TEXT_PREFIX})" if data_type in TEXT_TYPES else q(part))
+            continue
+
+        col = part[1]
+        data_type, column_type, nullable = columns[col]
+        if data_type in TEXT_TYPES:
+            # LOWER(TEXT) nu poate fi indexat: trecem coloana pe VARCHAR dacă datele încap
+            longest = (lengths or {}).get(col, 0)
+            if longest > EMAIL_VARCHAR: return [], f"{col} has values longer than {EMAIL_VARCHAR} characters"
+            column_type = f"VARCHAR({EMAIL_VARCHAR})"
+            statements.append(f"ALTER TABLE {q(spec.table)} MODIFY {q(col)} {column_type} {'NULL' if nullable else 'NOT NULL'}")
+        if functional:
+            keys.append(f"(LOWER({q(col)}))")
+        else:
+            generated = f"{col.replace(' ', '_')}_lower"
+            if generated not in columns:
+                statements.append(f"ALTER TABLE {q(spec.table)} ADD COLUMN {q(generated)} {column_type} "
+                                  f"GENERATED ALWAYS AS (LOWER({q(col)})) VIRTUAL")
+            keys.append(q(generated))
+    statements.append(f"CREATE INDEX {q(spec.name)} ON {q(spec.table)} ({', '.join(keys)})")
+    return statements, "functional" if functional and len(plain) < len(spec.parts) else ""
+
+
+def apply(engine, dry_run=False):
+    """Creates Sequence_Blobs and the missing INDEXES; returns the number of statements that failed."""
+    failed = 0
+    if dry_run:
+        print("  Sequence_Blobs: CREATE TABLE IF NOT EXISTS / missing version columns")
+    else:
+        try:
+            with engine.begin() as conn:
+                sequence_store.ensure_schema(conn)
+        except Exception as e:
+            print(f"DB Error migration Sequence_Blobs: {e}")
+            failed += 1
+    with engine.connect() as conn:
+        version, is_mariadb = server_version(conn)
+        print(f"Server {'MariaDB' if is_mariadb else 'MySQL'} {'.'.join(map(str, version))}")
+        infos = {t: table_info(conn, t) for t in {spec.table for spec in INDEXES}}
+        lengths = {}
+        for spec in INDEXES:
+            info = infos[spec.table]
+            for part in spec.parts:
+                if isinstance(part, tuple) and info and part[1] in info["columns"] and info["columns"][part[1]][0] in TEXT_TYPES:
+                    lengths[(spec.table, part[1])] = max_length(conn, spec.table, part[1])
+
+    for spec in INDEXES:
+        statements, note = plan_index(spec, infos[spec.table], version, is_mariadb,
+                                      {col: n for (t, col), n in lengths.items() if t == spec.table})
+        if not statements:
+            print(f"  {spec.table}.{spec.name}: skipped ({note})")
+            continue
+        for sql in statements:
+            print(f"  {spec.table}.{spec.name}: {sql}" + (f"  [{note}]" if note else ""))
+            if dry_run: continue
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(sql))
+            except Exception as e:
+                print(f"DB Error migration {spec.name}: {e}")
+                failed += 1
+                break
+    return failed
+
+
+# =========================================================
+# CHECK (EXPLAIN)
+# =========================================================
+class Unresolved(Exception):
+    """A text() argument that is not built only from literals and module-level constants."""
+
+
+_BIN_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul}
+_CALLS = {"len": len, "str": str, "int": int}
+
+
+def _evaluate(node, env, modules):
+    """Value of a constant expression: literals, module constants (also `module.NAME` of a sibling
+    module), + - *, len() / str() / int() and f-strings over those."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float)): return node.value
+    if isinstance(node, ast.Name) and node.id in env: return env[node.id]
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+            and node.value.id in modules and node.attr in modules[node.value.id]):
+        return modules[node.value.id][node.attr]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_evaluate(node.left, env, modules), _evaluate(node.right, env, modules))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _CALLS and len(node.args) == 1 and not node.keywords:
+        return _CALLS[node.func.id](_evaluate(node.args[0], env, modules))
+    if isinstance(node, ast.JoinedStr):
+        out = []
+        for v in node.values:
+            if isinstance(v, ast.Constant): out.append(v.value)
+            elif isinstance(v, ast.FormattedValue) and v.conversion == -1 and v.format_spec is None:
+                out.append(str(_evaluate(v.value, env, modules)))
+            else: raise Unresolved()
+        return "".join(out)
+    raise Unresolved()
+
+
+def _module_constants(tree, modules=None):
+    env = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try: env[node.targets[0].id] = _evaluate(node.value, env, modules or {})
+            except Unresolved: pass
+    return env
+
+
+def extract_queries(path=APP_SOURCE):
+    """([(line, sql)], [(line, source)]): every text(...) call in the file, resolved statically, and the
+    ones that could not be (their SQL depends on runtime values, so `check` cannot EXPLAIN them)."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source, path)
+    modules = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                sibling = os.path.join(os.path.dirname(os.path.abspath(path)), alias.name + ".py")
+                if os.path.exists(sibling):
+                    with open(sibling, encoding="utf-8") as f:
+                        modules[alias.asname or alias.name] = _module_constants(ast.parse(f.read(), sibling))
+    constants = _module_constants(tree, modules)
+
+    queries, unresolved = [], []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "text" and node.args:
+            try:
+                sql = _evaluate(node.args[0], constants, modules)
+            except Unresolved:
+                unresolved.append((node.lineno, " ".join(ast.get_source_segment(source, node.args[0]).split())))
+                continue
+            queries.append((node.lineno, " ".join(str(sql).split())))
+    return sorted(queries), sorted(unresolved)
+
+
+def explain_params(sql):
+    """SQL with expanding IN :x as IN (:x), plus dummy parameters (ints for LIMIT / OFFSET, strings elsewhere)."""
+    sql = re.sub(r"\bIN\s+:(\w+)", r"IN (:\1)", sql, flags=re.I)
+    ints = set(re.findall(r"\b(?:LIMIT|OFFSET)\s+:(\w+)", sql, flags=re.I))
+    params = {name: (1 if name in ints else "0") for name in re.findall(r"(?<![:\w]):(\w+)", sql)}
+    return sql, params
+
+
+def report_unresolved(path, unresolved):
+    for line, src in unresolved:
+        print(f"{os.path.basename(path)}:{line:<5} NOT CHECKED (SQL built at runtime): {src[:160]}")
+
+
+def check(engine, path=APP_SOURCE):
+    """EXPLAINs each SELECT / UPDATE / DELETE; returns (full scans found, queries that could not be resolved)."""
+    scans = []
+    queries, unresolved = extract_queries(path)
+    report_unresolved(path, unresolved)
+    with engine.connect() as conn:
+        for line, sql in queries:
+            verb = sql.split(" ", 1)[0].upper()
+            if verb not in ("SELECT", "UPDATE", "DELETE"): continue
+            filtered = " WHERE " in f" {sql.upper()} "
+            sql, params = explain_params(sql)
+            try:
+                plan = [dict(r) for r in conn.execute(text("EXPLAIN " + sql), params).mappings()]
+            except Exception as e:
+                print(f"{os.path.basename(path)}:{line}  EXPLAIN failed: {e}")
+                continue
+            for row in plan:
+                access = str(row.get("type") or "").upper()
+                extra = str(row.get("Extra") or "")
+                status = "ok"
+                if access in ("ALL", "INDEX"):
+                    status = ("FULL TABLE SCAN" if access == "ALL" else "FULL INDEX SCAN") if filtered else "full read (no WHERE)"
+                    if filtered: scans.append((line, row.get("table"), access, sql))
+                print(f"{os.path.basename(path)}:{line:<5} {str(row.get('table')):<20} type={access or '-':<7} key={row.get('key') or '-':<28} "
+                      f"rows={row.get('rows')}  {status}" + ("  (filesort)" if "filesort" in extra else ""))
+    return scans, unresolved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planner index migrations and query-plan check.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_apply = sub.add_parser("apply", help="create the missing indexes")
+    p_apply.add_argument("--dry-run", action="store_true", help="print the DDL without running it")
+    p_check = sub.add_parser("check", help="EXPLAIN the queries in app.py and report full scans")
+    p_check.add_argument("--list", action="store_true", help="only print the extracted queries")
+    p_check.add_argument("--source", default=APP_SOURCE, help="file to extract text() queries from (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "check" and args.list:
+        queries, unresolved = extract_queries(args.source)
+        for line, sql in queries: print(f"{os.path.basename(args.source)}:{line:<5} {sql}")
+        report_unresolved(args.source, unresolved)
+        sys.exit(1 if unresolved else 0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    if app.engine is None:
+        print("No database configured (planner_db_* environment variables).")
+        sys.exit(2)
+    if args.command == "apply":
+        sys.exit(1 if apply(app.engine, dry_run=args.dry_run) else 0)
+    scans, unresolved = check(app.engine, args.source)
+    print(f"{len(scans)} full scan(s) in filtered queries, {len(unresolved)} quer{'y' if len(unresolved) == 1 else 'ies'} not checked")
+    sys.exit(1 if scans or unresolved else 0)
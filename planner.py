@@ -0,0 +1,1145 @@
+import os
+import re
+import time
+import json
+import hashlib
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from collections import defaultdict, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import catalog
+from catalog import ProgramDag, get_level, normalize_program, parse_requirements
+
+logger = logging.getLogger(__name__)   # statistica per-solve, la nivel DEBUG
+
+# =========================================================
+# BACKWARD-CHAINING SEQUENCE PLANNER (/generate)
+# =========================================================
+STANDARD_SEQUENCES = {
+    "INDUSTRIAL": {
+        "ACCO220": "Y1_FALL", "ENGR213": "Y1_FALL", "INDU211": "Y1_FALL", "MIAE211": "Y1_FALL", "ENGR245": "Y1_FALL",
+        "ENCS282": "Y1_WIN", "ENGR201": "Y1_WIN", "MIAE215": "Y1_WIN", "MIAE221": "Y1_WIN", "MIAE313": "Y1_WIN",
+        "ENGR202": "Y2_SUM1", "INDU323": "Y2_SUM1", "ENGR233": "Y2_SUM1", "ENGR251": "Y2_SUM1", "ENGR371": "Y2_SUM1",
+        "INDU371": "Y2_FALL", "INDU372": "Y2_FALL", "MIAE380": "Y2_FALL", "MIAE311": "Y2_FALL", "MIAE312": "Y2_FALL", "ENGR301": "Y2_FALL",
+        "WT1": "Y2_WIN",
+        "INDU311": "Y3_SUM1", "ENGR311": "Y3_SUM1", "INDU320": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1",
+        "WT2": "Y3_FALL",
+        "INDU324": "Y3_WIN", "INDU330": "Y3_WIN", "INDU412": "Y3_WIN", "INDU321": "Y3_WIN", "INDU421": "Y3_WIN",
+        "WT3": "Y4_SUM1",
+        "INDU342": "Y4_FALL", "INDU423": "Y4_FALL", "INDU490A": "Y4_FALL",
+        "INDU490B": "Y4_WIN"
+    },
+    "MECHANICAL": {
+        "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE211": "Y1_FALL", "MIAE215": "Y1_FALL",
+        "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "MIAE313": "Y1_WIN", "MIAE221": "Y1_WIN",
+        "ENGR201": "Y2_SUM1", "ENGR202": "Y2_SUM1", "ENGR251": "Y2_SUM1", "ENGR311": "Y2_SUM1", "MIAE311": "Y2_SUM1", "MIAE312": "Y2_SUM1",
+        "MECH321": "Y2_FALL", "MECH343": "Y2_FALL", "MECH351": "Y2_FALL", "MIAE380": "Y2_FALL", "ENGR361": "Y2_FALL",
+        "WT1": "Y2_WIN",
+        "ENGR371": "Y3_SUM1", "MECH352": "Y3_SUM1", "MECH361": "Y3_SUM1", "ENGR391": "Y3_SUM1", "MECH390": "Y3_SUM1",
+        "WT2": "Y3_FALL",
+        "MECH371": "Y3_WIN", "MIAE383": "Y3_WIN", "MECH373": "Y3_WIN", "MECH375": "Y3_WIN", "ENGR392": "Y3_WIN",
+        "WT3": "Y4_SUM1",
+        "MECH368": "Y4_FALL", "ENGR301": "Y4_FALL", "MECH344": "Y4_FALL", "MECH490A": "Y4_FALL",
+        "MECH490B": "Y4_WIN"
+    },
+    "AERO_A": {
+        "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE215": "Y1_FALL", "AERO201": "Y1_FALL",
+        "ENGR233": "Y1_WIN", "ENGR201": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR251": "Y1_WIN", "ENGR202": "Y1_WIN",
+        "AERO290": "Y2_SUM1", "ENGR311": "Y2_SUM1", "ENGR361": "Y2_SUM1", "ENGR371": "Y2_SUM1", "MIAE211": "Y2_SUM1",
+        "AERO371": "Y2_FALL", "MECH343": "Y2_FALL", "MECH352": "Y2_FALL", "MIAE221": "Y2_FALL",
+        "WT1": "Y2_WIN",
+        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "AERO417": "Y3_SUM1", "ENGR392": "Y3_SUM1",
+        "WT2": "Y3_FALL",
+        "AERO481": "Y3_WIN", "MECH361": "Y3_WIN", "MECH351": "Y3_WIN", "MIAE383": "Y3_WIN",
+        "WT3": "Y4_SUM1",
+        "AERO462": "Y4_FALL", "AERO464": "Y4_FALL", "MECH461": "Y4_FALL", "AERO455": "Y4_FALL", "AERO490A": "Y4_FALL",
+        "AERO465": "Y4_WIN", "AERO490B": "Y4_WIN"
+    },
+    "AERO_B": {
+        "AERO201": "Y1_FALL", "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "MIAE215": "Y1_FALL",
+        "AERO253": "Y1_WIN", "ENGR201": "Y1_WIN", "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR202": "Y1_WIN",
+        "AERO290": "Y2_SUM1", "ENGR311": "Y2_SUM1", "ENGR361": "Y2_SUM1", "ENGR371": "Y2_SUM1", "MIAE211": "Y2_SUM1",
+        "AERO371": "Y2_FALL", "MECH343": "Y2_FALL", "MIAE221": "Y2_FALL", "MIAE313": "Y2_FALL",
+        "WT1": "Y2_WIN",
+        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1", "MECH375": "Y3_SUM1",
+        "WT2": "Y3_FALL",
+        "AERO481": "Y3_WIN", "MECH373": "Y3_WIN", "MIAE311": "Y3_WIN", "MIAE312": "Y3_WIN", "MIAE383": "Y3_WIN",
+        "WT3": "Y4_SUM1",
+        "AERO431": "Y4_FALL", "AERO417": "Y4_FALL", "AERO486": "Y4_FALL", "MECH460": "Y4_FALL", "MECH412": "Y4_FALL", "AERO490A": "Y4_FALL",
+        "AERO487": "Y4_WIN", "AERO490B": "Y4_WIN"
+    },
+    "AERO_C": {
+        "AERO201": "Y1_FALL", "ENCS282": "Y1_FALL", "ENGR213": "Y1_FALL", "ENGR242": "Y1_FALL", "COEN243": "Y1_FALL",
+        "ELEC273": "Y1_WIN", "ENGR233": "Y1_WIN", "ENGR243": "Y1_WIN", "ENGR244": "Y1_WIN", "ENGR201": "Y1_WIN",
+        "COEN212": "Y2_SUM1", "COEN231": "Y2_SUM1", "ELEC242": "Y2_SUM1", "ENGR202": "Y2_SUM1", "ENGR361": "Y2_SUM1",
+        "AERO290": "Y2_FALL", "AERO371": "Y2_FALL", "COEN244": "Y2_FALL", "ELEC342": "Y2_FALL", "AERO253": "Y2_FALL", "ENGR371": "Y2_FALL",
+        "WT1": "Y2_WIN",
+        "ENGR301": "Y3_SUM1", "AERO390": "Y3_SUM1", "ENGR391": "Y3_SUM1", "ENGR392": "Y3_SUM1", "COEN311": "Y3_SUM1",
+        "WT2": "Y3_FALL",
+        "COEN352": "Y3_WIN", "ELEC481": "Y3_WIN", "MIAE383": "Y3_WIN", "AERO482": "Y3_WIN",
+        "WT3": "Y4_SUM1",
+        "AERO417": "Y4_FALL", "ELEC483": "Y4_FALL", "SOEN341": "Y4_FALL", "AERO483": "Y4_FALL", "AERO490A": "Y4_FALL",
+        "AERO490B": "Y4_WIN"
+    }
+}
+
+
+TERMS = ["SUM", "FALL", "WIN"]
+N_YEARS = 7
+N_SLOTS = N_YEARS * 3      # indexul unui termen = (an - 1) * 3 + poziția în TERMS
+Y0_IDX = -1                # cursurile din Y0 (ECP / transfer) sunt "luate" înaintea oricărui termen
+NO_STD = 999
+
+# Bugetul maxim acceptat pentru o căutare (ms); 0 = fără limită impusă de server
+MAX_TIME_BUDGET_MS = float(os.environ.get("PLANNER_MAX_TIME_MS", "0") or 0)
+DEADLINE_CHECK_EVERY = 64
+
+# Top-k: câte alternative poate cere clientul și câte ramuri încercăm pentru fiecare alternativă cerută
+MAX_ALTERNATIVES = int(os.environ.get("PLANNER_MAX_ALTERNATIVES", "5"))
+ALT_BRANCHES_PER_PLAN = 4
+ALT_SLOTS_PER_GOAL = 2
+
+# Mesajele pentru cheile întoarse de SequencePlanner.slot_rejection
+SLOT_RULES = {
+    "offering": "not offered that term",
+    "work_term": "term holds a Work Term",
+    "closed": "term limit set to 0",
+    "credits": "term credit limit reached",
+    "count": "term course limit reached",
+    "level_order": "400-level courses must follow every 200-level course",
+    "capstone_term": "490A goes in FALL and 490B in WIN",
+    "capstone_pair": "490A must be in the term right before 490B",
+}
+# Respingeri care nu țin de un termen anume (doar pentru instrumentare)
+SEARCH_RULES = ("excluded", "depth_limit", "no_window")
+
+
+class SearchCutOff(Exception):
+    """Raised inside solve_branch when the time or node budget runs out."""
+
+
+def standard_sequence_for(program_name):
+    prog_upper = program_name.upper()
+    if "INDUSTRIAL" in prog_upper: return STANDARD_SEQUENCES.get("INDUSTRIAL", {})
+    elif "MECHANICAL" in prog_upper: return STANDARD_SEQUENCES.get("MECHANICAL", {})
+    elif "AERO A" in prog_upper or "AERODYNAMICS" in prog_upper: return STANDARD_SEQUENCES.get("AERO_A", {})
+    elif "AERO B" in prog_upper or "STRUCTURES" in prog_upper: return STANDARD_SEQUENCES.get("AERO_B", {})
+    elif "AERO C" in prog_upper or "AVIONICS" in prog_upper: return STANDARD_SEQUENCES.get("AERO_C", {})
+    return {}
+
+
+def term_label(idx):
+    return f"Y{idx // 3 + 1} {TERMS[idx % 3]}"
+
+
+def std_slot(pos_str):
+    """'Y2_SUM1' -> term index, or NO_STD."""
+    if not pos_str: return NO_STD
+    try:
+        parts = pos_str.split('_')
+        y = int(parts[0].replace('Y', ''))
+        t = parts[1]
+        if "SUM" in t: t = "SUM"
+        if t in TERMS:
+            return (y - 1) * 3 + TERMS.index(t)
+    except: pass
+    return NO_STD
+
+
+class SequencePlanner:
+    """Search state for one /generate request.
+
+    Courses are addressed by integer index. Each term keeps its ordered course list (for the
+    JSON output), its credit total and a WT counter; the taken set is a bitmask and the
+    level-2 / level-4 ordering rule is answered from two bitmasks of occupied term indices,
+    so every validity check and every undo is O(1).
+    """
+
+    def __init__(self, prog, data):
+        self.program_name = normalize_program(data.get('program', ''))
+        term_limits = data.get('term_limits', {})
+        count_limits = data.get('count_limits', {})
+        placed_ui = data.get('placed', {})
+        self.unallocated_ids = data.get('unallocated', [])
+        self.repeated = data.get('repeated', [])
+
+        # --- Tabela de cursuri pentru acest request (catalog + dummy-uri REPEATED) ---
+        # Înregistrările Course sunt imutabile și partajate cu catalogul; copiem doar dicționarele de index.
+        courses = dict(prog.records)
+        prereqs_map = prog.prereqs
+        coreqs_map = prog.coreqs
+
+        rep_counts = defaultdict(int)
+        if self.repeated:
+            prereqs_map = dict(prereqs_map)
+            coreqs_map = dict(coreqs_map)
+            prq_text = {cid: str(r.get('PRE-REQUISITE', '')) for cid, r in prog.rows.items()}
+        for cid in self.repeated:
+            if cid in courses:
+                rep_counts[cid] += 1
+                count = rep_counts[cid]
+                rep_id = f"REP{count}_{cid}"
+
+                courses[rep_id] = courses[cid].repeated(rep_id, count)
+                prq_text[rep_id] = f"REP{count-1}_{cid}" if count > 1 else ""
+                prereqs_map[rep_id] = parse_requirements(prq_text[rep_id])
+                coreqs_map[rep_id] = coreqs_map.get(cid, [])
+
+                orig_prq = prq_text[cid]
+                if orig_prq and orig_prq.lower() not in ['n/a', 'none']:
+                    prq_text[cid] = orig_prq + "; " + rep_id
+                else:
+                    prq_text[cid] = rep_id
+                prereqs_map[cid] = parse_requirements(prq_text[cid])
+
+                for other_cid in courses:
+                    if other_cid != cid and other_cid != rep_id:
+                        other_prq = prq_text[other_cid]
+                        if other_prq and other_prq.lower() not in ['n/a', 'none']:
+                            if re.search(rf'\b{cid}\b', other_prq):
+                                prq_text[other_cid] = other_prq + "; " + rep_id
+                                prereqs_map[other_cid] = parse_requirements(prq_text[other_cid])
+
+        self.courses = list(courses.values())
+        self.ids = list(courses)
+        self.ix = {cid: i for i, cid in enumerate(self.ids)}
+        n = len(self.ids)
+
+        std_prog = standard_sequence_for(self.program_name)
+        self.is_wt = ['WT' in cid.upper() for cid in self.ids]
+        # WT sau REPEAT: nu consumă din limitele termenului
+        self.is_special = [self.is_wt[i] or c.is_repeat for i, c in enumerate(self.courses)]
+        self.cr = [0.0 if self.is_special[i] else c.credit for i, c in enumerate(self.courses)]
+        self.level = [c.level for c in self.courses]
+        self.std_idx = [std_slot(std_prog.get(cid, "")) for cid in self.ids]
+        self.offered = [c.offered for c in self.courses]
+        # creditele care intră în totalul de 120 (fără WT, REPEAT, ECP)
+        self.degree_cr = [0.0 if (c.is_wt or c.is_repeat or c.is_ecp) else c.credit for c in self.courses]
+
+        # --- Starea căutării ---
+        self.term_courses = [[] for _ in range(N_SLOTS)]
+        self.term_credits = [0] * N_SLOTS
+        self.term_wts = [0] * N_SLOTS
+        self.total_credits = 0.0       # suma degree_cr peste cursurile din grilă (Y0 nu intră), ținută de place/undo
+        self.pos = [None] * n
+        self.taken_mask = 0
+        self.external_taken = {}       # cursuri din Y0 care nu sunt în catalogul programului
+        self.lvl2_mask = 0             # bit (idx + 1) setat <=> există un curs de nivel 2 luat la idx
+        self.lvl4_mask = 0             # idem pentru cursurile de nivel >= 4
+        self.lvl2_at = [0] * (N_SLOTS + 1)
+        self.lvl4_at = [0] * (N_SLOTS + 1)
+
+        self.limit_cr = [0.0] * N_SLOTS
+        self.limit_cnt = [0] * N_SLOTS
+        for idx in range(N_SLOTS):
+            y, t = idx // 3 + 1, TERMS[idx % 3]
+            self.limit_cr[idx] = float(term_limits.get(f"Y{y}_{t}", 16.0 if t == 'SUM' else 18.0))
+            self.limit_cnt[idx] = int(count_limits.get(f"Y{y}_{t}", 6 if t == 'SUM' else 5))
+
+        for tk, cids in placed_ui.items():
+            if not cids: continue
+            if "Y0" in tk:
+                for cid in cids:
+                    if cid in self.ix: self._take(self.ix[cid], Y0_IDX)
+                    elif cid not in self.external_taken:
+                        self.external_taken[cid] = get_level(cid)
+                        self._count_level(self.external_taken[cid], Y0_IDX, 1)
+                continue
+            y_str = tk.split("_")[0]; t = tk.split("_")[1]; y = int(y_str[1:])
+            if "SUM" in t:
+                t = "SUM"
+            for cid in cids:
+                if cid in self.ix and y <= N_YEARS:
+                    self.place(self.ix[cid], (y - 1) * 3 + TERMS.index(t))
+
+        # Graful de cerințe e precalculat per program; dummy-urile REPEATED schimbă cerințele, deci îl refacem
+        self.dag = ProgramDag(self.ids, prereqs_map, coreqs_map) if rep_counts else prog.dag
+        # Grupurile de cerințe, doar cu opțiunile din catalog; o opțiune externă luată în Y0 contează ca index -1
+        ext = self.external_taken
+        self.pre_groups = [[(opts, bool(ext_opts) and any(o in ext for o in ext_opts)) for opts, ext_opts in groups] for groups in self.dag.pre_groups]
+        self.co_groups = [[(opts, bool(ext_opts) and any(o in ext for o in ext_opts)) for opts, ext_opts in groups] for groups in self.dag.co_groups]
+        self.ancestors = self.dag.ancestors
+        self.critical_path = self.dag.critical_path
+
+        # 490A/490B: indexul partenerului; -1 = partenerul nu e în catalog, -2 = e în afara catalogului dar luat în Y0
+        self.partner_490 = [None] * n
+        for i, cid in enumerate(self.ids):
+            other = cid.replace('490A', '490B') if '490A' in cid else (cid.replace('490B', '490A') if '490B' in cid else None)
+            if other is not None: self.partner_490[i] = self.ix.get(other, -2 if other in self.external_taken else -1)
+
+        self.remaining = set(c for c in self.unallocated_ids if c in self.ix and not self.is_taken(self.ix[c]))
+        for cid in self.repeated:
+            rep_id = "REP_" + cid
+            if rep_id in self.ix and not self.is_taken(self.ix[rep_id]): self.remaining.add(rep_id)
+
+
+        # --- Anytime: buget, contoare și trail pentru rollback ---
+        self.deadline = None
+        self.node_budget = None
+        self.nodes = 0
+        self.backtracks = 0
+        self.cut_off = False
+        self.elapsed_ms = 0.0
+        self.trail = []            # cursuri plasate de căutare pentru obiectivul curent
+        self.completed = set()     # ...dintre care ramura lor (cu toate prerechizitele) s-a încheiat cu succes
+        self.goals = []
+        self.alternatives_cut_off = False
+        self.repaired = None
+
+        # --- Instrumentare ---
+        self.rejections = defaultdict(int)     # cheie SLOT_RULES / SEARCH_RULES -> de câte ori
+        self.max_depth = 0
+        self.phase_ms = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try: yield
+        finally: self.phase_ms[name] += (time.perf_counter() - started) * 1000
+
+    def set_budget(self, time_budget_ms=None, node_budget=None):
+        if time_budget_ms: self.deadline = time.perf_counter() + time_budget_ms / 1000.0
+        if node_budget: self.node_budget = node_budget
+
+    # --- Primitive de stare ---
+    def _count_level(self, level, idx, delta):
+        bit = idx + 1
+        if level == 2:
+            self.lvl2_at[bit] += delta
+            if self.lvl2_at[bit]: self.lvl2_mask |= 1 << bit
+            else: self.lvl2_mask &= ~(1 << bit)
+        elif level >= 4:
+            self.lvl4_at[bit] += delta
+            if self.lvl4_at[bit]: self.lvl4_mask |= 1 << bit
+            else: self.lvl4_mask &= ~(1 << bit)
+
+    def _take(self, i, idx):
+        if self.pos[i] is not None: self._count_level(self.level[i], self.pos[i], -1)
+        self.pos[i] = idx
+        self.taken_mask |= 1 << i
+        self._count_level(self.level[i], idx, 1)
+
+    def is_taken(self, i):
+        return (self.taken_mask >> i) & 1
+
+    def max_lvl2_idx(self):
+        return self.lvl2_mask.bit_length() - 2 if self.lvl2_mask else None
+
+    def min_lvl4_idx(self):
+        return (self.lvl4_mask & -self.lvl4_mask).bit_length() - 2 if self.lvl4_mask else None
+
+    def place(self, i, idx):
+        self.term_courses[idx].append(i)
+        self.term_credits[idx] += self.cr[i]
+        self.total_credits += self.degree_cr[i]
+        if self.is_wt[i]: self.term_wts[idx] += 1
+        self._take(i, idx)
+
+    def undo(self, i):
+        idx = self.pos[i]
+        if idx is None: return
+        if idx != Y0_IDX:
+            target = self.term_courses[idx]
+            if i in target: target.remove(i)
+            self.term_credits[idx] -= self.cr[i]
+            self.total_credits -= self.degree_cr[i]
+            if self.is_wt[i]: self.term_wts[idx] -= 1
+        self._count_level(self.level[i], idx, -1)
+        self.pos[i] = None
+        self.taken_mask &= ~(1 << i)
+
+    # --- Reguli ---
+    def slot_rejection(self, i, idx, ignore_offering=False):
+        """None if course i can go in term idx right now, otherwise the key of the rule that blocks it."""
+        if idx >= N_SLOTS: return "past_end"
+        t = TERMS[idx % 3]
+
+        if not ignore_offering and t not in self.offered[i]:
+            return "offering"
+
+        is_wt_c = self.is_wt[i]
+        count = len(self.term_courses[idx])
+        if self.term_wts[idx] and not is_wt_c and count >= 1: return "work_term"
+        if is_wt_c and count > 0: return "work_term"
+
+        l_cr = self.limit_cr[idx]
+        l_cnt = self.limit_cnt[idx]
+        if l_cr == 0 or l_cnt == 0: return "closed"
+
+        if not self.is_special[i]:
+            if self.term_credits[idx] + self.cr[i] > l_cr: return "credits"
+            if count >= l_cnt: return "count"
+
+        level = self.level[i]
+        if level >= 4:
+            m = self.max_lvl2_idx()
+            if m is not None and m >= idx: return "level_order"
+        if level == 2:
+            m = self.min_lvl4_idx()
+            if m is not None and m <= idx: return "level_order"
+
+        cid = self.ids[i]
+        partner = self.partner_490[i]
+        if partner is not None:
+            if '490B' in cid and t != 'WIN': return "capstone_term"
+            if '490A' in cid and t != 'FALL': return "capstone_term"
+            if '490A' in cid:
+                partner_idx = self.pos[partner] if partner >= 0 else (Y0_IDX if partner == -2 else None)
+                if partner_idx is not None and idx != partner_idx - 1: return "capstone_pair"
+
+        return None
+
+    # --- Căutarea (backward chaining) ---
+    def solve_branch(self, i, max_allowed_idx, depth, exclude=None):
+        self.nodes += 1
+        if self.nodes % DEADLINE_CHECK_EVERY == 0 or self.node_budget:
+            if (self.deadline is not None and time.perf_counter() > self.deadline) or (self.node_budget and self.nodes > self.node_budget):
+                raise SearchCutOff()
+
+        if depth > 15:
+            self.rejections["depth_limit"] += 1
+            return False
+        if depth > self.max_depth: self.max_depth = depth
+
+        pos = self.pos
+        if pos[i] is not None: return pos[i] <= max_allowed_idx
+
+        min_term_index = -1
+        for opts, ext_taken in self.pre_groups[i]:
+            taken_opts = [pos[o] for o in opts if pos[o] is not None]
+            if ext_taken: taken_opts.append(Y0_IDX)
+            if taken_opts: min_term_index = max(min_term_index, min(taken_opts))
+
+        start_idx = max(0, min_term_index + 1)
+        # Niciun strămoș luat: cursul nu poate ajunge mai devreme decât lungimea lanțului de cerințe
+        if not (self.ancestors[i] & self.taken_mask): start_idx = max(start_idx, self.critical_path[i])
+
+        if self.level[i] >= 4:
+            m = self.max_lvl2_idx()
+            if m is not None: start_idx = max(start_idx, m + 1)
+
+        cid = self.ids[i]
+        partner = self.partner_490[i]
+        if partner is not None and partner >= 0 and '490B' in cid and pos[partner] is not None:
+            start_idx = max(start_idx, pos[partner] + 1)
+
+        std_idx = self.std_idx[i]
+        if self.is_wt[i] and std_idx != NO_STD: start_idx = max(start_idx, std_idx)
+
+        if start_idx > max_allowed_idx:
+            self.rejections["no_window"] += 1
+            return False
+
+        search_space = list(range(start_idx, max_allowed_idx + 1))
+        if std_idx != NO_STD:
+            search_space.sort(key=lambda x: abs(x - std_idx))
+        else:
+            if depth == 0: search_space.sort()
+            else: search_space.sort(reverse=True)
+
+        for idx in search_space:
+            if exclude and idx in exclude:
+                self.rejections["excluded"] += 1; continue
+            reason = self.slot_rejection(i, idx)
+            if reason:
+                self.rejections[reason] += 1; continue
+
+            self.place(i, idx)
+            self.trail.append(i)
+            success = True
+
+            for opts, _ in self.pre_groups[i]:
+                grp_ok = False
+                for opt in opts:
+                    if self.solve_branch(opt, idx - 1, depth + 1):
+                        grp_ok = True; break
+                if not grp_ok: success = False; break
+
+            if success:
+                for opts, _ in self.co_groups[i]:
+                    grp_ok = False
+                    for opt in opts:
+                        if self.solve_branch(opt, idx, depth + 1):
+                            grp_ok = True; break
+                    if not grp_ok: success = False; break
+
+            if success:
+                self.remaining.discard(cid)
+                self.completed.add(i)
+                return True
+
+            self.undo(i)
+            self.backtracks += 1
+
+        return False
+
+    def goal_priority(self, cid):
+        i = self.ix[cid]
+        is_te = 1 if self.courses[i].is_te else 0
+        return (-is_te, self.dag.ancestor_count[i], self.level[i])
+
+    def rollback_goal(self):
+        """Undoes the unfinished part of the interrupted goal.
+
+        Sub-branches that already succeeded stay placed: each of them is a course whose whole
+        prerequisite chain is consistently placed, so the result is the best partial plan reached.
+        """
+        for i in reversed(self.trail):
+            if i not in self.completed and self.pos[i] is not None: self.undo(i)
+        self.trail.clear(); self.completed.clear()
+
+    # --- Verificare rapidă de fezabilitate (înainte de căutare) ---
+    def earliest_slots(self):
+        """(earliest, bounds): the earliest term index each course could still occupy (None if no
+        term is left for it) and the lower bound its requirements put on that index.
+
+        A relaxation of the search: every course is checked against the current grid on its own
+        (terms only fill up during the search) and a requirement group only needs some option
+        that is placed, or could be placed, early enough. None here means the search cannot
+        place the course either.
+        """
+        pos = self.pos
+        earliest = [p if p is not None else (0 if i in self.dag.cyclic else None) for i, p in enumerate(pos)]
+        bounds = [0] * len(pos)
+        for i in self.dag.topo_order:
+            if pos[i] is not None: continue
+            bound = 0
+            for groups, shift in ((self.pre_groups[i], 1), (self.co_groups[i], 0)):
+                for opts, ext_taken in groups:
+                    if ext_taken: continue
+                    cands = [earliest[o] for o in opts if earliest[o] is not None]
+                    bound = max(bound, min(cands) + shift if cands else N_SLOTS)
+            partner = self.partner_490[i]
+            if partner is not None and partner >= 0 and '490B' in self.ids[i] and pos[partner] is not None:
+                bound = max(bound, pos[partner] + 1)
+            bounds[i] = bound
+            earliest[i] = next((idx for idx in range(bound, N_SLOTS) if not self.slot_rejection(i, idx)), None)
+        return earliest, bounds
+
+    def infeasibility(self):
+        """Reason why the required (non-TE) unallocated courses cannot all be placed, or None.
+
+        Cheap checks only: per-course earliest term (prerequisite chain, offering, term limits,
+        Work Terms, 200/400 ordering, 490A/490B pairing) and the free credit / course capacity
+        left in the grid.
+        """
+        required = [i for i in sorted(map(self.ix.get, self.remaining)) if not self.courses[i].is_te]
+        if not required: return None
+
+        earliest, bounds = self.earliest_slots()
+        blocked = [i for i in required if earliest[i] is None]
+        # Întâi cauzele propriu-zise; cursurile blocate doar de o cerință imposibilă sunt doar numărate
+        roots = [i for i in blocked if bounds[i] < N_SLOTS]
+        reasons = [self._explain_unplaceable(i, earliest, bounds[i]) for i in (roots or blocked)]
+        if roots and len(blocked) > len(roots):
+            dependents = [self.ids[i] for i in blocked if bounds[i] >= N_SLOTS]
+            reasons.append(f"{len(dependents)} more course{'s' if len(dependents) != 1 else ''} depend on these: {', '.join(dependents[:8])}{', ...' if len(dependents) > 8 else ''}.")
+
+        if not reasons:
+            open_terms = [idx for idx in range(N_SLOTS) if self.limit_cr[idx] > 0 and self.limit_cnt[idx] > 0 and not self.term_wts[idx]]
+            free_cr = sum(max(0.0, self.limit_cr[idx] - self.term_credits[idx]) for idx in open_terms)
+            free_cnt = sum(max(0, self.limit_cnt[idx] - len(self.term_courses[idx])) for idx in open_terms)
+            counted = [i for i in required if not self.is_special[i]]
+            need_cr = sum(self.cr[i] for i in counted)
+            if need_cr > free_cr:
+                reasons.append(f"The remaining required courses need {need_cr:g} credits but the term limits only leave {free_cr:g} free credits.")
+            if len(counted) > free_cnt:
+                reasons.append(f"{len(counted)} required courses are still unallocated but the course limits only leave {free_cnt} free places.")
+
+        if not reasons: return None
+        if len(reasons) > 8: reasons = reasons[:7] + [f"...and {len(reasons) - 7} more."]
+        return "The remaining courses cannot be scheduled with this grid:\n" + "\n".join("• " + r for r in reasons)
+
+    def _explain_unplaceable(self, i, earliest, bound):
+        cid = self.ids[i]
+        if bound >= N_SLOTS:
+            for groups, shift in ((self.pre_groups[i], 1), (self.co_groups[i], 0)):
+                for opts, ext_taken in groups:
+                    if ext_taken: continue
+                    names = " or ".join(self.ids[o] for o in opts)
+                    cands = [earliest[o] for o in opts if earliest[o] is not None]
+                    if not cands: return f"{cid}: its requirement {names} cannot be placed either."
+                    if min(cands) + shift >= N_SLOTS: return f"{cid}: its requirement {names} cannot be taken before {term_label(N_SLOTS - 1)}."
+            return f"{cid}: its 490A/490B partner leaves no later term."
+
+        counts = OrderedDict()
+        for idx in range(bound, N_SLOTS):
+            key = self.slot_rejection(i, idx)
+            counts[key] = counts.get(key, 0) + 1
+        parts = [f"{SLOT_RULES.get(key, key)} ({n} term{'s' if n != 1 else ''})" for key, n in sorted(counts.items(), key=lambda kv: -kv[1])]
+        span = f" from {term_label(bound)} on" if bound > 0 else ""
+        return f"{cid}: no valid term{span} — " + "; ".join(parts) + "."
+
+    def goal_order(self, goals=None):
+        # Ordinea obiectivelor nu depinde de ordinea din set (hash randomizat per proces): egalitățile se rup după cod
+        remaining_list = sorted(self.remaining if goals is None else goals)
+        remaining_list.sort(key=self.goal_priority, reverse=True)
+        return remaining_list
+
+    def solve_goals(self, goals, log=None):
+        """Greedy pass over the goals; raises SearchCutOff after rolling back the goal in progress.
+
+        With `log`, appends (goal index, state before the goal, root term index) for every goal
+        the pass actually searched, so alternative plans can restart from any of them.
+        """
+        for c in goals:
+            if c not in self.remaining: continue
+            i = self.ix[c]
+            before = self.snapshot() if log is not None else None
+            self.trail.clear(); self.completed.clear()
+            try:
+                self.solve_branch(i, 20, 0)
+            except SearchCutOff:
+                self.rollback_goal()
+                raise
+            if log is not None: log.append((i, before, self.pos[i]))
+
+    def run(self, log=None, goals=None):
+        started = time.perf_counter()
+        self.goals = self.goal_order(goals)
+        try:
+            self.solve_goals(self.goals, log)
+        except SearchCutOff:
+            self.cut_off = True
+        self.elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.debug("Planner %s: %d goals, %d nodes, %d backtracks, depth %d, %.1f ms%s", self.program_name, len(self.goals),
+                     self.nodes, self.backtracks, self.max_depth, self.elapsed_ms, " (cut off)" if self.cut_off else "")
+
+    # --- Reparare incrementală (mode: "repair") ---
+    def broken_requirements(self, i):
+        """Requirement groups of placed course i that no placed option satisfies any more."""
+        pos = self.pos
+        p = pos[i]
+        broken = []
+        for groups, strict in ((self.pre_groups[i], True), (self.co_groups[i], False)):
+            for opts, ext_taken in groups:
+                if ext_taken: continue
+                if not any(pos[o] is not None and (pos[o] < p if strict else pos[o] <= p) for o in opts):
+                    broken.append(opts)
+        return broken
+
+    def repair(self, moved, locked=()):
+        """Unplaces what a drag-and-drop left inconsistent and returns the goals to re-solve.
+
+        Only the prerequisite/corequisite neighbourhood of the moved courses is looked at
+        (their ancestors and descendants in the DAG). Moved, locked, Work Term and Y0 courses stay
+        where they are; a course in the neighbourhood is unplaced when one of its requirement
+        groups is no longer satisfied (or, if the course itself is pinned, the late options of
+        that group are), and an overfull target term gives back its latest unpinned courses.
+        The goals are the unplaced courses plus the unallocated ones from the neighbourhood;
+        every other unallocated course stays unallocated.
+        """
+        pos = self.pos
+        moved_ix = [self.ix[c] for c in moved if c in self.ix]
+        pinned = set(moved_ix) | {self.ix[c] for c in locked if c in self.ix}
+        pinned |= {i for i in range(len(self.ids)) if self.is_wt[i] or pos[i] == Y0_IDX}
+
+        hood = 0
+        for m in moved_ix: hood |= (1 << m) | self.dag.ancestors[m] | self.dag.descendants[m]
+        in_hood = [i for i in range(len(self.ids)) if (hood >> i) & 1]
+        unplaced = []
+
+        def unplace(i):
+            self.undo(i)
+            self.remaining.add(self.ids[i])
+            unplaced.append(i)
+
+        for m in moved_ix:
+            idx = pos[m]
+            if idx is None or idx == Y0_IDX or self.is_special[m]: continue
+            for i in reversed(list(self.term_courses[idx])):
+                if self.term_credits[idx] <= self.limit_cr[idx] and len(self.term_courses[idx]) <= self.limit_cnt[idx]: break
+                if i not in pinned: unplace(i)
+
+        changed = True
+        while changed:
+            changed = False
+            for i in in_hood:
+                if pos[i] is None or pos[i] == Y0_IDX: continue
+                for opts in self.broken_requirements(i):
+                    if i not in pinned:
+                        unplace(i); changed = True
+                        break
+                    for o in opts:
+                        if pos[o] is not None and pos[o] != Y0_IDX and o not in pinned:
+                            unplace(o); changed = True
+
+        self.repaired = [self.ids[i] for i in unplaced]
+        goals = set(unplaced) | {i for i in in_hood if self.ids[i] in self.remaining}
+        return [self.ids[i] for i in sorted(goals)]
+
+    # --- Alternative (top-k) ---
+    def snapshot(self):
+        return ([list(t) for t in self.term_courses], list(self.term_credits), list(self.term_wts), self.total_credits, list(self.pos),
+                self.taken_mask, self.lvl2_mask, self.lvl4_mask, list(self.lvl2_at), list(self.lvl4_at), set(self.remaining))
+
+    def restore(self, snap):
+        (term_courses, term_credits, term_wts, self.total_credits, pos, self.taken_mask, self.lvl2_mask, self.lvl4_mask,
+         lvl2_at, lvl4_at, remaining) = snap
+        self.term_courses = [list(t) for t in term_courses]
+        self.term_credits = list(term_credits); self.term_wts = list(term_wts); self.pos = list(pos)
+        self.lvl2_at = list(lvl2_at); self.lvl4_at = list(lvl4_at); self.remaining = set(remaining)
+
+    def objective(self):
+        """Ranking of a finished plan; lower is better, compared in this order."""
+        unplaced = sum(1 for c in self.remaining if not self.courses[self.ix[c]].is_te)
+        study = [idx for idx in range(N_SLOTS) if any(not self.is_wt[i] for i in self.term_courses[idx])]
+        grad_idx = study[-1] if study else 0
+        std_distance = sum(abs(self.pos[i] - self.std_idx[i]) for i in range(len(self.ids))
+                           if self.std_idx[i] != NO_STD and self.pos[i] is not None and self.pos[i] >= 0)
+        loads = [self.term_credits[idx] for idx in range(grad_idx + 1) if not self.term_wts[idx] and self.limit_cr[idx] > 0]
+        mean = sum(loads) / len(loads) if loads else 0.0
+        spread = (sum((x - mean) ** 2 for x in loads) / len(loads)) ** 0.5 if loads else 0.0
+        return {"unallocated_required": unplaced, "graduation_term": term_label(grad_idx), "graduation_idx": grad_idx,
+                "std_distance": std_distance, "credit_spread": round(spread, 2)}
+
+    @staticmethod
+    def objective_key(obj):
+        return (obj["unallocated_required"], obj["graduation_idx"], obj["std_distance"], obj["credit_spread"])
+
+    def plan_signature(self):
+        return tuple(tuple(sorted(self.ids[i] for i in t)) for t in self.term_courses)
+
+    def alternative_plans(self, log, limit):
+        """Re-plans from the logged goals with the root term the greedy pass chose excluded.
+
+        Each branch restores the state saved before its goal (the prefix of the search is
+        shared, not repeated), forces a different term for that goal and finishes greedily.
+        Yields the planner itself, positioned on each finished (untrimmed) alternative.
+        """
+        tried = 0
+        for pos_in_log, (i, before, root) in enumerate(log):
+            if root is None or tried >= limit: continue
+            rest = self.goals[self.goals.index(self.ids[i]) + 1:]
+            excluded = {root}
+            for _ in range(ALT_SLOTS_PER_GOAL):
+                if tried >= limit: break
+                self.restore(before)
+                self.trail.clear(); self.completed.clear()
+                tried += 1
+                try:
+                    if not self.solve_branch(i, 20, 0, exclude=excluded): break
+                    excluded.add(self.pos[i])
+                    self.solve_goals(rest)
+                except SearchCutOff:
+                    self.alternatives_cut_off = True
+                    return
+                yield self
+
+    def search_stats(self):
+        stats = {"cut_off": self.cut_off, "nodes": self.nodes, "backtracks": self.backtracks, "elapsed_ms": round(self.elapsed_ms, 2)}
+        if self.alternatives_cut_off: stats["alternatives_cut_off"] = True
+        return stats
+
+    def debug_stats(self):
+        """Counters and per-phase timings of this request (the `debug` field of the payload)."""
+        return {
+            "goals": len(self.goals),
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "max_depth": self.max_depth,
+            "cut_off": self.cut_off,
+            "rejections": dict(sorted(self.rejections.items())),
+            "phases_ms": {k: round(v, 3) for k, v in self.phase_ms.items()},
+        }
+
+    # --- Post-procesare ---
+    def trim_extra_tes(self):
+        """Drops TEs above the 120-credit total, latest term first (latest placed first within a term).
+
+        One sweep over the placed TEs in that order: a TE is dropped when the total stays >= 120
+        without it. A TE that is kept can never be dropped later in the sweep (the total only goes
+        down), so this gives the same plan as re-scanning from the last term after each drop.
+        """
+        if self.total_credits <= 120: return
+        tes = sorted(((idx, k, i) for idx in range(N_SLOTS) for k, i in enumerate(self.term_courses[idx]) if self.courses[i].is_te),
+                     reverse=True)
+        dropped = set()
+        for idx, _, i in tes:
+            if self.total_credits <= 120: break
+            cr = self.degree_cr[i]
+            if self.total_credits - cr >= 120:
+                dropped.add(i)
+                self.term_credits[idx] -= cr
+                self.total_credits -= cr
+                self.remaining.add(self.ids[i])
+        if dropped:
+            self.term_courses = [[i for i in target if i not in dropped] for target in self.term_courses]
+
+    def compute_warnings(self, ft_limit):
+        warning_msgs = []
+        courses = self.courses
+        all_wts_in_prog = sorted([c for c in self.ids if 'WT' in c.upper()])
+        if all_wts_in_prog:
+            first_wt = all_wts_in_prog[0]
+            first_wt_idx = self.pos[self.ix[first_wt]]
+            if first_wt_idx is not None:
+                core_credits = 0
+                for c_idx in range(min(max(first_wt_idx, 0), N_SLOTS)):
+                    for i in self.term_courses[c_idx]:
+                        c = courses[i]
+                        if c.type in ['CORE', 'TE', 'PROG'] or 'CORE' in c.type:
+                            core_credits += c.credit
+                if core_credits < 30.0:
+                    warning_msgs.append(f"Only {core_credits} credits of CORE/TE before {first_wt}. You need at least 30 CR.")
+
+            if ft_limit != 99:
+                last_wt = all_wts_in_prog[-1]
+                last_wt_idx = self.pos[self.ix[last_wt]]
+                if last_wt_idx is not None:
+                    for c_idx in range(1, last_wt_idx):
+                        p_y = (c_idx // 3) + 1
+                        p_t = TERMS[c_idx % 3]
+
+                        if p_t != "SUM":
+                            term_cr = sum(courses[i].credit for i in self.term_courses[c_idx] if not courses[i].is_wt)
+                            if 0 < term_cr < ft_limit:
+                                warning_msgs.append(f"Study term {p_y} {p_t} (before {last_wt}) must be Full-Time (≥ {ft_limit} credits). Currently has {term_cr} CR.")
+        return warning_msgs
+
+    def course_json(self, cid):
+        c = self.courses[self.ix[cid]]
+        return {"id": c.id, "display": c.display, "is_wt": c.is_wt}
+
+    def sequence_json(self):
+        res_seq = {}
+        for y in range(1, N_YEARS + 1):
+            res_seq[f"Year {y}"] = {}
+            for t in TERMS:
+                idx = (y - 1) * 3 + TERMS.index(t)
+                cursuri_list = [self.course_json(self.ids[i]) for i in self.term_courses[idx]]
+                res_seq[f"Year {y}"][t] = {"credite": self.term_credits[idx], "cursuri": cursuri_list}
+        return res_seq
+
+    def unallocated_json(self):
+        return [self.course_json(c) for c in self.ids if c in self.remaining]
+
+
+def resolve_budget(data):
+    """Client-requested time budget (ms), clamped to PLANNER_MAX_TIME_MS; None = unbounded."""
+    try: budget = float(data.get('time_budget_ms') or 0)
+    except (TypeError, ValueError): budget = 0
+    if MAX_TIME_BUDGET_MS:
+        budget = min(budget, MAX_TIME_BUDGET_MS) if budget > 0 else MAX_TIME_BUDGET_MS
+    return budget if budget > 0 else None
+
+
+def resolve_alternatives(data):
+    """Number of plans requested with `alternatives` (1 = just the greedy plan)."""
+    try: k = int(data.get('alternatives') or 1)
+    except (TypeError, ValueError): k = 1
+    return max(1, min(k, MAX_ALTERNATIVES))
+
+
+def collect_alternatives(planner, log, k, primary, ft_limit):
+    """Ranks the greedy plan and the branches from SequencePlanner.alternative_plans; returns the k best distinct ones."""
+    obj = planner.objective()
+    plans = [(planner.objective_key(obj), dict(primary, primary=True, objective=obj))]
+    seen = {planner.plan_signature()}
+    started = time.perf_counter()
+    if not planner.cut_off:
+        for alt in planner.alternative_plans(log, ALT_BRANCHES_PER_PLAN * k):
+            with alt.phase("trim_tes"): alt.trim_extra_tes()
+            sig = alt.plan_signature()
+            if sig in seen: continue
+            seen.add(sig)
+            obj = alt.objective()
+            with alt.phase("warnings"): warnings = alt.compute_warnings(ft_limit)
+            plans.append((alt.objective_key(obj), {"sequence": alt.sequence_json(), "unallocated": alt.unallocated_json(),
+                                                   "warnings": warnings, "primary": False, "objective": obj}))
+    planner.elapsed_ms += (time.perf_counter() - started) * 1000
+    plans.sort(key=lambda p: p[0])     # sort stabil: la egalitate rămâne planul greedy primul
+    return [dict(plan, rank=n + 1) for n, (_, plan) in enumerate(plans[:k])]
+
+
+def plan_sequence(prog, data, ft_limit=99):
+    """Runs the planner for one /generate request body and returns the JSON payload.
+
+    With `time_budget_ms` / `node_budget` the search is anytime: when the budget runs out the
+    goal in progress is rolled back, the placement reached so far is returned and
+    `search.cut_off` is set.
+
+    With `alternatives: k` (k > 1) the payload also carries `alternatives`, the k best distinct
+    plans (the greedy one included) ranked by SequencePlanner.objective.
+
+    The payload always carries `debug` (SequencePlanner.debug_stats); /generate strips it unless
+    the request asks for it.
+    """
+    unallocated_wts = [c for c in data.get('unallocated', []) if 'WT' in c.upper()]
+    if unallocated_wts:
+        return {"error": "Please place all Work Terms (WT) on the grid before generating."}
+
+    started = time.perf_counter()
+    planner = SequencePlanner(prog, data)
+    planner.phase_ms["setup"] = (time.perf_counter() - started) * 1000
+    repairing = data.get('mode') == 'repair' and bool(data.get('moved'))
+    goals = None
+    if repairing:
+        with planner.phase("repair"): goals = planner.repair(data['moved'], data.get('locked') or [])
+    with planner.phase("feasibility"): reason = planner.infeasibility()
+    if reason:
+        return {"error": reason, "debug": planner.debug_stats()}
+    try: node_budget = int(data.get('node_budget') or 0)
+    except (TypeError, ValueError): node_budget = 0
+    planner.set_budget(resolve_budget(data), node_budget)
+    k = resolve_alternatives(data)
+    log = [] if k > 1 else None
+    with planner.phase("search"): planner.run(log, goals)
+    with planner.phase("trim_tes"): planner.trim_extra_tes()
+    with planner.phase("warnings"): warnings = planner.compute_warnings(ft_limit)
+    result = {"sequence": planner.sequence_json(), "unallocated": planner.unallocated_json(), "warnings": warnings}
+    if k > 1:
+        with planner.phase("alternatives"):
+            result["alternatives"] = collect_alternatives(planner, log, k, dict(result), ft_limit)
+    if goals is not None:
+        result["repair"] = {"goals": planner.goals, "unplaced": planner.repaired}
+    result["search"] = planner.search_stats()
+    planner.phase_ms["total"] = (time.perf_counter() - started) * 1000
+    result["debug"] = planner.debug_stats()
+    return result
+
+
+# =========================================================
+# PROCESS POOL + ADMISSION CONTROL
+# The solver is CPU-bound; running it in separate processes keeps the web worker's threads
+# (login, save_sequence, ...) responsive. At most PLANNER_WORKERS jobs run and
+# PLANNER_QUEUE_LIMIT wait; anything beyond that is refused right away with PlannerBusy.
+# =========================================================
+PLANNER_WORKERS = int(os.environ.get("PLANNER_WORKERS", "1"))             # 0 = rulează inline
+PLANNER_QUEUE_LIMIT = int(os.environ.get("PLANNER_QUEUE_LIMIT", "4"))
+PLANNER_RETRY_AFTER_S = int(os.environ.get("PLANNER_RETRY_AFTER_S", "3"))
+PLANNER_JOB_TIMEOUT_S = float(os.environ.get("PLANNER_JOB_TIMEOUT_S", "60"))
+PLANNER_MP_START = os.environ.get("PLANNER_MP_START", "spawn")
+
+
+class PlannerBusy(Exception):
+    """All solver slots and queue positions are taken."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, PLANNER_WORKERS) + max(0, PLANNER_QUEUE_LIMIT))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PLANNER_WORKERS, mp_context=multiprocessing.get_context(PLANNER_MP_START),
+                                        initializer=catalog.warm_up)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None: _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def run_plan_job(program_name, data, ft_limit):
+    """Pool entry point: resolves the program catalog inside the worker (each worker keeps its own cache)."""
+    return plan_sequence(catalog.get_program_catalog(program_name), data, ft_limit)
+
+
+def submit_plan(program_name, data, ft_limit):
+    """Runs one /generate job under admission control; raises PlannerBusy when the queue is full."""
+    if not _slots.acquire(blocking=False):
+        raise PlannerBusy()
+    if PLANNER_WORKERS <= 0:
+        try:
+            return run_plan_job(program_name, data, ft_limit)
+        finally:
+            _slots.release()
+    try:
+        future = _get_pool().submit(run_plan_job, program_name, data, ft_limit)
+    except Exception:
+        _slots.release()
+        raise
+    # Slotul se eliberează când job-ul chiar se termină, nu când request-ul renunță la el (timeout):
+    # un job care depășește PLANNER_JOB_TIMEOUT_S continuă în worker și trebuie numărat în continuare.
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PLANNER_JOB_TIMEOUT_S)
+    except BrokenProcessPool:
+        # Un worker a murit (OOM etc.) - refacem pool-ul pentru request-urile următoare
+        _reset_pool()
+        raise
+
+
+# =========================================================
+# BATCH (cohorte întregi: /api/batch_generate și batch_generate.py)
+# A batch gets its own pool sized to the machine, separate from the interactive one, and only
+# one batch runs at a time per process.
+# =========================================================
+BATCH_WORKERS = int(os.environ.get("PLANNER_BATCH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+BATCH_MAX_REQUESTS = int(os.environ.get("PLANNER_BATCH_MAX", "2000"))
+
+_batch_slot = threading.BoundedSemaphore(1)
+
+
+def acquire_batch_slot():
+    return _batch_slot.acquire(blocking=False)
+
+
+def release_batch_slot():
+    _batch_slot.release()
+
+
+def run_batch(jobs, workers=None):
+    """Runs [(key, program, data, ft_limit)] and yields (key, result) in completion order.
+
+    A job that raises yields {"error": ...}; closing the generator early cancels what is still queued.
+    """
+    workers = BATCH_WORKERS if workers is None else workers
+    if workers <= 0 or len(jobs) <= 1:
+        for key, program_name, data, ft_limit in jobs:
+            try: yield key, run_plan_job(program_name, data, ft_limit)
+            except Exception as e: yield key, {"error": str(e)}
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context(PLANNER_MP_START),
+                               initializer=catalog.warm_up)
+    try:
+        futures = {pool.submit(run_plan_job, program_name, data, ft_limit): key for key, program_name, data, ft_limit in jobs}
+        for fut in as_completed(futures):
+            try: yield futures[fut], fut.result()
+            except Exception as e: yield futures[fut], {"error": str(e)}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# =========================================================
+# RESULT CACHE
+# Identical "Generate" clicks return the stored payload. The key is a hash of the normalized
+# request plus the catalog version and FT limit, so a new CORE_TE.xlsx invalidates everything.
+# =========================================================
+RESULT_CACHE_SIZE = int(os.environ.get("PLANNER_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL_S = float(os.environ.get("PLANNER_CACHE_TTL_S", "600"))
+
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+_result_cache_state = {"version": None, "hits": 0, "misses": 0, "evictions": 0}
+
+
+def _num(val, cast):
+    try: return cast(float(val))
+    except (TypeError, ValueError): return str(val)
+
+
+def request_fingerprint(program_name, data, ft_limit, version):
+    canon = {
+        "program": normalize_program(program_name),
+        "placed": {str(k): [str(c).strip() for c in v] for k, v in sorted((data.get('placed') or {}).items()) if v},
+        "unallocated": sorted(str(c).strip() for c in (data.get('unallocated') or [])),
+        "repeated": [str(c).strip() for c in (data.get('repeated') or [])],
+        "term_limits": {str(k): _num(v, float) for k, v in sorted((data.get('term_limits') or {}).items())},
+        "count_limits": {str(k): _num(v, int) for k, v in sorted((data.get('count_limits') or {}).items())},
+        "ft_limit": ft_limit,
+        "alternatives": resolve_alternatives(data),
+        "mode": data.get('mode') or "full",
+        "moved": sorted(str(c).strip() for c in (data.get('moved') or [])),
+        "locked": sorted(str(c).strip() for c in (data.get('locked') or [])),
+        "catalog": version,
+    }
+    return hashlib.sha256(json.dumps(canon, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _check_version(version):
+    if _result_cache_state["version"] != version:
+        _result_cache.clear()
+        _result_cache_state["version"] = version
+
+
+def cached_result(key, version):
+    now = time.monotonic()
+    with _result_cache_lock:
+        _check_version(version)
+        entry = _result_cache.get(key)
+        if entry is None or entry[0] < now:
+            if entry is not None: del _result_cache[key]
+            _result_cache_state["misses"] += 1
+            return None
+        _result_cache.move_to_end(key)
+        _result_cache_state["hits"] += 1
+        payload = dict(entry[1])
+    if "search" in payload: payload["search"] = dict(payload["search"], cached=True)
+    return payload
+
+
+def store_result(key, version, payload):
+    # Rezultatele parțiale (căutare întreruptă) nu se pun în cache
+    search = payload.get("search", {})
+    if not RESULT_CACHE_SIZE or "error" in payload or search.get("cut_off") or search.get("alternatives_cut_off"): return
+    with _result_cache_lock:
+        _check_version(version)
+        _result_cache[key] = (time.monotonic() + RESULT_CACHE_TTL_S, payload)
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+            _result_cache_state["evictions"] += 1
+
+
+def result_cache_stats():
+    with _result_cache_lock:
+        return dict(_result_cache_state, size=len(_result_cache))
+
+
+# =========================================================
+# METRICS
+# The `debug` block of every solved request is folded in here (in the web process, the pool
+# workers only return it) and served by /api/planner_metrics.
+# =========================================================
+METRICS_WINDOW = int(os.environ.get("PLANNER_METRICS_WINDOW", "500"))
+
+_metrics_lock = threading.Lock()
+_metrics = {"requests": 0, "infeasible": 0, "cut_off": 0, "nodes": 0, "backtracks": 0, "max_nodes": 0, "max_depth": 0,
+            "rejections": defaultdict(int), "phases_ms": defaultdict(float), "max_phases_ms": defaultdict(float)}
+_recent_ms = deque(maxlen=METRICS_WINDOW)
+
+
+def stats_header(debug):
+    """X-Planner-Stats value: 'nodes=258; backtracks=2; max_depth=5; search_ms=1.2; total_ms=3.4'."""
+    if not debug: return "cached"
+    phases = debug.get("phases_ms", {})
+    parts = [f"nodes={debug['nodes']}", f"backtracks={debug['backtracks']}", f"max_depth={debug['max_depth']}"]
+    parts += [f"{name}_ms={phases[name]:.1f}" for name in ("search", "total") if name in phases]
+    if debug.get("cut_off"): parts.append("cut_off=1")
+    return "; ".join(parts)
+
+
+def record_metrics(debug, error=False):
+    if not debug: return
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        if error: _metrics["infeasible"] += 1
+        if debug.get("cut_off"): _metrics["cut_off"] += 1
+        _metrics["nodes"] += debug["nodes"]
+        _metrics["backtracks"] += debug["backtracks"]
+        _metrics["max_nodes"] = max(_metrics["max_nodes"], debug["nodes"])
+        _metrics["max_depth"] = max(_metrics["max_depth"], debug["max_depth"])
+        for reason, n in debug.get("rejections", {}).items(): _metrics["rejections"][reason] += n
+        for name, ms in debug.get("phases_ms", {}).items():
+            _metrics["phases_ms"][name] += ms
+            _metrics["max_phases_ms"][name] = max(_metrics["max_phases_ms"][name], ms)
+        if "total" in debug.get("phases_ms", {}): _recent_ms.append(debug["phases_ms"]["total"])
+
+
+def planner_metrics():
+    """Totals since start-up plus latency percentiles over the last METRICS_WINDOW requests."""
+    with _metrics_lock:
+        n = _metrics["requests"]
+        recent = sorted(_recent_ms)
+        out = {k: v for k, v in _metrics.items() if not isinstance(v, defaultdict)}
+        out["avg_nodes"] = round(_metrics["nodes"] / n, 1) if n else 0
+        out["rejections"] = dict(sorted(_metrics["rejections"].items()))
+        out["phases_ms"] = {name: {"total": round(ms, 3), "avg": round(ms / n, 3) if n else 0, "max": round(_metrics["max_phases_ms"][name], 3)}
+                            for name, ms in _metrics["phases_ms"].items()}
+    if recent:
+        out["total_ms"] = {"p50": round(recent[len(recent) // 2], 3), "p95": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 3),
+                           "max": round(recent[-1], 3), "window": len(recent)}
+    out["result_cache"] = result_cache_stats()
+    return out
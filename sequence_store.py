@@ -0,0 +1,291 @@
+"""Compressed, content-addressed storage for the JSON columns of Saved_Sequences.
+
+A payload is stored once in Sequence_Blobs, zlib-compressed and keyed by the SHA-256 of its
+text; the Saved_Sequences cell only keeps the reference "blob:sha256:<hex>". Saving the same
+plan again (the auto-save on logout, a re-submit) adds no blob, only the small reference row.
+Cells written before this module (inline JSON) are returned unchanged, so old and new rows mix.
+
+Versions: a blob can also be a delta against another blob (base_hash) - the student's previous
+version, or a snapshot of the program's standard sequence. `depth` counts the deltas down to
+the nearest full blob; past CHECKPOINT_EVERY a full copy is written again, so rebuilding a
+version applies at most CHECKPOINT_EVERY - 1 deltas. The hash is always the hash of the full
+text, so references do not depend on how the blob is stored.
+
+The in-memory cache is only filled from reads (resolve); a blob written in a transaction that is
+later rolled back is never remembered. A reference whose blob, or one of its delta bases, is missing
+raises MissingBlob instead of coming back empty.
+
+    python sequence_store.py stats
+    python sequence_store.py backfill [--batch 200]     # move existing inline JSON into blobs
+"""
+import io
+import sys
+import zlib
+import json
+import hashlib
+import argparse
+import threading
+import contextlib
+from collections import OrderedDict
+from sqlalchemy import text, bindparam, inspect
+
+REF_PREFIX = "blob:sha256:"
+REF_LENGTH = len(REF_PREFIX) + 64
+SEQUENCE_JSON_COLUMNS = ("JSON_Data", "Term_Json_data", "sequence_Json_data")
+ZLIB_LEVEL = 6
+BLOB_CACHE_SIZE = 512           # payload-uri decomprimate ținute în memorie (blob-urile nu se schimbă niciodată)
+CHECKPOINT_EVERY = 10           # un blob complet cel târziu la a 10-a versiune din lanț
+DELTA_MAX_RATIO = 0.5           # delta se păstrează doar dacă e sub jumătate din blob-ul complet comprimat
+
+_lock = threading.Lock()
+_schema_ready = set()           # engine-urile pe care tabelul a fost verificat
+_cache = OrderedDict()          # hash -> (text decomprimat, depth)
+
+
+class MissingBlob(Exception):
+    """A referenced blob, or a base its delta needs, is not in Sequence_Blobs."""
+
+
+def _remember(digest, payload, depth):
+    with _lock:
+        _cache[digest] = (payload, depth)
+        _cache.move_to_end(digest)
+        while len(_cache) > BLOB_CACHE_SIZE: _cache.popitem(last=False)
+
+
+def _cached(digest):
+    with _lock:
+        return _cache.get(digest)
+
+
+def ensure_schema(conn):
+    """Creates Sequence_Blobs on first use (once per engine); adds the version columns to an older table."""
+    if conn.engine in _schema_ready: return
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS Sequence_Blobs (
+            hash CHAR(64) NOT NULL PRIMARY KEY,
+            codec VARCHAR(16) NOT NULL,
+            size INT NOT NULL,
+            data LONGBLOB NOT NULL,
+            base_hash CHAR(64) NULL,
+            depth INT NOT NULL DEFAULT 0,
+            created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    existing = {c["name"] for c in inspect(conn).get_columns("Sequence_Blobs")}
+    if "base_hash" not in existing: conn.execute(text("ALTER TABLE Sequence_Blobs ADD COLUMN base_hash CHAR(64) NULL"))
+    if "depth" not in existing: conn.execute(text("ALTER TABLE Sequence_Blobs ADD COLUMN depth INT NOT NULL DEFAULT 0"))
+    _schema_ready.add(conn.engine)
+
+
+def is_ref(val):
+    return isinstance(val, str) and val.startswith(REF_PREFIX)
+
+
+def digest_of(val):
+    """The hex hash of a reference (or of a bare hash); None for anything else."""
+    if is_ref(val): return val[len(REF_PREFIX):REF_LENGTH]
+    if isinstance(val, str) and len(val) == 64: return val
+    return None
+
+
+# =========================================================
+# DELTA
+# Diferență la nivel de chei JSON: "del" (căi șterse), "set" (căi noi / schimbate; listele se
+# înlocuiesc întregi) și "order" (ordinea cheilor, ca textul reconstruit să fie identic).
+# =========================================================
+def diff(old, new, path=None, ops=None):
+    path = path or []
+    ops = ops if ops is not None else {"del": [], "set": [], "order": []}
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        ops["set"].append([path, new])
+        return ops
+    for k in old:
+        if k not in new: ops["del"].append(path + [k])
+    for k, v in new.items():
+        if k not in old: ops["set"].append([path + [k], v])
+        elif isinstance(v, dict) and isinstance(old[k], dict): diff(old[k], v, path + [k], ops)
+        elif type(old[k]) is not type(v) or old[k] != v: ops["set"].append([path + [k], v])
+    if [k for k in old if k in new] + [k for k in new if k not in old] != list(new):
+        ops["order"].append([path, list(new)])
+    return ops
+
+
+def apply_delta(doc, ops):
+    """Applies a diff() result to a freshly parsed document (mutated and returned)."""
+    def parent(path):
+        node = doc
+        for k in path[:-1]: node = node[k]
+        return node
+    for path in ops["del"]:
+        del parent(path)[path[-1]]
+    for path, value in ops["set"]:
+        if not path: doc = value
+        else: parent(path)[path[-1]] = value
+    for path, keys in ops["order"]:
+        node = parent(path + [None])
+        items = {k: node[k] for k in keys}
+        node.clear()
+        node.update(items)
+    return doc
+
+
+def standard_base(standard, nested=False):
+    """The program's standard sequence ({course: term}) in the saved JSON_Data layout ({term: [courses]}),
+    under "placed" when the saved plan uses the full layout (auto-save on logout)."""
+    terms = {}
+    for cid, term in standard.items(): terms.setdefault(term, []).append(cid)
+    return json.dumps({"placed": terms} if nested else terms)
+
+
+# =========================================================
+# WRITE
+# =========================================================
+def put(conn, payload, bases=()):
+    """Stores a JSON text and returns the value to write in the cell: a reference, or the text
+    itself when it is shorter than a reference ("{}", "[]").
+
+    `bases` are references (or hashes) of earlier blobs the payload may be stored as a delta
+    against; the smallest verified delta wins, otherwise the payload is stored in full. A base that
+    cannot be rebuilt is skipped. Nothing is cached here: the caller's transaction may still roll back."""
+    payload = payload if isinstance(payload, str) else str(payload)
+    raw = payload.encode("utf-8")
+    if len(raw) <= REF_LENGTH: return payload
+    digest = hashlib.sha256(raw).hexdigest()
+    ref = REF_PREFIX + digest
+
+    # Fără cache de "există deja": dacă tranzacția apelantului face rollback, blob-ul dispare odată cu rândul
+    ensure_schema(conn)
+    row = {"h": digest, "codec": "zlib", "size": len(raw), "data": zlib.compress(raw, ZLIB_LEVEL), "base": None, "depth": 0}
+    base_digests = [d for d in (digest_of(b) for b in bases) if d and d != digest]
+    if base_digests:
+        try: new_doc = json.loads(payload)
+        except ValueError: new_doc = None
+        texts = {}
+        for base in (base_digests if new_doc is not None else []):
+            # fără cache: baza poate fi scrisă chiar în tranzacția curentă (snapshot-ul secvenței standard)
+            try: texts.update(_materialize(conn, [base], remember=False))
+            except MissingBlob: continue
+        for base in base_digests:
+            if base not in texts or texts[base][1] + 1 >= CHECKPOINT_EVERY: continue
+            base_text, base_depth = texts[base]
+            ops = diff(json.loads(base_text), new_doc)
+            # verificăm reconstrucția byte cu byte (float-uri, True vs 1 etc.)
+            if json.dumps(apply_delta(json.loads(base_text), ops)) != payload: continue
+            packed = zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"), ZLIB_LEVEL)
+            if len(packed) < len(row["data"]) * (DELTA_MAX_RATIO if row["base"] is None else 1):
+                row.update(codec="zlib-delta", data=packed, base=base, depth=base_depth + 1)
+
+    ignore = "INSERT OR IGNORE" if conn.dialect.name == "sqlite" else "INSERT IGNORE"
+    conn.execute(text(f"{ignore} INTO Sequence_Blobs (hash, codec, size, data, base_hash, depth) "
+                      "VALUES (:h, :codec, :size, :data, :base, :depth)"), row)
+    return ref
+
+
+# =========================================================
+# READ
+# =========================================================
+def _materialize(conn, digests, remember=True):
+    """{hash: (text, depth)}: fetches the blobs plus whatever bases their deltas need (one query per
+    chain level not already cached) and rebuilds them from the full blob up. Raises MissingBlob when
+    one of `digests` cannot be rebuilt."""
+    out, stored = {}, {}
+    need = set(digests)
+    while need:
+        for d in list(need):
+            hit = _cached(d)
+            if hit: out[d] = hit; need.discard(d)
+        if not need: break
+        query = text("SELECT hash, codec, data, base_hash, depth FROM Sequence_Blobs WHERE hash IN :hashes").bindparams(bindparam("hashes", expanding=True))
+        found = {r[0]: r for r in conn.execute(query, {"hashes": sorted(need)})}
+        stored.update(found)
+        need = {r[3] for r in found.values() if r[1] == "zlib-delta" and r[3] not in out and r[3] not in stored}
+    for digest, codec, data, base, depth in sorted(stored.values(), key=lambda r: r[4]):
+        raw = zlib.decompress(data).decode("utf-8") if codec in ("zlib", "zlib-delta") else bytes(data).decode("utf-8")
+        if codec == "zlib-delta":
+            if base not in out: raise MissingBlob(f"base {base} of blob {digest}")
+            raw = json.dumps(apply_delta(json.loads(out[base][0]), json.loads(raw)))
+        out[digest] = (raw, depth)
+        if remember: _remember(digest, raw, depth)
+    missing = [d for d in digests if d not in out]
+    if missing: raise MissingBlob(f"blob {missing[0]}")
+    return out
+
+
+def resolve(conn, values):
+    """{ref: JSON text} for every reference among `values` (deltas rebuilt, cached ones not read again).
+    Raises MissingBlob for a reference that cannot be rebuilt."""
+    refs = {v for v in values if is_ref(v)}
+    if not refs: return {}
+    texts = _materialize(conn, [digest_of(r) for r in refs])
+    return {r: texts[digest_of(r)][0] for r in refs}
+
+
+def resolve_rows(conn, rows, columns=SEQUENCE_JSON_COLUMNS):
+    """Copies of the row mappings with the referenced JSON columns replaced by their text."""
+    rows = [dict(r) for r in rows]
+    blobs = resolve(conn, [r.get(c) for r in rows for c in columns])
+    for r in rows:
+        for c in columns:
+            if is_ref(r.get(c)): r[c] = blobs[r[c]]
+    return rows
+
+
+# =========================================================
+# MAINTENANCE
+# =========================================================
+def stats(conn):
+    ensure_schema(conn)
+    blobs, deltas, raw, stored = conn.execute(text("SELECT COUNT(*), COALESCE(SUM(CASE WHEN codec = 'zlib-delta' THEN 1 ELSE 0 END), 0), "
+                                                   "COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM Sequence_Blobs")).one()
+    rows, refs = conn.execute(text(f"SELECT COUNT(*), COALESCE(SUM(CASE WHEN JSON_Data LIKE '{REF_PREFIX}%' THEN 1 ELSE 0 END), 0) "
+                                   "FROM Saved_Sequences")).one()
+    return {"blobs": int(blobs), "deltas": int(deltas), "raw_bytes": int(raw), "stored_bytes": int(stored),
+            "sequences": int(rows), "sequences_with_refs": int(refs)}
+
+
+def backfill(engine, batch=200):
+    """Moves inline JSON of existing Saved_Sequences rows into blobs; returns the number of rows rewritten."""
+    cols = ", ".join(SEQUENCE_JSON_COLUMNS)
+    select = text(f"SELECT student_id, Date_Saved, {cols} FROM Saved_Sequences "
+                  f"WHERE JSON_Data NOT LIKE '{REF_PREFIX}%' AND LENGTH(JSON_Data) > {REF_LENGTH} LIMIT :n")
+    # Tabelul nu are cheie primară: identificăm rândul prin student_id + Date_Saved + conținutul vechi
+    update = text("UPDATE Saved_Sequences SET " + ", ".join(f"{c} = :new_{c}" for c in SEQUENCE_JSON_COLUMNS)
+                  + " WHERE student_id = :sid AND Date_Saved = :ts AND "
+                  + " AND ".join(f"{c} <=> :old_{c}" if engine.dialect.name != "sqlite" else f"{c} IS :old_{c}" for c in SEQUENCE_JSON_COLUMNS))
+    done = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select, {"n": batch}).mappings().all()
+            changed = 0
+            for r in rows:
+                params = {"sid": r["student_id"], "ts": r["Date_Saved"]}
+                for c in SEQUENCE_JSON_COLUMNS:
+                    params[f"old_{c}"] = r[c]
+                    params[f"new_{c}"] = put(conn, r[c]) if r[c] is not None else None
+                changed += conn.execute(update, params).rowcount
+        done += changed
+        if len(rows) < batch or not changed: return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saved_Sequences blob storage.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="blob count and compression ratio")
+    p_fill = sub.add_parser("backfill", help="move existing inline JSON into Sequence_Blobs")
+    p_fill.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    if app.engine is None:
+        print("No database configured (planner_db_* environment variables).")
+        sys.exit(2)
+    if args.command == "stats":
+        with app.engine.connect() as conn:
+            s = stats(conn)
+        ratio = s["raw_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0
+        print(f"{s['blobs']} blobs ({s['deltas']} deltas), {s['raw_bytes']} bytes of JSON stored in {s['stored_bytes']} ({ratio:.1f}x); "
+              f"{s['sequences_with_refs']}/{s['sequences']} sequences use references")
+    else:
+        print(f"Rewrote {backfill(app.engine, args.batch)} sequences")
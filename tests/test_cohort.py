@@ -0,0 +1,55 @@
+"""Term parsing and the transcript -> grid mapping used by batch planning (cohort.py)."""
+import os
+import sys
+import datetime
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import catalog
+import cohort
+
+TODAY = datetime.date(2025, 1, 15)
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("2024-2025 Fall", (2024, "FALL")),
+    ("2024-2025 Winter", (2025, "WIN")),
+    ("2024-2025 Summer", (2024, "SUM")),
+    ("Winter 2025", (2025, "WIN")),
+    ("Fall 2024", (2024, "FALL")),
+    ("WI 25", (2025, "WIN")),
+    ("2241", (2024, "SUM")),
+    ("2242", (2024, "FALL")),
+    ("2244", (2025, "WIN")),
+    ("", (None, None)),
+    ("nan", (None, None)),
+    ("Summer", (None, "SUM")),
+])
+def test_parse_term(term, expected):
+    assert cohort.parse_term(term) == expected
+
+
+def test_planner_page_defaults():
+    assert cohort.parse_concordia_term("", TODAY) == (2025, "FALL")
+    assert cohort.parse_concordia_term("2024-2025 Winter", TODAY) == (2025, "WIN")
+
+
+def test_transcript_mapping():
+    prog = catalog.get_program_catalog("Mechanical Engineering")
+    transcript = [
+        {"course": "ENGR 213", "term": "2023-2024 Fall"},
+        {"course": "MIAE 215", "term": "2234"},
+        {"course": "ENGR 201", "term": "2023-2024 Winter"},
+        {"course": "CWTE 101", "term": "Summer 2024"},      # Work Term 1
+        {"course": "MECH 490", "term": "2024-2025 Fall"},   # capstone: A în toamnă, B în iarnă
+        {"course": "MATH 203", "term": "2019-2020 Fall"},   # prea vechi pentru grilă -> Y0
+    ]
+    assert cohort.detect_start(prog, transcript, TODAY) == (2023, "Fall")
+    assert cohort.transcript_placed(prog, transcript, 2023, "Fall", TODAY) == {
+        "Y1_FALL": ["ENGR213"],
+        "Y1_WIN": ["MIAE215", "ENGR201"],
+        "Y2_SUM": ["WT1"],
+        "Y2_FALL": ["MECH490A"],
+        "Y2_WIN": ["MECH490B"],
+        "Y0_ANY": ["MATH203"],
+    }
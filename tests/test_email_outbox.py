@@ -0,0 +1,101 @@
+"""Outbox delivery after a restart: rows left by a previous process go out once the sender is started."""
+import os
+import sys
+import json
+import time
+import sqlite3
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import email_outbox
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _leave_rows(path, rows):
+    """Writes outbox rows the way a process that died before sending them would have left them."""
+    email_outbox.configure(path=path)
+    email_outbox._connect().close()          # schema
+    conn = sqlite3.connect(path, isolation_level=None)
+    now = time.time()
+    for n, (status, attempts, next_attempt, claimed_at) in enumerate(rows):
+        conn.execute("INSERT INTO outbox (kind, message, status, attempts, next_attempt, claimed_at, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     ("status", json.dumps({"to": [f"s{n}@concordia.ca"], "subject": f"m{n}"}), status, attempts,
+                      now + next_attempt, None if claimed_at is None else now + claimed_at, now - 60))
+    conn.close()
+
+
+def _wait(predicate, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate(): return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_start_sends_rows_left_by_a_previous_process(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    _leave_rows(path, [("queued", 0, -1, None),                                        # never attempted
+                       ("queued", 2, -0.5, None),                                      # retry already due
+                       ("sending", 1, -400, -email_outbox.SENDING_TIMEOUT_S - 1)])     # worker died mid-send
+    fake = email_outbox.configure(transport=email_outbox.FakeTransport(fail_times=1))
+
+    email_outbox.start()
+
+    assert _wait(lambda: email_outbox.stats()["sent"] == 3, timeout=email_outbox.BASE_DELAY_S * 1.2 + 10)
+    assert sorted(m["subject"] for m in fake.sent) == ["m0", "m1", "m2"]
+
+
+def _outbox_statuses(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+    finally:
+        conn.close()
+
+
+def test_app_import_does_not_start_the_sender(tmp_path):
+    # batch_generate, migrations, sequence_store importă app; nu au voie să golească outbox-ul de producție
+    path = str(tmp_path / "outbox.sqlite3")
+    _leave_rows(path, [("queued", 0, -1, None)])
+    env = dict(os.environ, EMAIL_TRANSPORT="fake", EMAIL_OUTBOX_PATH=path)
+    script = ("import time, threading, app, email_outbox\n"
+              "email_outbox.enqueue({'to': ['x@concordia.ca'], 'subject': 'new'})\n"
+              "time.sleep(0.5)\n"
+              "assert not any(t.name == 'email-outbox' for t in threading.enumerate())\n")
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True, capture_output=True, timeout=60)
+
+    assert _outbox_statuses(path) == [("queued", 2)]
+
+
+def test_post_fork_starts_the_sender(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    _leave_rows(path, [("queued", 0, -1, None), ("queued", 1, -1, None)])
+    env = dict(os.environ, EMAIL_TRANSPORT="fake", EMAIL_OUTBOX_PATH=path)
+    script = ("import time, runpy, app, email_outbox\n"
+              "runpy.run_path('gunicorn.conf.py')['post_fork'](None, None)\n"
+              "deadline = time.time() + 10\n"
+              "while email_outbox.stats()['sent'] < 2 and time.time() < deadline: time.sleep(0.05)\n")
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True, capture_output=True, timeout=60)
+
+    assert _outbox_statuses(path) == [("sent", 2)]
+
+
+def test_otp_reports_a_failed_enqueue(tmp_path):
+    # Outbox-ul nu poate fi deschis: utilizatorul vede eroarea și nu rămâne niciun cod "trimis" în logins
+    env = dict(os.environ, EMAIL_TRANSPORT="fake", EMAIL_OUTBOX_PATH=str(tmp_path / "missing" / "outbox.sqlite3"))
+    script = ("from sqlalchemy import create_engine, text\n"
+              "from sqlalchemy.pool import StaticPool\n"
+              "import app\n"
+              "app.engine = create_engine('sqlite://', poolclass=StaticPool)\n"
+              "with app.engine.begin() as conn:\n"
+              "    conn.execute(text('CREATE TABLE logins (email TEXT, time TEXT, login_code TEXT, used INTEGER)'))\n"
+              "with app.app.test_request_context():\n"
+              "    app.handle_otp_logic('x@concordia.ca', '40000000')\n"
+              "    print(app.session['otp_message'])\n"
+              "with app.engine.connect() as conn:\n"
+              "    print(conn.execute(text('SELECT COUNT(*) FROM logins')).scalar())\n")
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True, capture_output=True,
+                         text=True, timeout=60).stdout.splitlines()
+
+    assert out[-2].startswith("❌") and out[-1] == "0"
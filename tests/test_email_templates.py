@@ -0,0 +1,86 @@
+"""Stored HTML of the sequence emails (email_templates.py), one file per case in tests/snapshots/emails/.
+
+After an intended change to templates/emails/, regenerate and review the diff:
+    python tests/test_email_templates.py --update
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import email_templates
+
+SNAPSHOT_DIR = os.path.join(ROOT, "tests", "snapshots", "emails")
+
+TERM_SUMMARY = [
+    {"year": "Year 1 (2024-2025)", "data": {
+        "FALL": {"cr": 15, "is_current_term": True,
+                 "courses": [{"name": "ENGR 213", "credit": 3.0}, {"name": "MECH 211", "credit": 3.5}],
+                 "gpa_info": {"val": 3.4, "credits": 15.0, "cgpa": 3.4, "tot_cr": 15.0, "threshold": 2.0}},
+        "WIN": {"cr": 16.5, "courses": [{"name": "ENGR 233", "credit": 3.0}],
+                "gpa_info": {"val": 1.9, "credits": 16.5, "cgpa": 2.6, "tot_cr": 31.5, "threshold": 2.0}},
+    }},
+    {"year": "Year 2 (2025-2026)", "data": {
+        "SUM": {"cr": 0, "is_coop": True, "wt_change": "Moved from Y2 WIN", "courses": [{"name": "WT1", "is_wt": True}]},
+        "FALL": {"cr": 0, "is_coop": True, "is_institute_wt": True, "courses": [{"name": "WT2", "is_wt": True}],
+                 "gpa_info": {"val": -1, "credits": 0, "cgpa": 2.6, "tot_cr": 31.5}},
+        "WIN": {"cr": 12, "courses": [{"name": "MECH 343", "credit": 3.0}],
+                "gpa_info": {"val": 2.1, "credits": 12.0, "cgpa": 2.5, "tot_cr": 43.5, "threshold": 2.0}},
+    }},
+]
+WT_SUMMARY = {"WT1": {"new_term": "Y2_SUM", "change_text": "delayed by 1 term"}, "WT2": {"new_term": "Y2_FALL", "change_text": ""}}
+ERRORS = ["<b>Y2 WIN:</b> MECH 343 requires MECH 211 (not placed before)"]
+
+WHO = dict(student_id="40000001", program="Mechanical Engineering", submitter_email="student@concordia.ca")
+PLAIN = dict(WHO, student_name="Jane Student", justification="Need ENGR 301 in WIN")
+MARKUP = dict(WHO, student_name="Zoë <O'Brien> & Co", justification="ENGR 301 < ENGR 233 & <b>not</b> bold")
+FULL = dict(wt_summary=WT_SUMMARY, term_summary=TERM_SUMMARY, validation_errors=ERRORS)
+EMPTY = dict(wt_summary={}, term_summary=[], validation_errors=[])
+
+CASES = {
+    "submit": ("submit", dict(PLAIN, **FULL)),
+    "submit_markup": ("submit", dict(MARKUP, **FULL)),
+    "submit_empty": ("submit", dict(PLAIN, justification="", **EMPTY)),
+    "approved": ("approved", dict(PLAIN, pub_comment="Looks good", power_user_name="coordinator", **FULL)),
+    "approved_markup": ("approved", dict(MARKUP, pub_comment="Fine <for now> & approved", power_user_name="coordinator", **FULL)),
+    "approved_empty": ("approved", dict(PLAIN, pub_comment="", power_user_name="coordinator", **EMPTY)),
+    "rework": ("rework", dict(PLAIN, pub_comment="Move WT2 to a summer term", power_user_name="coordinator", **FULL)),
+    "rework_markup": ("rework", dict(MARKUP, pub_comment="WT2 < WT3 & <i>summer</i>", power_user_name="coordinator", **FULL)),
+}
+
+
+def render(case):
+    kind, context = CASES[case]
+    return email_templates.render(kind, **context)
+
+
+def snapshot_path(case):
+    return os.path.join(SNAPSHOT_DIR, f"{case}.html")
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_matches_snapshot(case):
+    with open(snapshot_path(case), encoding="utf-8", newline="") as f:
+        assert render(case) == f.read()
+
+
+@pytest.mark.parametrize("case", ["submit_markup", "approved_markup", "rework_markup"])
+def test_values_are_escaped(case):
+    body = render(case)
+    assert "Zoë &lt;O&#39;Brien&gt; &amp; Co" in body
+    assert "<O'Brien>" not in body and "<b>not</b>" not in body and "<i>summer</i>" not in body
+
+
+def test_validation_errors_go_in_as_html():
+    assert ERRORS[0] in render("submit")
+
+
+if __name__ == "__main__":
+    if "--update" not in sys.argv:
+        sys.exit("usage: python tests/test_email_templates.py --update")
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for case in CASES:
+        with open(snapshot_path(case), "w", encoding="utf-8", newline="") as f:
+            f.write(render(case))
+    print(f"Wrote {len(CASES)} snapshots to {SNAPSHOT_DIR}")
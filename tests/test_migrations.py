@@ -0,0 +1,36 @@
+"""Static extraction of the text() queries that `migrations.py check` EXPLAINs."""
+import os
+import sys
+import textwrap
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import migrations
+
+
+def _write(tmp_path, name, source):
+    path = tmp_path / name
+    path.write_text(textwrap.dedent(source), encoding="utf-8")
+    return str(path)
+
+
+def test_constants_and_sibling_modules_are_resolved(tmp_path):
+    _write(tmp_path, "store.py", """
+        PREFIX = "blob:"
+        LENGTH = len(PREFIX) + 64
+    """)
+    app = _write(tmp_path, "app.py", """
+        import store
+        COLUMNS = "a, b"
+        def f(conn, where):
+            conn.execute(text(f"SELECT {COLUMNS} FROM t WHERE x = :x"))
+            conn.execute(text(f"SELECT SUBSTR(d, 1, {store.LENGTH}) FROM t WHERE d LIKE '{store.PREFIX}%'"))
+            conn.execute(text(f"SELECT * FROM t WHERE {where}"))
+    """)
+    queries, unresolved = migrations.extract_queries(app)
+    assert [sql for _, sql in queries] == ["SELECT a, b FROM t WHERE x = :x",
+                                           "SELECT SUBSTR(d, 1, 69) FROM t WHERE d LIKE 'blob:%'"]
+    assert [(line, src) for line, src in unresolved] == [(7, 'f"SELECT * FROM t WHERE {where}"')]
+
+
+def test_default_source_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(migrations.APP_SOURCE) and os.path.exists(migrations.APP_SOURCE)
@@ -0,0 +1,111 @@
+"""Blob storage of Saved_Sequences JSON (sequence_store.py): deltas, checkpoints, cache and missing blobs."""
+import os
+import sys
+import json
+import random
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sequence_store
+
+SUBJECTS = ("MECH", "ENGR", "AERO", "INDU", "MIAE", "COMP", "MATH")
+
+
+@pytest.fixture
+def engine():
+    sequence_store._cache.clear()
+    yield create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    sequence_store._cache.clear()
+
+
+def _plan(n):
+    """A saved JSON_Data layout ({term: [courses]}); each version adds one course to a winter term."""
+    rng = random.Random(0)
+    terms = {f"Y{y}_{s}": [f"{rng.choice(SUBJECTS)}{rng.randint(200, 499)}" for _ in range(6)]
+             for y in range(1, 5) for s in ("FALL", "WIN", "SUM")}
+    terms[f"Y{1 + n % 4}_WIN"].append(f"ELEC{300 + n}")
+    return terms
+
+
+def _blob(conn, ref):
+    return conn.execute(text("SELECT codec, base_hash, depth FROM Sequence_Blobs WHERE hash = :h"),
+                        {"h": sequence_store.digest_of(ref)}).one()
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"a": 1, "b": {"c": [1, 2]}}, {"a": 1, "b": {"c": [1, 2, 3]}}),           # listă înlocuită
+    ({"a": 1, "b": 2}, {"b": 2}),                                              # cheie ștearsă
+    ({"a": 1}, {"a": 1, "z": {"n": None}}),                                     # cheie nouă
+    ({"a": 1, "b": 2, "c": 3}, {"c": 3, "a": 1, "b": 2}),                       # doar ordinea
+    ({"x": {"a": 1, "b": 2}}, {"x": {"b": 2, "a": 1, "c": 0}}),                # ordine într-un dict interior
+    ({"a": True, "b": 1.0}, {"a": 1, "b": 1}),                                  # egale în Python, nu în JSON
+    ({"a": {"b": 1}}, {"a": [1]}),                                               # dict -> listă
+    ({"a": 1}, [1, 2]),                                                          # alt tip la rădăcină
+    ({}, {}),
+])
+def test_diff_apply_delta_round_trip(old, new):
+    ops = sequence_store.diff(old, new)
+    rebuilt = sequence_store.apply_delta(json.loads(json.dumps(old)), json.loads(json.dumps(ops)))
+    assert json.dumps(rebuilt) == json.dumps(new)
+
+
+def test_version_chain_across_checkpoints(engine):
+    payloads, refs = [], []
+    with engine.begin() as conn:
+        for n in range(2 * sequence_store.CHECKPOINT_EVERY + 3):
+            payloads.append(json.dumps(_plan(n)))
+            refs.append(sequence_store.put(conn, payloads[-1], bases=refs[-1:]))
+        depths = [_blob(conn, r)[2] for r in refs]
+
+    every = sequence_store.CHECKPOINT_EVERY
+    assert depths == [n % every for n in range(len(refs))]
+    assert max(depths) == every - 1
+
+    sequence_store._cache.clear()
+    with engine.connect() as conn:
+        assert sequence_store.resolve(conn, refs) == dict(zip(refs, payloads))
+    with engine.connect() as conn:
+        # o versiune din mijlocul lanțului, citită singură, cu cache-ul gol
+        sequence_store._cache.clear()
+        assert sequence_store.resolve(conn, [refs[every + 4]]) == {refs[every + 4]: payloads[every + 4]}
+
+
+def test_rolled_back_blob_is_not_used_as_a_base(engine):
+    first, second = json.dumps(_plan(1)), json.dumps(_plan(2))
+    with pytest.raises(RuntimeError):
+        with engine.begin() as conn:
+            base = sequence_store.put(conn, first)
+            assert _blob(conn, sequence_store.put(conn, second, bases=[base]))[0] == "zlib-delta"
+            raise RuntimeError("rollback")
+    assert not sequence_store._cache
+
+    sequence_store._cache.clear()
+    with engine.begin() as conn:
+        ref = sequence_store.put(conn, second, bases=[base])    # baza a dispărut cu rollback-ul
+        assert _blob(conn, ref)[:2] == ("zlib", None)
+    with engine.connect() as conn:
+        assert sequence_store.resolve(conn, [ref]) == {ref: second}
+
+
+def test_missing_base_raises(engine):
+    with engine.begin() as conn:
+        base = sequence_store.put(conn, json.dumps(_plan(1)))
+        ref = sequence_store.put(conn, json.dumps(_plan(2)), bases=[base])
+        conn.execute(text("DELETE FROM Sequence_Blobs WHERE hash = :h"), {"h": sequence_store.digest_of(base)})
+
+    sequence_store._cache.clear()
+    with engine.connect() as conn:
+        with pytest.raises(sequence_store.MissingBlob):
+            sequence_store.resolve_rows(conn, [{"JSON_Data": ref, "Term_Json_data": "{}", "sequence_Json_data": None}])
+        with pytest.raises(sequence_store.MissingBlob):
+            sequence_store.resolve(conn, [base])
+
+
+def test_short_payloads_stay_inline(engine):
+    with engine.begin() as conn:
+        assert sequence_store.put(conn, "{}") == "{}"
+        ref = sequence_store.put(conn, json.dumps(_plan(0)))
+        assert sequence_store.put(conn, json.dumps(_plan(0))) == ref
+        assert conn.execute(text("SELECT COUNT(*) FROM Sequence_Blobs")).scalar() == 1